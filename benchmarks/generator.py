@@ -0,0 +1,203 @@
+"""
+Synthetic warehouse generator for the WMS benchmarks
+
+Builds a deterministic warehouse for a given number of pick lines:
+a layout of aisles with one-way picking lanes and cross aisles, storage
+locations, items with dimensions and barcodes, a box catalog, sales
+orders, one pick list covering all order lines and one delivery note
+with the same lines.
+"""
+
+import math
+import random
+
+import frappe
+
+WAREHOUSE = 'Stores - BM'
+COMPANY = 'Benchmark Company'
+LEVELS = 4
+BAYS_PER_AISLE = 20
+AISLE_SPACING = 3.0  # m
+BAY_WIDTH = 1.5  # m
+LINES_PER_ORDER = 5
+
+BOX_TYPES = [
+    ('Small', (20, 15, 10), 0.1, 5),
+    ('Medium', (30, 25, 20), 0.2, 15),
+    ('Large', (40, 30, 30), 0.4, 20),
+    ('XL', (60, 40, 40), 0.7, 30),
+    ('Pallet Box', (120, 80, 80), 4.0, 200)
+]
+
+
+def generate_warehouse(lines, seed=42):
+    """Fill the stand-in database; returns the names the benchmarks use"""
+    rng = random.Random(seed)
+    db = frappe.db
+
+    locations = _generate_layout(db, min(max(lines // 2, 20), 1600))
+    items = _generate_items(db, rng, min(max(lines // 2, 10), 5000), locations)
+    _generate_box_types(db)
+    pick_list, delivery_note = _generate_orders(db, rng, lines, items)
+
+    barcodes = [barcode for item in items for barcode in item['barcodes']]
+
+    return frappe._dict({
+        'lines': lines,
+        'warehouse': WAREHOUSE,
+        'pick_list': pick_list,
+        'delivery_note': delivery_note,
+        'barcodes': barcodes,
+        'items': [item['name'] for item in items]
+    })
+
+
+def _generate_layout(db, count):
+    """Aisles in a serpentine of one-way lanes, joined by cross aisles at both ends"""
+    db.insert_row('Warehouse', {'name': WAREHOUSE, 'warehouse_name': 'Stores', 'is_group': 1, 'company': COMPANY})
+
+    positions = math.ceil(count / LEVELS)
+    aisle_count = max(2, math.ceil(positions / BAYS_PER_AISLE))
+    aisles = [f'A{number:02d}' for number in range(1, aisle_count + 1)]
+
+    depot = db.insert_row('WMS Location', {
+        'name': 'DEPOT', 'location_code': 'DEPOT', 'warehouse': WAREHOUSE,
+        'is_depot': 1, 'x_coord': 0.0, 'y_coord': -BAY_WIDTH * 2
+    })
+
+    locations = []
+    ends = {}
+    for number, aisle in enumerate(aisles):
+        for bay in range(1, BAYS_PER_AISLE + 1):
+            for level in range(1, LEVELS + 1):
+                if len(locations) >= count:
+                    break
+
+                code = f'{aisle}-B{bay:02d}-L{level}'
+                storage_warehouse = f'{code} - BM'
+                db.insert_row('Warehouse', {'name': storage_warehouse, 'warehouse_name': code,
+                    'parent_warehouse': WAREHOUSE, 'company': COMPANY})
+                locations.append(db.insert_row('WMS Location', {
+                    'name': code, 'location_code': code, 'warehouse': WAREHOUSE,
+                    'storage_warehouse': storage_warehouse, 'aisle': aisle, 'bay': bay, 'level': level,
+                    'x_coord': number * AISLE_SPACING, 'y_coord': bay * BAY_WIDTH
+                }))
+                ends.setdefault(aisle, {})[bay] = code
+
+    layout = {'name': WAREHOUSE, 'warehouse': WAREHOUSE}
+    db.insert_row('WMS Warehouse Layout', layout)
+
+    used = [aisle for aisle in aisles if aisle in ends]
+    for idx, aisle in enumerate(used, 1):
+        db.insert_row('WMS Layout Aisle', {
+            'parent': WAREHOUSE, 'parenttype': 'WMS Warehouse Layout', 'parentfield': 'aisles', 'idx': idx,
+            'aisle': aisle, 'direction': 'Ascending' if idx % 2 else 'Descending'
+        })
+
+    connections = [(depot.name, ends[used[0]][1])]
+    for left, right in zip(used, used[1:]):
+        connections.append((ends[left][min(ends[left])], ends[right][min(ends[right])]))
+        connections.append((ends[left][max(ends[left])], ends[right][max(ends[right])]))
+
+    for idx, (from_location, to_location) in enumerate(connections, 1):
+        db.insert_row('WMS Layout Connection', {
+            'parent': WAREHOUSE, 'parenttype': 'WMS Warehouse Layout', 'parentfield': 'connections',
+            'idx': idx, 'from_location': from_location, 'to_location': to_location,
+            'distance': AISLE_SPACING, 'one_way': 0
+        })
+
+    return locations
+
+
+def _generate_items(db, rng, count, locations):
+    items = []
+    for number in range(1, count + 1):
+        code = f'ITEM-{number:05d}'
+        item = db.insert_row('Item', {
+            'name': code, 'item_code': code, 'item_name': f'Benchmark Item {number}',
+            'item_group': 'Products', 'stock_uom': 'Nos', 'description': f'Benchmark Item {number}',
+            'image': None, 'has_batch_no': 1 if rng.random() < 0.1 else 0,
+            'weight_per_unit': round(rng.uniform(0.05, 2.0), 3), 'weight_uom': 'Kg',
+            'wms_length': round(rng.uniform(2, 30), 1),
+            'wms_width': round(rng.uniform(2, 25), 1),
+            'wms_height': round(rng.uniform(1, 20), 1)
+        })
+
+        barcodes = []
+        for idx in range(1, rng.choice((1, 1, 2)) + 1):
+            barcode = f'{7350000000000 + number * 10 + idx}'
+            db.insert_row('Item Barcode', {'parent': code, 'parenttype': 'Item', 'parentfield': 'barcodes',
+                'idx': idx, 'barcode': barcode, 'barcode_type': 'EAN', 'uom': 'Nos'})
+            barcodes.append(barcode)
+
+        items.append(frappe._dict({
+            'name': code,
+            'item_name': item.item_name,
+            'description': item.description,
+            'barcodes': barcodes,
+            # Each item is stocked in one location
+            'storage_warehouse': rng.choice(locations).storage_warehouse
+        }))
+
+    return items
+
+
+def _generate_box_types(db):
+    for name, (length, width, height), tare, max_weight in BOX_TYPES:
+        db.insert_row('WMS Box Type', {
+            'name': name, 'box_code': name, 'enabled': 1,
+            'inner_length': length, 'inner_width': width, 'inner_height': height,
+            'tare_weight': tare, 'max_weight': max_weight
+        })
+
+
+def _generate_orders(db, rng, lines, items):
+    """Sales orders of LINES_PER_ORDER lines, one pick list and one delivery note over all of them"""
+    pick_list = db.insert_row('Pick List', {
+        'company': COMPANY, 'purpose': 'Delivery', 'status': 'Open', 'wms_version': 0, 'wms_zone_picking': 0
+    })
+    delivery_note = db.insert_row('Delivery Note', {
+        # Not linked to the pick list, so the delivery note job still has every order to create
+        'customer': 'CUST-00001', 'customer_name': 'Benchmark Customer 1', 'company': COMPANY, 'wms_version': 0
+    })
+
+    total_qty = 0
+    for start in range(0, lines, LINES_PER_ORDER):
+        customer = f'CUST-{start // LINES_PER_ORDER + 1:05d}'
+        if not db.tables['Customer'].get(customer):
+            db.insert_row('Customer', {'name': customer, 'customer_name': f'Benchmark Customer {customer[5:]}'})
+
+        order = db.insert_row('Sales Order', {
+            'customer': customer, 'customer_name': f'Benchmark Customer {customer[5:]}', 'company': COMPANY,
+            'docstatus': 1
+        })
+
+        for idx in range(1, min(LINES_PER_ORDER, lines - start) + 1):
+            item = rng.choice(items)
+            qty = rng.randint(1, 5)
+            line = start + idx
+            total_qty += qty
+
+            so_item = db.insert_row('Sales Order Item', {
+                'parent': order.name, 'parenttype': 'Sales Order', 'parentfield': 'items', 'idx': idx,
+                'item_code': item['name'], 'item_name': item['item_name'], 'description': item['description'],
+                'qty': qty, 'stock_qty': qty, 'uom': 'Nos', 'stock_uom': 'Nos', 'conversion_factor': 1,
+                'warehouse': WAREHOUSE, 'rate': 10
+            })
+            db.insert_row('Pick List Item', {
+                'parent': pick_list.name, 'parenttype': 'Pick List', 'parentfield': 'locations', 'idx': line,
+                'item_code': item['name'], 'item_name': item['item_name'], 'qty': qty, 'stock_qty': qty,
+                'picked_qty': qty, 'uom': 'Nos', 'stock_uom': 'Nos', 'conversion_factor': 1,
+                'warehouse': item['storage_warehouse'], 'sales_order': order.name,
+                'sales_order_item': so_item.name
+            })
+            db.insert_row('Delivery Note Item', {
+                'parent': delivery_note.name, 'parenttype': 'Delivery Note', 'parentfield': 'items', 'idx': line,
+                'item_code': item['name'], 'item_name': item['item_name'], 'qty': qty, 'stock_qty': qty,
+                'uom': 'Nos', 'stock_uom': 'Nos', 'conversion_factor': 1, 'warehouse': item['storage_warehouse'],
+                'against_sales_order': order.name, 'so_detail': so_item.name, 'wms_packed_qty': 0
+            })
+
+    delivery_note.update({'total_qty': total_qty, 'wms_total_lines': lines, 'wms_pack_pending': 1})
+
+    return pick_list.name, delivery_note.name
@@ -0,0 +1,181 @@
+"""
+WMS benchmarks
+
+Times the wms.api hot paths against synthetic warehouses of increasing
+size, using the in-memory frappe stand-in in benchmarks/standin, and
+reports latency percentiles, database queries and cache round trips per
+call.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 100 1000 --repeat 20 --only optimize_pick_route
+    python benchmarks/run.py --save baseline.json
+    python benchmarks/run.py --compare baseline.json
+
+With --compare the run exits with status 1 when a benchmark got slower
+than the tolerance allows or issues more queries than the baseline.
+Absolute timings include the stand-in's own overhead; compare runs made
+on the same machine.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCHMARKS_DIR, 'standin'), os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import frappe  # noqa: E402  (the stand-in)
+
+from generator import generate_warehouse  # noqa: E402
+from schema import register_schema  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_REPEAT = 10
+
+# Slower p95 than baseline * (1 + tolerance) and by more than this is a regression
+NOISE_FLOOR_MS = 1.0
+
+
+def clear_delivery_notes(scenario):
+    """Remove delivery notes created by a previous run of the job"""
+    db = frappe.db
+    created = [name for name, row in db.tables['Delivery Note'].items()
+        if row.get('pick_list') == scenario.pick_list]
+    for name in created:
+        del db.tables['Delivery Note'][name]
+    for key in [key for key, row in db.tables['Delivery Note Item'].items() if row.parent in created]:
+        del db.tables['Delivery Note Item'][key]
+
+
+def get_benchmarks():
+    from wms import api
+
+    def scan(scenario, state):
+        barcodes = scenario.barcodes
+        state['scan'] = state.get('scan', -1) + 1
+        return api.process_barcode_scan(barcodes[state['scan'] % len(barcodes)])
+
+    return {
+        'optimize_pick_route': (lambda scenario, state: api.optimize_pick_route(scenario.pick_list), None),
+        'optimize_packing': (lambda scenario, state: api.optimize_packing(scenario.delivery_note), None),
+        'get_pick_list_details': (lambda scenario, state: api.get_pick_list_details(scenario.pick_list), None),
+        'get_delivery_note_details': (
+            lambda scenario, state: api.get_delivery_note_details(scenario.delivery_note), None
+        ),
+        'process_barcode_scan': (scan, None),
+        'create_delivery_notes_from_pick_list': (
+            lambda scenario, state: api.create_delivery_notes_from_pick_list(scenario.pick_list),
+            clear_delivery_notes
+        )
+    }
+
+
+def run_benchmark(fn, setup, scenario, repeat):
+    """Warm up once, then time repeat calls; returns the measurements"""
+    state = {}
+    if setup:
+        setup(scenario)
+    fn(scenario, state)
+
+    timings = []
+    queries = []
+    round_trips = []
+    for i in range(repeat):
+        if setup:
+            setup(scenario)
+        frappe.reset_counters()
+
+        start = time.perf_counter()
+        fn(scenario, state)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        queries.append(frappe.db.query_count)
+        round_trips.append(frappe.cache().round_trips)
+
+    return {
+        'calls': repeat,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'max': max(timings),
+        'queries': statistics.median(queries),
+        'cache': statistics.median(round_trips)
+    }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def run(sizes, repeat, only=None):
+    results = {}
+    print(f"{'lines':>6}  {'benchmark':<38}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        f"{'queries':>9}{'cache':>7}")
+
+    for size in sizes:
+        frappe.init(hooks_module='wms.hooks')
+        register_schema(frappe.db)
+        scenario = generate_warehouse(size)
+
+        for name, (fn, setup) in get_benchmarks().items():
+            if only and name not in only:
+                continue
+
+            result = run_benchmark(fn, setup, scenario, repeat)
+            results[f'{name}@{size}'] = result
+            print(f"{size:>6}  {name:<38}{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}"
+                f"{result['max']:>9.2f}{result['queries']:>9g}{result['cache']:>7g}")
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a saved run, as printable lines"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+
+        if result['p95'] > base['p95'] * (1 + tolerance) and result['p95'] - base['p95'] > NOISE_FLOOR_MS:
+            regressions.append(f"{key}: p95 {base['p95']:.2f} -> {result['p95']:.2f} ms")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{key}: queries {base['queries']:g} -> {result['queries']:g}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the WMS API hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='pick list lines per scenario')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed calls per benchmark')
+    parser.add_argument('--only', nargs='+', help='benchmarks to run')
+    parser.add_argument('--save', help='write the results to a JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        for line in regressions:
+            print('REGRESSION ' + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Doctype schema registered with the benchmark stand-in
+
+Only the fields the WMS code paths read or write are listed, including
+the WMS custom fields created by wms.install.
+"""
+
+STANDARD_FIELDS = ['name', 'owner', 'creation', 'modified', 'modified_by', 'docstatus', 'idx']
+CHILD_FIELDS = STANDARD_FIELDS + ['parent', 'parenttype', 'parentfield']
+
+DOCTYPES = {
+    'WMS Settings': {
+        'issingle': True,
+        'fields': ['max_package_weight', 'max_package_volume', 'walking_speed', 'pick_time_per_line',
+            'lock_ttl_minutes', 'auto_create_packing_slip', 'default_packing_location',
+            'wave_max_orders', 'wave_max_lines', 'enable_zone_picking', 'zone_picking_min_lines'],
+        'defaults': {'max_package_weight': 25, 'max_package_volume': 0.1, 'walking_speed': 1.2,
+            'pick_time_per_line': 30, 'lock_ttl_minutes': 5}
+    },
+    'Warehouse': {
+        'fields': ['warehouse_name', 'parent_warehouse', 'is_group', 'company']
+    },
+    'WMS Location': {
+        'fields': ['location_code', 'warehouse', 'storage_warehouse', 'aisle', 'bay', 'level',
+            'is_depot', 'x_coord', 'y_coord', 'capacity']
+    },
+    'WMS Warehouse Layout': {
+        'fields': ['warehouse'],
+        'tables': {'aisles': 'WMS Layout Aisle', 'connections': 'WMS Layout Connection'}
+    },
+    'WMS Layout Aisle': {
+        'child': True,
+        'fields': ['aisle', 'direction']
+    },
+    'WMS Layout Connection': {
+        'child': True,
+        'fields': ['from_location', 'to_location', 'distance', 'one_way']
+    },
+    'WMS Box Type': {
+        'fields': ['box_code', 'enabled', 'inner_length', 'inner_width', 'inner_height',
+            'outer_length', 'outer_width', 'outer_height', 'tare_weight', 'max_weight']
+    },
+    'Item': {
+        'fields': ['item_code', 'item_name', 'item_group', 'stock_uom', 'description', 'image',
+            'has_batch_no', 'weight_per_unit', 'weight_uom', 'wms_length', 'wms_width', 'wms_height'],
+        'tables': {'barcodes': 'Item Barcode'}
+    },
+    'Item Barcode': {
+        'child': True,
+        'fields': ['barcode', 'barcode_type', 'uom']
+    },
+    'Customer': {
+        'fields': ['customer_name']
+    },
+    'Sales Order': {
+        'fields': ['customer', 'customer_name', 'company', 'transaction_date', 'delivery_date',
+            'contact_person', 'contact_display', 'contact_mobile', 'contact_email',
+            'shipping_address_name', 'shipping_address', 'dispatch_address_name', 'dispatch_address'],
+        'tables': {'items': 'Sales Order Item'}
+    },
+    'Sales Order Item': {
+        'child': True,
+        'fields': ['item_code', 'item_name', 'description', 'qty', 'stock_qty', 'uom', 'stock_uom',
+            'conversion_factor', 'warehouse', 'rate']
+    },
+    'Pick List': {
+        'fields': ['company', 'purpose', 'status', 'customer', 'wms_locked_by', 'wms_locked_at',
+            'wms_session_id', 'wms_picked_qty', 'wms_picked_lines', 'wms_version', 'wms_wave', 'wms_zone_picking'],
+        'tables': {'locations': 'Pick List Item'}
+    },
+    'Pick List Item': {
+        'child': True,
+        'fields': ['item_code', 'item_name', 'qty', 'stock_qty', 'picked_qty', 'uom', 'stock_uom',
+            'conversion_factor', 'warehouse', 'batch_no', 'serial_no', 'sales_order', 'sales_order_item',
+            'material_request', 'material_request_item', 'wms_box']
+    },
+    'WMS Wave': {
+        'fields': ['warehouse', 'status', 'cut_off', 'total_orders', 'total_lines', 'distance',
+            'wms_locked_by', 'wms_locked_at', 'wms_session_id'],
+        'tables': {'pick_lists': 'WMS Wave Pick List', 'items': 'WMS Wave Item'}
+    },
+    'WMS Wave Pick List': {
+        'child': True,
+        'fields': ['pick_list', 'customer', 'due_date', 'lines']
+    },
+    'WMS Wave Item': {
+        'child': True,
+        'fields': ['pick_list', 'pick_list_item', 'pick_list_idx', 'item_code', 'item_name', 'qty', 'uom',
+            'location', 'warehouse', 'order_ref', 'box']
+    },
+    'User': {
+        'fields': ['full_name', 'enabled']
+    },
+    'WMS Zone': {
+        'fields': ['zone_name', 'warehouse', 'enabled', 'sequence', 'aisles'],
+        'tables': {'pickers': 'WMS Zone Picker'}
+    },
+    'WMS Zone Picker': {
+        'child': True,
+        'fields': ['user', 'full_name']
+    },
+    'WMS Zone Task': {
+        'fields': ['pick_list', 'zone', 'warehouse', 'status', 'assigned_to', 'total_lines', 'total_qty',
+            'distance', 'estimated_minutes', 'wms_locked_by', 'wms_locked_at', 'wms_session_id'],
+        'tables': {'items': 'WMS Zone Task Item'}
+    },
+    'WMS Zone Task Item': {
+        'child': True,
+        'fields': ['pick_list', 'pick_list_item', 'pick_list_idx', 'item_code', 'item_name', 'qty', 'uom',
+            'location', 'warehouse', 'order_ref', 'box']
+    },
+    'WMS Slotting Analysis': {
+        'fields': ['warehouse', 'from_date', 'to_date', 'status', 'pick_lists_analysed', 'lines_analysed',
+            'estimated_saving', 'stock_entry', 'items_analysed', 'class_a_items', 'class_b_items',
+            'class_c_items'],
+        'tables': {'recommendations': 'WMS Slotting Recommendation'}
+    },
+    'WMS Slotting Recommendation': {
+        'child': True,
+        'fields': ['item_code', 'item_name', 'velocity_class', 'picks', 'qty', 'co_picked_with',
+            'from_location', 'from_warehouse', 'to_location', 'to_warehouse', 'swap_with', 'saving']
+    },
+    'WMS Scan Event': {
+        'fields': ['scanned_at', 'event_date', 'user', 'step_type', 'reference_doctype', 'reference_name',
+            'row_idx', 'item_code', 'location', 'warehouse', 'zone', 'qty', 'duration']
+    },
+    'WMS User Throughput': {
+        'fields': ['hour', 'date', 'user', 'scans', 'lines', 'qty', 'active_minutes', 'lines_per_hour',
+            'seconds_per_line']
+    },
+    'WMS Zone Throughput': {
+        'fields': ['hour', 'date', 'warehouse', 'zone', 'scans', 'lines', 'qty', 'pickers',
+            'seconds_per_line']
+    },
+    'WMS Shipment': {
+        'fields': ['delivery_note', 'customer', 'shipment_date', 'status', 'carrier', 'tracking_number',
+            'total_weight', 'total_packages', 'notes'],
+        'tables': {'packages': 'WMS Package', 'package_items': 'WMS Package Item'}
+    },
+    'WMS Package': {
+        'child': True,
+        'fields': ['package_no', 'weight', 'items_count', 'box_type', 'length', 'width', 'height']
+    },
+    'WMS Package Item': {
+        'child': True,
+        'fields': ['package_no', 'item_code', 'item_name', 'qty', 'delivery_note_item']
+    },
+    'Stock Ledger Entry': {
+        'fields': ['item_code', 'warehouse', 'posting_date', 'actual_qty', 'qty_after_transaction',
+            'voucher_type', 'voucher_no', 'is_cancelled']
+    },
+    'Bin': {
+        'fields': ['item_code', 'warehouse', 'actual_qty', 'reserved_qty', 'projected_qty']
+    },
+    'Stock Entry': {
+        'fields': ['stock_entry_type', 'purpose', 'company', 'remarks'],
+        'tables': {'items': 'Stock Entry Detail'}
+    },
+    'Stock Entry Detail': {
+        'child': True,
+        'fields': ['item_code', 's_warehouse', 't_warehouse', 'qty']
+    },
+    'Delivery Note': {
+        'fields': ['customer', 'customer_name', 'company', 'posting_date', 'set_posting_time',
+            'contact_person', 'contact_display', 'contact_mobile', 'contact_email',
+            'shipping_address_name', 'shipping_address', 'dispatch_address_name', 'dispatch_address',
+            'total_qty', 'pick_list', 'wms_packing_complete', 'wms_shipment', 'wms_locked_by',
+            'wms_locked_at', 'wms_session_id', 'wms_total_packed_qty', 'wms_packed_lines',
+            'wms_version', 'wms_total_lines', 'wms_pack_pending'],
+        'tables': {'items': 'Delivery Note Item'}
+    },
+    'Delivery Note Item': {
+        'child': True,
+        'fields': ['item_code', 'item_name', 'description', 'qty', 'stock_qty', 'uom', 'stock_uom',
+            'conversion_factor', 'warehouse', 'against_sales_order', 'so_detail', 'wms_box',
+            'wms_packed_qty', 'wms_package_no']
+    }
+}
+
+
+def register_schema(db):
+    for doctype, definition in DOCTYPES.items():
+        standard = CHILD_FIELDS if definition.get('child') else STANDARD_FIELDS
+        db.register_doctype(doctype,
+            fields=standard + definition['fields'],
+            tables=definition.get('tables'),
+            issingle=definition.get('issingle', False),
+            defaults=definition.get('defaults')
+        )
@@ -0,0 +1,191 @@
+"""
+Benchmark stand-in for the frappe framework
+
+Just enough of the frappe API for wms.api hot paths to run in-process
+against the in-memory database and cache of this package. It is put on
+sys.path by benchmarks/run.py only and never shipped with the app.
+"""
+
+import importlib
+import types
+
+from frappe.memory_cache import Cache
+from frappe.database import Database
+
+
+class _dict(dict):
+    """dict with attribute access, like frappe._dict"""
+
+    __getattr__ = dict.get
+    __setattr__ = dict.__setitem__
+    __delattr__ = dict.__delitem__
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        return self
+
+    def copy(self):
+        return _dict(self)
+
+
+class ValidationError(Exception):
+    pass
+
+
+class DoesNotExistError(ValidationError):
+    pass
+
+
+class PermissionError(Exception):
+    pass
+
+
+local = types.SimpleNamespace(cache={}, db=None, cache_store=None, doc_cache={}, hooks={})
+flags = _dict()
+session = _dict(user='Administrator')
+db = None
+realtime_messages = []
+
+
+def init(hooks_module=None):
+    """Start with an empty database and cache"""
+    global db
+
+    db = local.db = Database()
+    local.cache_store = Cache()
+    local.cache = {}
+    local.doc_cache = {}
+    local.hooks = {}
+    realtime_messages.clear()
+    flags.clear()
+
+    if hooks_module:
+        hooks = importlib.import_module(hooks_module)
+        local.hooks = getattr(hooks, 'doc_events', {})
+
+
+def reset_counters():
+    db.reset_counters()
+    local.cache_store.reset_counters()
+    realtime_messages.clear()
+
+
+def _(msg, *args, **kwargs):
+    return msg
+
+
+def whitelist(*args, **kwargs):
+    if args and callable(args[0]):
+        return args[0]
+    return lambda fn: fn
+
+
+def throw(msg, exc=ValidationError, title=None, **kwargs):
+    raise exc(msg)
+
+
+def msgprint(msg, *args, **kwargs):
+    pass
+
+
+def log_error(title=None, message=None, *args, **kwargs):
+    pass
+
+
+def cache():
+    return local.cache_store
+
+
+def get_meta(doctype):
+    return db.get_meta(doctype)
+
+
+def get_all(doctype, *args, **kwargs):
+    return db.get_all(doctype, *args, **kwargs)
+
+
+get_list = get_all
+
+
+def get_value(doctype, filters=None, fieldname='name', *args, **kwargs):
+    return db.get_value(doctype, filters, fieldname, *args, **kwargs)
+
+
+def get_doc(doctype, name=None, **kwargs):
+    from frappe.model.document import Document
+
+    if isinstance(doctype, dict):
+        values = _dict(doctype)
+        doctype = values.pop('doctype')
+        tables = get_meta(doctype).tables
+        children = {fieldname: values.pop(fieldname) for fieldname in list(values) if fieldname in tables}
+        return Document(doctype, values, children)
+
+    values, children = db.load_doc(doctype, name)
+    return Document(doctype, values, children)
+
+
+def new_doc(doctype, **kwargs):
+    from frappe.model.document import Document
+
+    return Document(doctype)
+
+
+def get_cached_doc(doctype, name=None):
+    key = (doctype, name)
+    if key not in local.doc_cache:
+        local.doc_cache[key] = get_doc(doctype, name)
+    return local.doc_cache[key]
+
+
+def get_cached_value(doctype, name, fieldname, as_dict=False):
+    doc = get_cached_doc(doctype, name)
+    if isinstance(fieldname, str):
+        return doc.get(fieldname)
+    values = [doc.get(field) for field in fieldname]
+    return _dict(zip(fieldname, values)) if as_dict else values
+
+
+def get_doc_hooks(doctype, event):
+    handlers = []
+    for path in _as_list((local.hooks.get(doctype) or {}).get(event)) + _as_list((local.hooks.get('*') or {}).get(event)):
+        module, method = path.rsplit('.', 1)
+        handlers.append(getattr(importlib.import_module(module), method))
+    return handlers
+
+
+# Jobs that queue themselves again while running inline; kept, not run
+queued_jobs = []
+_running_job = []
+
+
+def enqueue(method, queue='default', timeout=None, job_id=None, deduplicate=False,
+        enqueue_after_commit=False, now=False, **kwargs):
+    """Background jobs run inline, like enqueue(now=True)"""
+    if isinstance(method, str):
+        module, name = method.rsplit('.', 1)
+        method = getattr(importlib.import_module(module), name)
+    if method in _running_job:
+        queued_jobs.append((method, kwargs))
+        return None
+
+    _running_job.append(method)
+    try:
+        return method(**kwargs)
+    finally:
+        _running_job.pop()
+
+
+def publish_realtime(event=None, message=None, room=None, user=None, doctype=None, docname=None,
+        after_commit=False, **kwargs):
+    realtime_messages.append((event, room or user))
+
+
+def safe_decode(value, encoding='utf-8'):
+    return value.decode(encoding) if isinstance(value, bytes) else value
+
+
+def _as_list(value):
+    if not value:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
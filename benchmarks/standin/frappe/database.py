@@ -0,0 +1,471 @@
+"""
+In-memory stand-in for frappe.db and frappe.get_all
+
+Rows are plain dicts kept per doctype. Every call that would be a SQL
+round trip in frappe increments query_count, so benchmarks can report
+how many queries a code path issues. Transactions are not emulated:
+commit, rollback and savepoints are counted but do not undo anything.
+"""
+
+import copy
+import re
+from collections import defaultdict
+
+import frappe
+from frappe.utils import now
+
+CHILD_FIELD = re.compile(r'^`tab(?P<doctype>[^`]+)`\.(?P<field>\w+)$')
+AGGREGATE = re.compile(r'^(?P<func>count|sum|min|max|avg)\((?P<field>[\w*`.]+)\)$', re.IGNORECASE)
+
+
+class Meta:
+    """Fields and child tables of a doctype, registered by the benchmark schema"""
+
+    def __init__(self, doctype, fields=(), tables=None, issingle=False, defaults=None):
+        self.name = doctype
+        self.tables = dict(tables or {})  # fieldname -> child doctype
+        self.fieldnames = set(fields) | set(self.tables)
+        self.issingle = issingle
+        self.defaults = dict(defaults or {})
+
+    def has_field(self, fieldname):
+        return fieldname in self.fieldnames
+
+    def get_table_fields(self):
+        return [frappe._dict(fieldname=fieldname, options=doctype) for fieldname, doctype in self.tables.items()]
+
+
+class CallbackManager:
+    """frappe.db.after_commit / after_rollback: callbacks run once, in order"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add(self, callback):
+        self.callbacks.append(callback)
+
+    def reset(self):
+        self.callbacks = []
+
+    def run(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class Database:
+    def __init__(self):
+        self.meta = {}
+        self.tables = defaultdict(dict)  # doctype -> name -> row
+        self.singles = defaultdict(dict)
+        self.counters = defaultdict(int)
+        self.query_count = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.after_commit = CallbackManager()
+        self.after_rollback = CallbackManager()
+
+    # Schema and fixtures
+
+    def register_doctype(self, doctype, fields=(), tables=None, issingle=False, defaults=None):
+        self.meta[doctype] = Meta(doctype, fields, tables, issingle, defaults)
+
+    def get_meta(self, doctype):
+        if doctype not in self.meta:
+            raise frappe.DoesNotExistError(f'DocType {doctype} is not registered in the benchmark schema')
+        return self.meta[doctype]
+
+    def insert_row(self, doctype, row):
+        """Store a row without counting it as a query (fixtures)"""
+        row = frappe._dict(row)
+        if not row.get('name'):
+            row.name = self.make_name(doctype)
+        timestamp = now()
+        row.setdefault('creation', timestamp)
+        row.setdefault('modified', timestamp)
+        row.setdefault('docstatus', 0)
+        self.tables[doctype][row.name] = row
+        return row
+
+    def make_name(self, doctype):
+        self.counters[doctype] += 1
+        prefix = ''.join(word[0] for word in doctype.split()).upper()
+        return f'{prefix}-{self.counters[doctype]:06d}'
+
+    def reset_counters(self):
+        self.query_count = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.after_commit = CallbackManager()
+        self.after_rollback = CallbackManager()
+
+    # frappe.db API
+
+    def sql(self, query, values=None, as_dict=False, **kwargs):
+        self.query_count += 1
+        raise NotImplementedError('Raw SQL is not emulated by the benchmark stand-in: ' + ' '.join(query.split())[:80])
+
+    def get_value(self, doctype, filters=None, fieldname='name', as_dict=False, order_by=None,
+            for_update=False, cache=False, **kwargs):
+        meta = self.get_meta(doctype)
+        fields = [fieldname] if isinstance(fieldname, str) else list(fieldname)
+
+        if meta.issingle:
+            self.query_count += 1
+            row = self._single(doctype)
+        else:
+            rows = self.get_all(doctype, filters=_name_filter(filters), fields=fields,
+                order_by=order_by, limit=1)
+            row = rows[0] if rows else None
+
+        if row is None:
+            return None
+        if as_dict:
+            return frappe._dict({field: row.get(_alias(field)) for field in fields})
+        if isinstance(fieldname, str):
+            return row.get(_alias(fieldname))
+        return tuple(row.get(_alias(field)) for field in fields)
+
+    def get_values(self, doctype, filters=None, fieldname='name', as_dict=False, order_by=None,
+            for_update=False, **kwargs):
+        fields = [fieldname] if isinstance(fieldname, str) else list(fieldname)
+        rows = self.get_all(doctype, filters=_name_filter(filters), fields=fields, order_by=order_by)
+        if as_dict:
+            return [frappe._dict({field: row.get(_alias(field)) for field in fields}) for row in rows]
+        return [tuple(row.get(_alias(field)) for field in fields) for row in rows]
+
+    def get_single_value(self, doctype, fieldname):
+        return self.get_value(doctype, None, fieldname)
+
+    def set_value(self, doctype, name, fieldname, value=None, update_modified=True, **kwargs):
+        self.query_count += 1
+        values = fieldname if isinstance(fieldname, dict) else {fieldname: value}
+        values = dict(values)
+        if update_modified:
+            values['modified'] = now()
+
+        if self.get_meta(doctype).issingle:
+            self.singles[doctype].update(values)
+            return
+
+        for row in self._match(doctype, _name_filter(name)):
+            row.update(values)
+
+    def exists(self, doctype, name=None, **kwargs):
+        rows = self.get_all(doctype, filters=_name_filter(name), fields=['name'], limit=1)
+        return rows[0].name if rows else None
+
+    def count(self, doctype, filters=None, **kwargs):
+        self.query_count += 1
+        return len(list(self._match(doctype, filters)))
+
+    def bulk_insert(self, doctype, fields, values, ignore_duplicates=False, chunk_size=10000):
+        self.query_count += max(1, -(-len(values) // chunk_size))
+        for row in values:
+            self.insert_row(doctype, dict(zip(fields, row)))
+
+    def bulk_update(self, doctype, doc_updates, chunk_size=100, modified=None, modified_by=None,
+            update_modified=True, debug=False):
+        self.query_count += max(1, -(-len(doc_updates) // chunk_size))
+        for name, values in doc_updates.items():
+            values = dict(values)
+            if update_modified:
+                values['modified'] = modified or now()
+            for row in self._match(doctype, _name_filter(name)):
+                row.update(values)
+
+    def delete(self, doctype, filters=None):
+        self.query_count += 1
+        for row in list(self._match(doctype, filters)):
+            del self.tables[doctype][row.name]
+
+    def commit(self):
+        self.commits += 1
+        self.after_rollback.reset()
+        self.after_commit.run()
+
+    def rollback(self, save_point=None):
+        self.rollbacks += 1
+        if not save_point:
+            self.after_commit.reset()
+            self.after_rollback.run()
+
+    def savepoint(self, save_point):
+        pass
+
+    def add_index(self, doctype, fields, index_name=None):
+        pass
+
+    # frappe.get_all
+
+    def get_all(self, doctype, filters=None, fields=None, or_filters=None, order_by=None,
+            group_by=None, limit=None, limit_page_length=None, limit_start=0, pluck=None,
+            distinct=False, as_list=False, **kwargs):
+        self.query_count += 1
+        fields = [pluck] if pluck else (fields or ['name'])
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',')]
+
+        rows = self._match(doctype, filters, or_filters)
+        rows = self._join_children(doctype, rows, fields)
+
+        if order_by:
+            rows = _sort(rows, order_by)
+
+        if group_by or any(AGGREGATE.match(_expression(field)) for field in fields):
+            result = _aggregate(rows, fields, group_by)
+        else:
+            result = [frappe._dict({_alias(field): _read(row, field) for field in fields}) for row in rows]
+
+        if distinct:
+            unique = {}
+            for row in result:
+                unique.setdefault(tuple(row.values()), row)
+            result = list(unique.values())
+
+        start = int(limit_start or 0)
+        limit = limit or limit_page_length
+        result = result[start:start + int(limit)] if limit else result[start:]
+
+        if pluck:
+            return [row[_alias(pluck)] for row in result]
+        if as_list:
+            return [tuple(row.values()) for row in result]
+        return result
+
+    def _single(self, doctype):
+        values = dict(self.get_meta(doctype).defaults)
+        values.update(self.singles[doctype])
+        return frappe._dict(values, name=doctype, doctype=doctype)
+
+    def _match(self, doctype, filters=None, or_filters=None):
+        self.get_meta(doctype)
+        if isinstance(filters, str):
+            row = self.tables[doctype].get(filters)
+            return [row] if row else []
+
+        conditions = _conditions(filters)
+        alternatives = _conditions(or_filters)
+
+        # Primary key lookups do not scan the table
+        table = self.tables[doctype]
+        candidates = table.values()
+        for field, operator, value in conditions:
+            if field == 'name' and operator == '=':
+                candidates = [table[value]] if value in table else []
+                break
+            if field == 'name' and operator == 'in':
+                candidates = [table[key] for key in value if key in table]
+                break
+
+        return [
+            row for row in candidates
+            if all(_test(row, condition) for condition in conditions)
+            and (not alternatives or any(_test(row, condition) for condition in alternatives))
+        ]
+
+    def _join_children(self, doctype, rows, fields):
+        """Expand rows for `tabChild`.field columns, one row per child like a SQL join"""
+        children = {CHILD_FIELD.match(_expression(field)).group('doctype')
+            for field in fields if CHILD_FIELD.match(_expression(field))}
+        if not children:
+            return rows
+
+        for child in children:
+            by_parent = defaultdict(list)
+            for row in self.tables[child].values():
+                if row.get('parenttype') == doctype:
+                    by_parent[row.parent].append(row)
+
+            joined = []
+            for row in rows:
+                for child_row in by_parent.get(row.name, []):
+                    merged = frappe._dict(row)
+                    merged.update({f'`tab{child}`.{key}': value for key, value in child_row.items()})
+                    joined.append(merged)
+            rows = joined
+
+        return rows
+
+    # Documents
+
+    def load_doc(self, doctype, name):
+        """Parent row and child rows; one query per table, as frappe does"""
+        meta = self.get_meta(doctype)
+        self.query_count += 1
+        if meta.issingle:
+            return self._single(doctype), {}
+
+        row = self.tables[doctype].get(name)
+        if not row:
+            raise frappe.DoesNotExistError(f'{doctype} {name} not found')
+
+        children = {}
+        for fieldname, child_doctype in meta.tables.items():
+            self.query_count += 1
+            children[fieldname] = sorted(
+                (copy.copy(child) for child in self.tables[child_doctype].values()
+                    if child.get('parent') == name and child.get('parenttype') == doctype
+                    and child.get('parentfield', fieldname) == fieldname),
+                key=lambda child: child.get('idx') or 0
+            )
+
+        return copy.copy(row), children
+
+    def write_doc(self, doctype, values, children):
+        """Insert or update a document; one query per row, as frappe does"""
+        meta = self.get_meta(doctype)
+        self.query_count += 1
+        if meta.issingle:
+            self.singles[doctype].update(values)
+            return
+
+        self.tables[doctype][values['name']] = frappe._dict(values)
+
+        for fieldname, rows in children.items():
+            child_doctype = meta.tables[fieldname]
+            stale = [key for key, child in self.tables[child_doctype].items()
+                if child.get('parent') == values['name'] and child.get('parentfield', fieldname) == fieldname]
+            for key in stale:
+                del self.tables[child_doctype][key]
+            for row in rows:
+                self.query_count += 1
+                self.tables[child_doctype][row['name']] = frappe._dict(row)
+
+
+def _name_filter(filters):
+    if filters is None or isinstance(filters, (dict, list)):
+        return filters
+    return {'name': filters}
+
+
+def _conditions(filters):
+    """Normalise dict / list filters to (field, operator, value) tuples"""
+    if not filters or isinstance(filters, str):
+        return []
+
+    conditions = []
+    items = filters.items() if isinstance(filters, dict) else filters
+    for item in items:
+        if isinstance(filters, dict):
+            field, value = item
+            if isinstance(value, (list, tuple)):
+                operator, value = value[0], value[1] if len(value) > 1 else None
+            else:
+                operator = '='
+        elif len(item) == 4:
+            field, operator, value = item[1:]
+        else:
+            field, operator, value = item
+        operator = operator.lower()
+        if operator in ('in', 'not in'):
+            value = set(value.split(',') if isinstance(value, str) else value or ())
+        conditions.append((field, operator, value))
+
+    return conditions
+
+
+def _test(row, condition):
+    field, operator, value = condition
+    actual = row.get(field)
+
+    if operator == '=':
+        return actual == value
+    if operator == '!=':
+        return actual != value
+    if operator == 'in':
+        return actual in value
+    if operator == 'not in':
+        return actual not in value
+    if operator == 'is':
+        return bool(actual) if value == 'set' else not actual
+    if operator == 'like':
+        pattern = '^' + re.escape(value).replace('%', '.*') + '$'
+        return actual is not None and re.match(pattern, str(actual)) is not None
+
+    if actual is None:
+        return False
+    if operator == 'between':
+        # Like frappe, a date upper bound includes that whole day
+        low, high = (str(bound) for bound in value)
+        return low <= str(actual) and str(actual)[:len(high)] <= high
+    actual, value = _comparable(actual, value)
+    if operator == '>':
+        return actual > value
+    if operator == '<':
+        return actual < value
+    if operator == '>=':
+        return actual >= value
+    if operator == '<=':
+        return actual <= value
+
+    raise NotImplementedError(f'Filter operator {operator} is not emulated')
+
+
+def _comparable(actual, value):
+    if isinstance(actual, (int, float)) and not isinstance(value, (int, float)):
+        return actual, float(value)
+    if isinstance(value, (int, float)) and not isinstance(actual, (int, float)):
+        return float(actual), value
+    return str(actual), str(value)
+
+
+def _expression(field):
+    return re.split(r'\s+as\s+', field.strip(), flags=re.IGNORECASE)[0].strip()
+
+
+def _alias(field):
+    parts = re.split(r'\s+as\s+', field.strip(), flags=re.IGNORECASE)
+    if len(parts) == 2:
+        return parts[1].strip()
+    match = CHILD_FIELD.match(parts[0])
+    return match.group('field') if match else parts[0].strip('`')
+
+
+def _read(row, field):
+    expression = _expression(field)
+    if expression in row:
+        return row[expression]
+    return row.get(expression.strip('`'))
+
+
+def _sort(rows, order_by):
+    rows = list(rows)
+    # Stable sorts from the last key to the first, NULLs first like MariaDB
+    for part in reversed([part.strip() for part in order_by.split(',')]):
+        tokens = part.split()
+        field = tokens[0].split('.')[-1].strip('`')
+        reverse = len(tokens) > 1 and tokens[1].lower() == 'desc'
+        rows.sort(key=lambda row: (row.get(field) is not None, row.get(field)), reverse=reverse)
+    return rows
+
+
+def _aggregate(rows, fields, group_by):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(row.get(field.split('.')[-1].strip('` ')) for field in group_by.split(','))
+            if group_by else None].append(row)
+
+    result = []
+    for key, members in groups.items():
+        out = frappe._dict()
+        for field in fields:
+            match = AGGREGATE.match(_expression(field))
+            if not match:
+                out[_alias(field)] = members[0].get(_expression(field).strip('`'))
+                continue
+
+            func = match.group('func').lower()
+            column = match.group('field').strip('`')
+            values = [member.get(column) for member in members if column == '*' or member.get(column) is not None]
+            if func == 'count':
+                out[_alias(field)] = len(values)
+            elif func == 'sum':
+                out[_alias(field)] = sum(values or [0])
+            elif func == 'avg':
+                out[_alias(field)] = sum(values) / len(values) if values else None
+            else:
+                out[_alias(field)] = (min if func == 'min' else max)(values) if values else None
+        result.append(out)
+
+    return result
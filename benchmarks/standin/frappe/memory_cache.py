@@ -0,0 +1,228 @@
+"""
+In-memory stand-in for frappe.cache() (RedisWrapper)
+
+Like the real wrapper, get_value/set_value and hget/hset pickle values
+and prefix keys with make_key, while the raw Redis methods (hmget, hlen,
+pipeline, ...) take already prefixed keys and return bytes. Every call
+that would be a Redis round trip increments round_trips; value lookups
+also count hits and misses. Lua scripts are not emulated.
+"""
+
+import pickle
+import time
+from collections import defaultdict
+
+KEY_PREFIX = 'benchmark|'
+
+
+class Cache:
+    def __init__(self):
+        self.strings = {}
+        self.hashes = defaultdict(dict)
+        self.sorted_sets = defaultdict(dict)
+        self.expires = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.strings.clear()
+        self.hashes.clear()
+        self.sorted_sets.clear()
+        self.expires.clear()
+
+    def make_key(self, key, user=None, shared=False):
+        return f'{KEY_PREFIX}{key}'
+
+    def _lookup(self, found):
+        self.round_trips += 1
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # Wrapper methods (pickled values, unprefixed keys)
+
+    def get_value(self, key, generator=None, user=None, expires=False, shared=False):
+        raw = self.strings.get(self.make_key(key))
+        self._lookup(raw is not None)
+        if raw is not None:
+            return pickle.loads(raw)
+
+        if generator:
+            value = generator()
+            self.set_value(key, value)
+            return value
+
+    def set_value(self, key, val, user=None, expires_in_sec=None, shared=False):
+        self.round_trips += 1
+        self.strings[self.make_key(key)] = pickle.dumps(val)
+
+    def delete_value(self, keys, user=None, make_keys=True, shared=False):
+        self.round_trips += 1
+        for key in [keys] if isinstance(keys, str) else keys:
+            key = self.make_key(key) if make_keys else key
+            self.strings.pop(key, None)
+            self.hashes.pop(key, None)
+            self.sorted_sets.pop(key, None)
+
+    def hset(self, name, key, value, shared=False):
+        self.round_trips += 1
+        self.hashes[self.make_key(name)][key] = pickle.dumps(value)
+
+    def hget(self, name, key, generator=None, shared=False):
+        raw = self.hashes.get(self.make_key(name), {}).get(key)
+        self._lookup(raw is not None)
+        if raw is not None:
+            return pickle.loads(raw)
+
+        if generator:
+            value = generator()
+            self.hset(name, key, value)
+            return value
+
+    def hdel(self, name, key, shared=False):
+        self.round_trips += 1
+        self.hashes.get(self.make_key(name), {}).pop(key, None)
+
+    def hkeys(self, name):
+        self.round_trips += 1
+        return [key.encode() for key in self.hashes.get(self.make_key(name), {})]
+
+    def hgetall(self, name):
+        self.round_trips += 1
+        return {key: pickle.loads(raw) for key, raw in self.hashes.get(self.make_key(name), {}).items()}
+
+    # Raw Redis methods (prefixed keys, bytes)
+
+    def get(self, name):
+        self.round_trips += 1
+        self._expire(name)
+        value = self.strings.get(name)
+        return value if value is None or isinstance(value, bytes) else str(value).encode()
+
+    def mget(self, names):
+        self.round_trips += 1
+        values = []
+        for name in names:
+            self._expire(name)
+            value = self.strings.get(name)
+            values.append(value if value is None or isinstance(value, bytes) else str(value).encode())
+        return values
+
+    def hmget(self, name, keys):
+        self.round_trips += 1
+        stored = self.hashes.get(name, {})
+        values = [stored.get(key) for key in keys]
+        self.hits += sum(1 for value in values if value is not None)
+        self.misses += sum(1 for value in values if value is None)
+        return [_encode(value) for value in values]
+
+    def set(self, name, value, ex=None, nx=False):
+        self.round_trips += 1
+        self._expire(name)
+        if nx and name in self.strings:
+            return None
+        self.strings[name] = _encode(value)
+        self.expires[name] = time.monotonic() + ex if ex else None
+        return True
+
+    def _expire(self, name):
+        deadline = self.expires.get(name)
+        if deadline and deadline <= time.monotonic():
+            self.strings.pop(name, None)
+            del self.expires[name]
+
+    def hsetnx(self, name, key, value):
+        self.round_trips += 1
+        if key in self.hashes[name]:
+            return 0
+        self.hashes[name][key] = _encode(value)
+        return 1
+
+    def hlen(self, name):
+        self.round_trips += 1
+        return len(self.hashes.get(name, {}))
+
+    def expire(self, name, time):
+        self.round_trips += 1
+
+    def delete(self, *names):
+        self.round_trips += 1
+        for name in names:
+            self.strings.pop(name, None)
+            self.hashes.pop(name, None)
+            self.sorted_sets.pop(name, None)
+
+    def zadd(self, name, mapping):
+        self.round_trips += 1
+        self.sorted_sets[name].update(mapping)
+
+    def zrem(self, name, *members):
+        self.round_trips += 1
+        for member in members:
+            self.sorted_sets[name].pop(member, None)
+
+    def zrevrange(self, name, start, end):
+        self.round_trips += 1
+        members = sorted(self.sorted_sets.get(name, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member.encode() for member, score in members[start:end + 1 if end >= 0 else None]]
+
+    def pipeline(self):
+        return Pipeline(self)
+
+    def register_script(self, script):
+        def run(keys=None, args=None):
+            raise NotImplementedError('Lua scripts are not emulated by the benchmark stand-in')
+        return run
+
+
+class Pipeline:
+    """Queues raw commands and runs them as one round trip"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.commands = []
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        self.commands.append(lambda: self.cache.hashes[name].update(
+            {key: value} if mapping is None else mapping))
+        return self
+
+    def set(self, name, value, ex=None, nx=False):
+        self.commands.append(lambda: self.cache.set(name, value, ex=ex, nx=nx))
+        return self
+
+    def zadd(self, name, mapping):
+        self.commands.append(lambda: self.cache.sorted_sets[name].update(mapping))
+        return self
+
+    def hkeys(self, name):
+        self.commands.append(lambda: [key.encode() for key in self.cache.hashes.get(name, {})])
+        return self
+
+    def hdel(self, name, *keys):
+        self.commands.append(lambda: [self.cache.hashes[name].pop(key, None) for key in keys])
+        return self
+
+    def delete(self, *names):
+        self.commands.append(lambda: [self.cache.hashes.pop(name, None) for name in names])
+        return self
+
+    def expire(self, name, time):
+        return self
+
+    def execute(self):
+        self.cache.round_trips += 1
+        results = [command() for command in self.commands]
+        self.commands = []
+        return results
+
+
+def _encode(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    return str(value).encode()
@@ -0,0 +1,118 @@
+"""
+Stand-in for frappe.model.document.Document
+
+Fields are attributes, as in frappe: every field of the registered meta
+exists (None when unset) and anything else raises AttributeError, so
+hasattr() checks in the app behave the same. insert() and save() run
+the doc_events of the configured hooks module; controllers are not
+loaded.
+"""
+
+import frappe
+from frappe.utils import now
+
+SAVE_EVENTS = ('validate', 'before_save')
+INSERT_EVENTS = ('before_insert', 'validate', 'before_save')
+
+
+class Document:
+    def __init__(self, doctype, values=None, children=None):
+        self.doctype = doctype
+        self.meta = frappe.get_meta(doctype)
+        self._doc_before_save = None
+
+        for fieldname in self.meta.fieldnames:
+            setattr(self, fieldname, [] if fieldname in self.meta.tables else None)
+
+        for key, value in (values or {}).items():
+            if key not in self.meta.tables:
+                setattr(self, key, value)
+
+        for fieldname, rows in (children or {}).items():
+            setattr(self, fieldname, [
+                Document(self.meta.tables[fieldname], row) for row in rows
+            ])
+
+        self.docstatus = self.get('docstatus') or 0
+
+    def get(self, key, default=None):
+        return self.__dict__.get(key, default)
+
+    def set(self, key, value):
+        setattr(self, key, value)
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+        return self
+
+    def append(self, fieldname, values=None):
+        rows = getattr(self, fieldname)
+        row = Document(self.meta.tables[fieldname], values)
+        row.idx = len(rows) + 1
+        rows.append(row)
+        return row
+
+    def as_dict(self):
+        values = {
+            key: value for key, value in vars(self).items()
+            if not key.startswith('_') and key != 'meta' and key not in self.meta.tables
+        }
+        for fieldname in self.meta.tables:
+            values[fieldname] = [row.as_dict() for row in getattr(self, fieldname)]
+        return frappe._dict(values)
+
+    def reload(self):
+        fresh = frappe.get_doc(self.doctype, self.name)
+        self.__dict__.update({key: value for key, value in vars(fresh).items() if key != '_doc_before_save'})
+        return self
+
+    def get_doc_before_save(self):
+        return self._doc_before_save
+
+    def has_value_changed(self, fieldname):
+        previous = self.get_doc_before_save()
+        return previous.get(fieldname) != self.get(fieldname) if previous else True
+
+    def insert(self, ignore_permissions=False, **kwargs):
+        if not self.get('name'):
+            self.name = frappe.db.make_name(self.doctype)
+        self.creation = self.modified = now()
+
+        self.run_events(INSERT_EVENTS)
+        self._write()
+        self.run_events(('after_insert', 'on_update', 'on_change'))
+        return self
+
+    def save(self, ignore_permissions=False, **kwargs):
+        self._doc_before_save = frappe.get_doc(self.doctype, self.name) if not self.meta.issingle else None
+        self.modified = now()
+
+        self.run_events(SAVE_EVENTS)
+        self._write()
+        self.run_events(('on_update', 'on_change'))
+        return self
+
+    def run_events(self, events):
+        for event in events:
+            for handler in frappe.get_doc_hooks(self.doctype, event):
+                handler(self, event)
+
+    def _write(self):
+        children = {}
+        for fieldname in self.meta.tables:
+            children[fieldname] = []
+            for idx, row in enumerate(getattr(self, fieldname), 1):
+                if not row.get('name'):
+                    row.name = frappe.db.make_name(row.doctype)
+                row.update({
+                    'parent': self.name,
+                    'parenttype': self.doctype,
+                    'parentfield': fieldname,
+                    'idx': row.get('idx') or idx,
+                    'modified': self.modified
+                })
+                children[fieldname].append(row.as_dict())
+
+        values = {key: value for key, value in self.as_dict().items() if key not in self.meta.tables}
+        frappe.db.write_doc(self.doctype, values, children)
@@ -0,0 +1,9 @@
+"""Stand-in for frappe.realtime"""
+
+
+def get_doctype_room(doctype):
+    return f'doctype:{doctype}'
+
+
+def get_doc_room(doctype, docname):
+    return f'doc:{doctype}/{docname}'
@@ -0,0 +1,69 @@
+"""Stand-in for the parts of frappe.utils used by the app"""
+
+import datetime
+
+
+def cint(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def flt(value, precision=None):
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        number = 0.0
+    return round(number, precision) if precision is not None else number
+
+
+def cstr(value):
+    return '' if value is None else str(value)
+
+
+def now_datetime():
+    return datetime.datetime.now()
+
+
+def convert_utc_to_system_timezone(utc_timestamp):
+    # The stand-in's system time zone is the local one
+    return utc_timestamp.replace(tzinfo=datetime.timezone.utc).astimezone()
+
+
+def now():
+    return now_datetime().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+def nowdate():
+    return today()
+
+
+def getdate(value=None):
+    if not value:
+        return datetime.date.today()
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def get_datetime(value=None):
+    if not value:
+        return now_datetime()
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def add_days(date, days):
+    return getdate(date) + datetime.timedelta(days=days)
+
+
+def add_to_date(date, **kwargs):
+    return get_datetime(date) + datetime.timedelta(**kwargs)
@@ -5,8 +5,30 @@ Whitelisted methods for WMS functionality
 
 import frappe
 from frappe import _
+from frappe.utils import cint, flt
 import json
 
+from wms.availability import format_shortage, get_optimal_location, get_stock_shortages
+from wms.barcodes import resolve_barcode, resolve_barcodes as resolve_barcode_entries
+from wms.cartonization import get_delivery_note_packages
+from wms.dashboard import get_dashboard_data
+from wms.item_attributes import get_item_attributes
+from wms.delivery_notes import enqueue_delivery_notes
+from wms.dispatch import claim_next_task
+from wms.locks import acquire_lock, release_lock, renew_lock
+from wms.profiling import clear_profile, get_profile_stats, is_profiling_enabled
+from wms.progress import VersionConflictError, get_version, update_progress_rows
+from wms.progress_feed import publish_progress
+from wms.routing import estimate_pick_minutes, get_pick_list_route
+from wms.scan_events import (accept_scan_events, pack_event_values, pick_event_values, release_scan_events,
+    replay_scan_events as replay_queued_scan_events)
+from wms.scan_log import log_scan_events
+from wms.shipments import create_shipments
+from wms.slotting import create_transfer_stock_entry, enqueue_slotting_analysis
+from wms.waves import check_wave_complete, create_waves, get_active_wave, validate_wave_status
+from wms.zones import (ACTIVE_ZONE_TASK_STATUSES, complete_zone_task, create_zone_tasks, get_active_zone_tasks,
+    get_consolidation, get_zone_picking_estimate, get_zone_tasks, validate_zone_task_status)
+
 @frappe.whitelist()
 def get_wms_settings():
     """Get WMS settings"""
@@ -26,30 +48,16 @@ def get_wms_settings():
 def optimize_pick_route(pick_list):
     """
     Optimize the picking route for a pick list
-    Uses nearest-neighbor algorithm as a starting point
+    Sequences rows on the warehouse layout distance matrix
+    (nearest neighbour + 2-opt/Or-opt), see wms.routing
     """
     doc = frappe.get_doc('Pick List', pick_list)
 
     if not doc.locations:
         frappe.throw(_("No items to optimize"))
 
-    # Get warehouse layout (would need custom Warehouse Location master)
-    # For now, optimize by warehouse -> aisle -> bin
-    optimized_locations = []
-
-    # Group by warehouse
-    by_warehouse = {}
-    for loc in doc.locations:
-        wh = loc.warehouse
-        if wh not in by_warehouse:
-            by_warehouse[wh] = []
-        by_warehouse[wh].append(loc)
-
-    # Sort within each warehouse
-    for warehouse, items in by_warehouse.items():
-        # Sort by location code if available, otherwise by item_code
-        sorted_items = sorted(items, key=lambda x: x.get('location') or x.item_code)
-        optimized_locations.extend(sorted_items)
+    route = get_pick_list_route(pick_list, doc.locations)
+    optimized_locations = route['rows']
 
     # Update order in pick list
     for idx, loc in enumerate(optimized_locations, start=1):
@@ -60,7 +68,8 @@ def optimize_pick_route(pick_list):
     return {
         'success': True,
         'steps': len(optimized_locations),
-        'estimated_time': len(optimized_locations) * 0.5 + 2  # minutes
+        'distance': round(route['distance'], 1),  # meters
+        'estimated_time': estimate_pick_minutes(route['distance'], len(optimized_locations))
     }
 
 @frappe.whitelist()
@@ -75,72 +84,30 @@ def optimize_packing(delivery_note):
     Optimize packing for a delivery note
     Suggests optimal package arrangement
     """
-    doc = frappe.get_doc('Delivery Note', delivery_note)
+    items = frappe.get_all('Delivery Note Item',
+        filters={'parent': delivery_note, 'parenttype': 'Delivery Note'},
+        fields=['item_code', 'stock_qty as qty']
+    )
 
-    if not doc.items:
+    if not items:
         frappe.throw(_("No items to pack"))
 
-    # Simple bin packing algorithm
-    packages = []
-    current_package = {'items': [], 'weight': 0, 'volume': 0}
-
-    # Get settings
-    settings = frappe.get_cached_doc('WMS Settings', None)
-    max_weight = settings.max_package_weight if settings else 25  # kg
-    max_volume = settings.max_package_volume if settings else 0.1  # m³
-
-    for item in doc.items:
-        item_doc = frappe.get_cached_doc('Item', item.item_code)
-
-        item_weight = (item_doc.weight_per_unit or 0) * item.qty
-        item_volume = (item_doc.get('volume_per_unit') or 0) * item.qty
-
-        # Check if item fits in current package
-        if (current_package['weight'] + item_weight > max_weight or
-            current_package['volume'] + item_volume > max_volume):
-            # Start new package
-            if current_package['items']:
-                packages.append(current_package)
-
-            current_package = {'items': [], 'weight': 0, 'volume': 0}
-
-        current_package['items'].append({
-            'item_code': item.item_code,
-            'item_name': item.item_name,
-            'qty': item.qty
-        })
-        current_package['weight'] += item_weight
-        current_package['volume'] += item_volume
-
-    # Add last package
-    if current_package['items']:
-        packages.append(current_package)
+    # 3D first-fit-decreasing into the WMS Box Type catalog
+    packages = get_delivery_note_packages(delivery_note, items)
 
     return {
         'packages': packages,
-        'total_packages': len(packages)
+        'total_packages': len(packages),
+        'total_volume': flt(sum(pkg['box_volume'] for pkg in packages), 6)
     }
 
 @frappe.whitelist()
-def get_item_location(item_code, warehouse):
-    """Get optimal location for an item in a warehouse"""
-    # Check if we have a Bin with location
-    bins = frappe.get_all('Bin',
-        filters={
-            'item_code': item_code,
-            'warehouse': warehouse,
-            'actual_qty': ['>', 0]
-        },
-        fields=['warehouse', 'actual_qty'],
-        order_by='actual_qty desc',
-        limit=1
-    )
-
-    if bins:
-        # Would return specific location if Bin had location field
-        return bins[0].warehouse
-
-    return None
+def get_item_location(item_code, warehouse, qty=0):
+    """
+    Get optimal location for an item in a warehouse
+    The warehouse is a layout or storage warehouse; see wms.availability
+    """
+    return get_optimal_location(item_code, warehouse, flt(qty))
 
 @frappe.whitelist()
 def process_barcode_scan(barcode, stock_entry=None):
@@ -148,75 +115,103 @@ def process_barcode_scan(barcode, stock_entry=None):
     Process a barcode scan
     Returns item details
     """
-    # Try to find item by barcode
-    item = frappe.db.get_value('Item Barcode',
-        {'barcode': barcode},
-        ['parent as item_code', 'barcode'],
-        as_dict=True
-    )
-
-    if not item:
-        # Try direct item code match
-        item_exists = frappe.db.exists('Item', barcode)
-        if item_exists:
-            item = {'item_code': barcode, 'barcode': barcode}
+    # Barcodes and item codes are resolved from the in-memory index
+    item = resolve_barcode(barcode)
 
     if not item:
         frappe.throw(_("No item found for barcode: {0}").format(barcode))
 
-    # Get item details
-    item_doc = frappe.get_cached_doc('Item', item['item_code'])
+    item_code, item_name, stock_uom = item
 
     return {
-        'item_code': item_doc.name,
-        'item_name': item_doc.item_name,
+        'item_code': item_code,
+        'item_name': item_name,
         'qty': 1,
-        'uom': item_doc.stock_uom,
+        'uom': stock_uom,
         'barcode': barcode
     }
 
 @frappe.whitelist()
-def verify_stock_entry_locations(stock_entry):
-    """Verify all locations in a stock entry are valid"""
-    doc = frappe.get_doc('Stock Entry', stock_entry)
+def resolve_barcodes(barcodes):
+    """
+    Resolve a batch of scanned barcodes
+    Returns {barcode: item details, or None when unknown}
+    """
+    if isinstance(barcodes, str):
+        barcodes = json.loads(barcodes)
 
-    errors = []
+    resolved = {}
+    for barcode, item in resolve_barcode_entries(barcodes).items():
+        resolved[barcode] = {
+            'item_code': item[0],
+            'item_name': item[1],
+            'uom': item[2]
+        } if item else None
 
-    for item in doc.items:
-        # Verify source warehouse
-        if item.s_warehouse:
-            available = frappe.db.get_value('Bin', {
-                'item_code': item.item_code,
-                'warehouse': item.s_warehouse
-            }, 'actual_qty') or 0
-
-            if available < item.qty:
-                errors.append(_("Insufficient {0} in {1}").format(
-                    item.item_code, item.s_warehouse
-                ))
+    return resolved
+
+@frappe.whitelist()
+def verify_stock_entry_locations(stock_entry):
+    """
+    Verify all locations in a stock entry are valid
+    Rows drawing the same item from the same warehouse are checked together
+    """
+    doc = frappe.get_doc('Stock Entry', stock_entry)
+    shortages = get_stock_shortages(doc.items)
 
     return {
-        'valid': len(errors) == 0,
-        'errors': errors
+        'valid': not shortages,
+        'errors': [format_shortage(shortage) for shortage in shortages],
+        'shortages': shortages
     }
 
 @frappe.whitelist()
-def get_pick_list_details(pick_list):
-    """Get detailed information about a pick list"""
-    doc = frappe.get_doc('Pick List', pick_list)
+def get_pick_list_details(pick_list, version=None, since=None):
+    """
+    Get detailed information about a pick list
+
+    Pass version and synced_at from a previous response as version and
+    since: an unchanged pick list returns not_modified, otherwise only
+    rows modified after since are returned (delta).
+    """
+    doc = frappe.db.get_value('Pick List', pick_list,
+        ['name', 'status', 'wms_version'], as_dict=True)
+
+    if not doc:
+        frappe.throw(_("Pick List {0} not found").format(pick_list), frappe.DoesNotExistError)
+
+    current_version = cint(doc.wms_version)
+    if version not in (None, '') and cint(version) == current_version:
+        return {
+            'name': doc.name,
+            'version': current_version,
+            'not_modified': True
+        }
+
+    delta = bool(since) and version not in (None, '')
+
+    # Optional reference fields (custom fields or newer ERPNext versions)
+    meta = frappe.get_meta('Pick List Item')
+    fields = ['name', 'idx', 'item_code', 'item_name', 'qty', 'picked_qty', 'uom',
+        'warehouse', 'batch_no', 'sales_order', 'material_request', 'modified']
+    fields += [f for f in ('location', 'work_order', 'wms_box', 'wms_source_location') if meta.has_field(f)]
+
+    filters = {'parent': pick_list, 'parenttype': 'Pick List'}
+    if delta:
+        filters['modified'] = ['>', since]
+
+    locations = frappe.get_all('Pick List Item', filters=filters, fields=fields, order_by='idx')
+
+    # Prefetch item attributes and primary barcodes for all rows at once
+    item_codes = list({loc.item_code for loc in locations})
+    item_details = get_item_attributes(item_codes)
+    barcodes = get_item_barcodes(item_codes)
 
     items = []
-    for loc in doc.locations:
-        item_doc = frappe.get_cached_doc('Item', loc.item_code)
+    for loc in locations:
 
         # Determine order reference
-        order_ref = None
-        if loc.get('sales_order'):
-            order_ref = loc.sales_order
-        elif loc.get('material_request'):
-            order_ref = loc.material_request
-        elif loc.get('work_order'):
-            order_ref = loc.work_order
+        order_ref = loc.get('sales_order') or loc.get('material_request') or loc.get('work_order') or None
 
         items.append({
             'idx': loc.idx,
@@ -226,133 +221,153 @@ def get_pick_list_details(pick_list):
             'picked_qty': loc.get('picked_qty') or 0,
             'uom': loc.uom,
             'warehouse': loc.warehouse,
-            'location': loc.get('location') or '',
+            'location': loc.get('location') or loc.get('wms_source_location') or '',
             'batch_no': loc.get('batch_no') or '',
-            'has_batch_no': item_doc.has_batch_no or 0,
-            'image': item_doc.image,
-            'barcode': get_item_barcode(loc.item_code),
+            'has_batch_no': cint(item_details.get(loc.item_code, 'has_batch_no')),
+            'image': item_details.get(loc.item_code, 'image'),
+            'barcode': barcodes.get(loc.item_code) or loc.item_code,
             'order_ref': order_ref,
             'sales_order': loc.get('sales_order') or '',
             'material_request': loc.get('material_request') or '',
-            'work_order': loc.get('work_order') or ''
+            'work_order': loc.get('work_order') or '',
+            'box': loc.get('wms_box') or ''
         })
 
-    return {
+    synced_at = max([str(loc.modified) for loc in locations] + [since or ''])
+    total_items = frappe.db.count('Pick List Item', filters={
+        'parent': pick_list,
+        'parenttype': 'Pick List'
+    }) if delta else len(items)
+
+    details = {
         'name': doc.name,
         'status': doc.status,
+        'version': current_version,
+        'synced_at': synced_at,
+        'delta': delta,
         'items': items,
-        'total_items': len(items),
-        'total_qty': sum([item['qty'] for item in items])
+        'total_items': total_items
     }
 
+    if not delta:
+        details['total_qty'] = sum([item['qty'] for item in items])
+
+    return details
+
+def get_item_barcodes(item_codes):
+    """Primary (first) barcode for each item code"""
+    if not item_codes:
+        return {}
+
+    barcodes = {}
+    for row in frappe.get_all('Item Barcode',
+            filters={'parent': ['in', item_codes], 'parenttype': 'Item'},
+            fields=['parent', 'barcode'],
+            order_by='idx asc'):
+        barcodes.setdefault(row.parent, row.barcode)
+
+    return barcodes
+
 def get_item_barcode(item_code):
     """Get primary barcode for an item"""
-    barcode = frappe.db.get_value('Item Barcode',
-        {'parent': item_code},
-        'barcode',
-        order_by='idx'
-    )
-    return barcode or item_code
+    return get_item_barcodes([item_code]).get(item_code) or item_code
 
 @frappe.whitelist()
 def lock_pick_list(pick_list, session_id=None):
     """Lock a pick list for picking by current user"""
-    doc = frappe.get_doc('Pick List', pick_list)
+    wave = get_active_wave(pick_list)
+    if wave:
+        return {
+            'success': False,
+            'locked': True,
+            'wave': wave,
+            'message': _('This pick list is picked as part of wave {0}').format(wave)
+        }
 
-    # Check if already locked
-    if doc.get('wms_locked_by'):
-        # Check if lock is stale (older than 30 minutes)
-        if doc.get('wms_locked_at'):
-            from frappe.utils import get_datetime, now_datetime
-            lock_time = get_datetime(doc.wms_locked_at)
-            current_time = now_datetime()
-            minutes_diff = (current_time - lock_time).total_seconds() / 60
-
-            if minutes_diff < 30:
-                # Check if same session (same tab)
-                stored_session = doc.get('wms_session_id')
-                if stored_session and stored_session == session_id:
-                    # Same tab refreshing - allow
-                    doc.wms_locked_at = frappe.utils.now()
-                    doc.save(ignore_permissions=True)
-                    frappe.db.commit()
-                    return {
-                        'success': True,
-                        'locked': False,
-                        'message': 'Pick list locked successfully'
-                    }
-
-                # Lock is still valid and it's a different tab/user
-                locked_user = frappe.get_value('User', doc.wms_locked_by, 'full_name')
-                is_same_user = doc.wms_locked_by == frappe.session.user
-
-                return {
-                    'success': False,
-                    'locked': True,
-                    'locked_by': locked_user,
-                    'is_same_user': is_same_user,
-                    'message': _('This pick list is currently being picked by {0}').format(locked_user) if not is_same_user else _('This pick list is open in another tab')
-                }
-
-    # Lock the pick list
-    doc.wms_locked_by = frappe.session.user
-    doc.wms_locked_at = frappe.utils.now()
-    doc.wms_session_id = session_id
-    doc.save(ignore_permissions=True)
-    frappe.db.commit()
+    zone_tasks = get_active_zone_tasks(pick_list)
+    if zone_tasks:
+        return {
+            'success': False,
+            'locked': True,
+            'zone_tasks': zone_tasks,
+            'message': _('This pick list is picked by zone in {0}').format(', '.join(zone_tasks))
+        }
+
+    lock = acquire_lock('Pick List', pick_list, session_id)
+
+    if not lock.acquired:
+        # Lock is still valid and it's a different tab/user
+        locked_user = frappe.get_value('User', lock.locked_by, 'full_name') or lock.locked_by
+
+        return {
+            'success': False,
+            'locked': True,
+            'locked_by': locked_user,
+            'is_same_user': lock.is_same_user,
+            'message': _('This pick list is currently being picked by {0}').format(locked_user) if not lock.is_same_user else _('This pick list is open in another tab')
+        }
+
+    if lock.is_new:
+        frappe.db.commit()
 
     return {
         'success': True,
         'locked': False,
+        'heartbeat_interval': lock.ttl / 3,  # seconds
         'message': 'Pick list locked successfully'
     }
 
 @frappe.whitelist()
-def get_wms_dashboard_data():
-    """Get WMS dashboard statistics and open pick lists"""
-    from frappe.utils import today
-
-    # Get statistics
-    stats = {
-        'open_picks': frappe.db.count('Pick List', {'status': 'Open', 'docstatus': 0}),
-        'in_progress': frappe.db.count('Pick List', {'wms_locked_by': ['is', 'set']}),
-        'completed_today': frappe.db.count('Pick List', {
-            'status': 'Completed',
-            'modified': ['>=', today()]
-        })
+def get_next_task(task_type='Pick', warehouse=None):
+    """
+    Reserve the next pick or pack task for the current user, see wms.dispatch
+    Ranked by ship-by date, zone and distance from the user's last scan;
+    the page opened on the returned route takes the reservation over
+    """
+    task = claim_next_task(task_type, warehouse)
+    frappe.db.commit()
+
+    return {
+        'success': bool(task),
+        'task': task,
+        'message': None if task else _('No open {0} tasks').format(_(task_type).lower())
     }
 
-    # Get open pick lists
-    pick_lists = frappe.get_all('Pick List',
-        filters={'status': 'Open', 'docstatus': 0},
-        fields=['name', 'status', 'wms_locked_by', 'wms_locked_at', 'creation'],
-        order_by='creation desc',
-        limit=20
-    )
+@frappe.whitelist()
+def renew_document_lock(doctype, name, session_id=None):
+    """Heartbeat from the pick/pack pages to keep their lock alive"""
+    return {'success': renew_lock(doctype, name, session_id)}
 
-    # Add user names and item counts
-    for pick in pick_lists:
-        if pick.wms_locked_by:
-            pick['locked_by_name'] = frappe.get_value('User', pick.wms_locked_by, 'full_name')
+@frappe.whitelist()
+def get_wms_dashboard_data():
+    """
+    Get WMS dashboard statistics and open pick lists
+    Served from counters kept current by Pick List events (see wms.dashboard)
+    """
+    return get_dashboard_data()
 
-        # Count items
-        pick['total_items'] = frappe.db.count('Pick List Item', {'parent': pick.name})
+@frappe.whitelist()
+def get_wms_profile(method=None):
+    """Percentiles of the profiled WMS API calls (see wms.profiling)"""
+    frappe.only_for(('System Manager', 'Stock Manager'))
 
     return {
-        'stats': stats,
-        'pick_lists': pick_lists
+        'enabled': is_profiling_enabled(),
+        'methods': get_profile_stats(method)
     }
 
 @frappe.whitelist()
-def unlock_pick_list(pick_list):
-    """Unlock a pick list"""
-    doc = frappe.get_doc('Pick List', pick_list)
+def clear_wms_profile():
+    """Drop all recorded profiling samples"""
+    frappe.only_for(('System Manager', 'Stock Manager'))
+    clear_profile()
+    return {'success': True}
 
+@frappe.whitelist()
+def unlock_pick_list(pick_list, session_id=None):
+    """Unlock a pick list"""
     # Only unlock if locked by current user
-    if doc.get('wms_locked_by') == frappe.session.user:
-        doc.wms_locked_by = None
-        doc.wms_locked_at = None
-        doc.save(ignore_permissions=True)
+    if release_lock('Pick List', pick_list, session_id):
         frappe.db.commit()
 
         return {'success': True, 'message': 'Pick list unlocked'}
@@ -360,182 +375,557 @@ def unlock_pick_list(pick_list):
     return {'success': False, 'message': 'Not locked by you'}
 
 @frappe.whitelist()
-def update_pick_progress(pick_list, item_idx, picked_qty, location=None, batch_no=None, box=None):
+def update_pick_progress(pick_list, item_idx, picked_qty, location=None, batch_no=None, box=None, version=None):
     """Update picking progress for a specific item"""
-    doc = frappe.get_doc('Pick List', pick_list)
+    try:
+        new_version, missing = update_progress_rows('Pick List', pick_list,
+            [(item_idx, pick_event_values({
+                'picked_qty': picked_qty,
+                'location': location,
+                'batch_no': batch_no,
+                'box': box
+            }))],
+            expected_version=version
+        )
+    except VersionConflictError as e:
+        return _version_conflict('Pick List', pick_list, e)
+
+    if missing:
+        return {'success': False, 'message': 'Item not found in pick list'}
+
+    log_scan_events('Pick', [('Pick List', pick_list, item_idx, {
+        'picked_qty': picked_qty,
+        'location': location
+    })])
+    frappe.db.commit()
+    publish_progress('Pick List', pick_list)
 
-    # Find the location row by idx
-    for loc in doc.locations:
-        if loc.idx == int(item_idx):
-            # Update picked quantity (convert to float)
-            loc.picked_qty = float(picked_qty)
+    return {'success': True, 'version': new_version, 'message': 'Pick updated successfully'}
 
-            # Update location if scanned
-            if location:
-                loc.location = location
+@frappe.whitelist()
+def apply_pick_scan_events(pick_list, events, version=None):
+    """
+    Apply an ordered batch of pick confirmations in one transaction
 
-            # Update batch if scanned
-            if batch_no:
-                loc.batch_no = batch_no
+    Each event is a dict with key (idempotency key), item_idx, picked_qty
+    and optionally location, batch_no and box. Events whose key was
+    already applied are reported as duplicates and not applied again.
+    """
+    if isinstance(events, str):
+        events = json.loads(events)
 
-            # Add custom field for box tracking (if exists)
-            if box and hasattr(loc, 'wms_box'):
-                loc.wms_box = box
+    results, accepted = accept_scan_events('Pick List', pick_list, events)
 
-            # Save the document
-            doc.save(ignore_permissions=True)
-            frappe.db.commit()
+    new_version = None
+    if accepted:
+        try:
+            new_version, missing = update_progress_rows('Pick List', pick_list,
+                [(event.get('item_idx'), pick_event_values(event)) for event, result in accepted],
+                expected_version=version
+            )
+        except VersionConflictError as e:
+            return _version_conflict('Pick List', pick_list, e)
+
+        applied = []
+        for event, result in accepted:
+            if event.get('item_idx') in missing:
+                result.update({'status': 'error', 'message': 'Item not found in pick list'})
+            else:
+                applied.append(event)
+
+        log_scan_events('Pick', [('Pick List', pick_list, event.get('item_idx'), event) for event in applied])
+        frappe.db.commit()
+        release_scan_events('Pick List', pick_list,
+            [event for event, result in accepted if result['status'] != 'applied'])
 
-            # Publish realtime update
-            frappe.publish_realtime('pick_progress_updated', {
-                'pick_list': pick_list,
-                'item_idx': item_idx,
-                'picked_qty': picked_qty
-            }, user=frappe.session.user)
+        if applied:
+            publish_progress('Pick List', pick_list)
 
-            return {'success': True, 'message': 'Pick updated successfully'}
+    return {
+        'success': all(r['status'] != 'error' for r in results),
+        'version': new_version,
+        'results': results
+    }
+
+def _version_conflict(doctype, name, error):
+    """Response for a client that wrote against a stale document version"""
+    frappe.db.rollback()
+    return {
+        'success': False,
+        'conflict': True,
+        'version': get_version(doctype, name),
+        'message': str(error)
+    }
+
+@frappe.whitelist()
+def replay_scan_events(doctype, name, events, session_id=None):
+    """
+    Replay scans queued on a device while it was offline or busy
+    Applies them in order, skips retried keys and reports over-picks,
+    over-packs and locks taken over meanwhile as conflicts
+    """
+    if isinstance(events, str):
+        events = json.loads(events)
 
-    return {'success': False, 'message': 'Item not found in pick list'}
+    return replay_queued_scan_events(doctype, name, events, session_id)
 
 @frappe.whitelist()
 def create_delivery_notes_from_pick_list(pick_list):
     """
     Auto-create delivery notes grouped by sales order
-    Called when picking is complete
+    Called when picking is complete. The notes are created by a
+    background job that reports progress with the wms_delivery_note_progress event
     """
-    doc = frappe.get_doc('Pick List', pick_list)
-
-    if not doc.locations:
+    if not frappe.db.exists('Pick List Item', {'parent': pick_list, 'parenttype': 'Pick List'}):
         frappe.throw(_("No items in pick list"))
 
-    # Group items by sales_order
-    order_groups = {}
-    for loc in doc.locations:
-        # Get the sales order reference from location
-        order_ref = loc.get('sales_order') or 'NO_ORDER'
-
-        if order_ref not in order_groups:
-            order_groups[order_ref] = []
-        order_groups[order_ref].append(loc)
-
-    # Create delivery note per order
-    created_dns = []
-    for order_ref, items in order_groups.items():
-        # Skip material requests/work orders for now
-        if order_ref == 'NO_ORDER':
-            continue
+    orders = enqueue_delivery_notes(pick_list)
 
-        try:
-            dn = _create_delivery_note(doc, items, order_ref)
-            created_dns.append(dn.name)
-        except Exception as e:
-            frappe.log_error(f"Error creating delivery note for {order_ref}: {str(e)}")
-            frappe.throw(_("Failed to create delivery note for {0}: {1}").format(order_ref, str(e)))
+    return {
+        'success': bool(orders),
+        'queued': bool(orders),
+        'count': orders
+    }
+
+@frappe.whitelist()
+def create_pick_waves(warehouse, cut_off=None, max_orders=None, max_lines=None):
+    """
+    Merge open pick lists of a warehouse into routed waves
+    Pick lists are grouped by cut-off and location overlap, see wms.waves
+    """
+    waves = create_waves(warehouse, cut_off=cut_off, max_orders=max_orders, max_lines=max_lines)
+    frappe.db.commit()
+
+    return {
+        'success': True,
+        'waves': [{
+            'name': wave.name,
+            'pick_lists': len(wave.pick_lists),
+            'orders': wave.total_orders,
+            'lines': wave.total_lines,
+            'distance': wave.distance,  # meters
+            'estimated_time': estimate_pick_minutes(wave.distance, wave.total_lines)
+        } for wave in waves]
+    }
+
+@frappe.whitelist()
+def get_wave_details(wave):
+    """
+    Rows of a wave in route order, shaped like get_pick_list_details items
+    Each row also carries its pick list row (pick_list, pick_list_idx)
+    and the box of its order
+    """
+    doc = frappe.db.get_value('WMS Wave', wave, ['name', 'status', 'distance'], as_dict=True)
+
+    if not doc:
+        frappe.throw(_("Wave {0} not found").format(wave), frappe.DoesNotExistError)
+
+    return get_routed_pick_details(doc, 'WMS Wave Item', 'WMS Wave')
+
+@frappe.whitelist()
+def get_zone_task_details(zone_task):
+    """
+    Rows of a zone task in route order, shaped like get_wave_details
+    Also returns the other zone tasks of its pick list
+    """
+    doc = frappe.db.get_value('WMS Zone Task', zone_task,
+        ['name', 'status', 'distance', 'pick_list', 'zone', 'assigned_to'], as_dict=True)
+
+    if not doc:
+        frappe.throw(_("Zone Task {0} not found").format(zone_task), frappe.DoesNotExistError)
+
+    details = get_routed_pick_details(doc, 'WMS Zone Task Item', 'WMS Zone Task')
+    details.update({
+        'pick_list': doc.pick_list,
+        'zone': doc.zone,
+        'assigned_to': doc.assigned_to,
+        'zone_tasks': [task for task in get_zone_tasks(doc.pick_list) if task.name != doc.name]
+    })
+    return details
+
+def get_routed_pick_details(doc, child_doctype, parenttype):
+    """Routed rows of a wave or zone task with the progress of their pick list rows"""
+    rows = frappe.get_all(child_doctype,
+        filters={'parent': doc.name, 'parenttype': parenttype},
+        fields=['idx', 'pick_list', 'pick_list_item', 'pick_list_idx', 'item_code', 'item_name',
+            'qty', 'uom', 'warehouse', 'location', 'order_ref', 'box'],
+        order_by='idx')
+
+    # Progress lives on the pick list rows
+    picked = {
+        row.name: row for row in frappe.get_all('Pick List Item',
+            filters={'name': ['in', [row.pick_list_item for row in rows]]},
+            fields=['name', 'picked_qty', 'batch_no', 'sales_order', 'material_request'])
+    } if rows else {}
+
+    item_codes = list({row.item_code for row in rows})
+    item_details = get_item_attributes(item_codes)
+    barcodes = get_item_barcodes(item_codes)
+
+    items = []
+    for row in rows:
+        pick_row = picked.get(row.pick_list_item) or {}
+
+        items.append({
+            'idx': row.idx,
+            'pick_list': row.pick_list,
+            'pick_list_idx': row.pick_list_idx,
+            'item_code': row.item_code,
+            'item_name': row.item_name,
+            'qty': row.qty,
+            'picked_qty': pick_row.get('picked_qty') or 0,
+            'uom': row.uom,
+            'warehouse': row.warehouse,
+            'location': row.location or '',
+            'batch_no': pick_row.get('batch_no') or '',
+            'has_batch_no': cint(item_details.get(row.item_code, 'has_batch_no')),
+            'image': item_details.get(row.item_code, 'image'),
+            'barcode': barcodes.get(row.item_code) or row.item_code,
+            'order_ref': row.order_ref,
+            'sales_order': pick_row.get('sales_order') or '',
+            'material_request': pick_row.get('material_request') or '',
+            'box': row.box
+        })
+
+    return {
+        'name': doc.name,
+        'status': doc.status,
+        'distance': doc.distance,
+        'pick_lists': list(dict.fromkeys(row.pick_list for row in rows)),
+        'items': items,
+        'total_items': len(items),
+        'total_qty': sum([item['qty'] for item in items])
+    }
+
+@frappe.whitelist()
+def lock_wave(wave, session_id=None):
+    """Lock a wave for picking by current user"""
+    validate_wave_status(frappe.db.get_value('WMS Wave', wave, 'status'))
+
+    lock = acquire_lock('WMS Wave', wave, session_id)
+
+    if not lock.acquired:
+        locked_user = frappe.get_value('User', lock.locked_by, 'full_name') or lock.locked_by
+
+        return {
+            'success': False,
+            'locked': True,
+            'locked_by': locked_user,
+            'is_same_user': lock.is_same_user,
+            'message': _('This wave is currently being picked by {0}').format(locked_user) if not lock.is_same_user else _('This wave is open in another tab')
+        }
+
+    if lock.is_new:
+        frappe.db.commit()
 
     return {
         'success': True,
-        'delivery_notes': created_dns,
-        'count': len(created_dns)
+        'locked': False,
+        'heartbeat_interval': lock.ttl / 3,  # seconds
+        'message': 'Wave locked successfully'
     }
 
-def _create_delivery_note(pick_list_doc, location_items, sales_order_ref):
-    """
-    Helper function to create a delivery note from pick list items
-    """
-    # Get sales order to fetch customer and other details
-    sales_order = frappe.get_doc('Sales Order', sales_order_ref)
-
-    # Create new delivery note
-    dn = frappe.new_doc('Delivery Note')
-    dn.customer = sales_order.customer
-    dn.posting_date = frappe.utils.today()
-    dn.set_posting_time = 0
-
-    # Link to pick list
-    if hasattr(dn, 'pick_list'):
-        dn.pick_list = pick_list_doc.name
-
-    # Copy customer details from sales order
-    dn.customer_name = sales_order.customer_name
-    dn.contact_person = sales_order.contact_person
-    dn.contact_display = sales_order.contact_display
-    dn.contact_mobile = sales_order.contact_mobile
-    dn.contact_email = sales_order.contact_email
-    dn.shipping_address_name = sales_order.shipping_address_name
-    dn.shipping_address = sales_order.shipping_address
-    dn.dispatch_address_name = sales_order.dispatch_address_name
-    dn.dispatch_address = sales_order.dispatch_address
-    dn.company = sales_order.company
-
-    # Add items from pick list locations
-    for loc in location_items:
-        # Find corresponding item in sales order
-        so_item = None
-        for item in sales_order.items:
-            if item.item_code == loc.item_code:
-                so_item = item
-                break
-
-        if not so_item:
+@frappe.whitelist()
+def unlock_wave(wave, session_id=None):
+    """Unlock a wave"""
+    if release_lock('WMS Wave', wave, session_id):
+        frappe.db.commit()
+
+        return {'success': True, 'message': 'Wave unlocked'}
+
+    return {'success': False, 'message': 'Not locked by you'}
+
+@frappe.whitelist()
+def apply_wave_scan_events(wave, events):
+    """
+    Apply pick confirmations made while picking a wave
+    Like apply_pick_scan_events, but each event names the pick list row
+    (pick_list, pick_list_idx) it is stored on
+    """
+    if isinstance(events, str):
+        events = json.loads(events)
+
+    status = frappe.db.get_value('WMS Wave', wave, 'status')
+    validate_wave_status(status)
+
+    results, accepted = accept_scan_events('WMS Wave', wave, events)
+
+    pick_lists = set(frappe.get_all('WMS Wave Pick List',
+        filters={'parent': wave, 'parenttype': 'WMS Wave'},
+        pluck='pick_list'))
+
+    by_pick_list = {}
+    for event, result in accepted:
+        if event.get('pick_list') not in pick_lists:
+            result.update({'status': 'error', 'message': 'Pick list is not part of this wave'})
             continue
+        by_pick_list.setdefault(event['pick_list'], []).append((event, result))
+
+    applied = []
+    for pick_list, members in by_pick_list.items():
+        new_version, missing = update_progress_rows('Pick List', pick_list,
+            [(event.get('pick_list_idx'), pick_event_values(event)) for event, result in members])
+
+        for event, result in members:
+            if event.get('pick_list_idx') in missing:
+                result.update({'status': 'error', 'message': 'Item not found in pick list'})
+            else:
+                applied.append(event)
+
+    if applied:
+        if status == 'Open':
+            frappe.db.set_value('WMS Wave', wave, 'status', 'Picking')
+
+        log_scan_events('Pick', [
+            ('Pick List', event['pick_list'], event.get('pick_list_idx'), event) for event in applied
+        ])
+        frappe.db.commit()
+        publish_progress('WMS Wave', wave)
 
-        # Add item to delivery note
-        dn_item = dn.append('items', {})
-        dn_item.item_code = loc.item_code
-        dn_item.item_name = loc.item_name
-        dn_item.description = so_item.description
-        dn_item.qty = loc.picked_qty or loc.qty
-        dn_item.uom = loc.uom or loc.stock_uom
-        dn_item.stock_uom = loc.stock_uom
-        dn_item.conversion_factor = so_item.conversion_factor
-        dn_item.warehouse = loc.warehouse
-        dn_item.against_sales_order = sales_order_ref
-        dn_item.so_detail = so_item.name
+    release_scan_events('WMS Wave', wave, [event for event, result in accepted if result['status'] != 'applied'])
 
-        # Transfer box assignment from pick list
-        if hasattr(loc, 'wms_box') and loc.wms_box:
-            dn_item.wms_box = loc.wms_box
+    return {
+        'success': all(r['status'] != 'error' for r in results),
+        'results': results
+    }
 
-        # Initialize packed qty to 0
-        if hasattr(dn_item, 'wms_packed_qty'):
-            dn_item.wms_packed_qty = 0
+@frappe.whitelist()
+def create_delivery_notes_from_wave(wave):
+    """
+    Complete a fully picked wave and create the delivery notes of its pick lists
+    One background job per pick list, each reporting wms_delivery_note_progress
+    """
+    if not check_wave_complete(wave):
+        frappe.throw(_("Wave {0} is not fully picked yet").format(wave))
+
+    queued = []
+    count = 0
+    for pick_list in frappe.get_all('WMS Wave Pick List',
+            filters={'parent': wave, 'parenttype': 'WMS Wave'},
+            pluck='pick_list',
+            order_by='idx'):
+        orders = enqueue_delivery_notes(pick_list)
+        if orders:
+            queued.append(pick_list)
+            count += orders
 
-    # Save delivery note
-    dn.insert(ignore_permissions=True)
+    frappe.db.commit()
 
-    frappe.msgprint(_("Created Delivery Note {0} for {1}").format(dn.name, sales_order_ref))
+    return {
+        'success': bool(count),
+        'queued': bool(count),
+        'count': count,
+        'pick_lists': queued
+    }
 
-    return dn
+@frappe.whitelist()
+def split_pick_list_by_zone(pick_list):
+    """
+    Split a pick list into zone tasks picked in parallel, see wms.zones
+    Returns the tasks and the time to pick them in parallel against one picker
+    """
+    tasks = create_zone_tasks(pick_list)
+    frappe.db.commit()
+
+    estimate = get_zone_picking_estimate(pick_list, tasks)
+
+    return {
+        'success': bool(tasks),
+        'zone_tasks': [{
+            'name': task.name,
+            'zone': task.zone,
+            'assigned_to': task.assigned_to,
+            'lines': task.total_lines,
+            'distance': task.distance,  # meters
+            'estimated_time': task.estimated_minutes
+        } for task in tasks],
+        'estimated_time': estimate['parallel_minutes'],
+        'single_picker_time': estimate['single_picker_minutes'],
+        'message': None if tasks else _('All rows of {0} lie in one zone').format(pick_list)
+    }
 
 @frappe.whitelist()
-def get_unpacked_delivery_notes():
+def lock_zone_task(zone_task, session_id=None):
+    """Lock a zone task for picking by current user; tasks assigned to someone else are refused"""
+    task = frappe.db.get_value('WMS Zone Task', zone_task, ['status', 'assigned_to'], as_dict=True)
+
+    if not task:
+        frappe.throw(_("Zone Task {0} not found").format(zone_task), frappe.DoesNotExistError)
+
+    validate_zone_task_status(task.status)
+
+    if task.assigned_to and task.assigned_to != frappe.session.user:
+        assigned_user = frappe.get_value('User', task.assigned_to, 'full_name') or task.assigned_to
+
+        return {
+            'success': False,
+            'locked': True,
+            'locked_by': assigned_user,
+            'is_same_user': False,
+            'message': _('This zone task is assigned to {0}').format(assigned_user)
+        }
+
+    lock = acquire_lock('WMS Zone Task', zone_task, session_id)
+
+    if not lock.acquired:
+        locked_user = frappe.get_value('User', lock.locked_by, 'full_name') or lock.locked_by
+
+        return {
+            'success': False,
+            'locked': True,
+            'locked_by': locked_user,
+            'is_same_user': lock.is_same_user,
+            'message': _('This zone task is currently being picked by {0}').format(locked_user) if not lock.is_same_user else _('This zone task is open in another tab')
+        }
+
+    if lock.is_new:
+        # Unassigned tasks belong to whoever starts them
+        if not task.assigned_to:
+            frappe.db.set_value('WMS Zone Task', zone_task, 'assigned_to', frappe.session.user, update_modified=False)
+        frappe.db.commit()
+
+    return {
+        'success': True,
+        'locked': False,
+        'heartbeat_interval': lock.ttl / 3,  # seconds
+        'message': 'Zone task locked successfully'
+    }
+
+@frappe.whitelist()
+def unlock_zone_task(zone_task, session_id=None):
+    """Unlock a zone task"""
+    if release_lock('WMS Zone Task', zone_task, session_id):
+        frappe.db.commit()
+
+        return {'success': True, 'message': 'Zone task unlocked'}
+
+    return {'success': False, 'message': 'Not locked by you'}
+
+@frappe.whitelist()
+def create_delivery_notes_from_zone_task(zone_task):
+    """
+    Complete a fully picked zone task
+    The last zone of a pick list to finish consolidates it and creates its
+    delivery notes; earlier ones get the zone tasks still being picked
+    """
+    picked, consolidation = complete_zone_task(zone_task)
+    if not picked:
+        frappe.throw(_("Zone Task {0} is not fully picked yet").format(zone_task))
+
+    pick_list = frappe.db.get_value('WMS Zone Task', zone_task, 'pick_list')
+    if consolidation is None:
+        frappe.db.commit()
+
+        return {
+            'success': False,
+            'waiting': True,
+            'pick_list': pick_list,
+            'zone_tasks': get_zone_tasks(pick_list, ACTIVE_ZONE_TASK_STATUSES)
+        }
+
+    count = enqueue_delivery_notes(pick_list)
+    frappe.db.commit()
+
+    return {
+        'success': bool(count),
+        'queued': bool(count),
+        'count': count,
+        'pick_lists': [pick_list] if count else [],
+        'consolidation': consolidation
+    }
+
+@frappe.whitelist()
+def get_zone_consolidation(pick_list):
+    """Zone totes to merge per order of a zone-picked pick list"""
+    return {
+        'pick_list': pick_list,
+        'zone_tasks': get_zone_tasks(pick_list),
+        'orders': get_consolidation(pick_list)
+    }
+
+@frappe.whitelist()
+def run_slotting_analysis(analysis):
+    """
+    Queue a WMS Slotting Analysis; progress is reported as wms_slotting_progress
+    The analysis streams the pick history of its period, see wms.slotting
+    """
+    frappe.only_for(('System Manager', 'Stock Manager'))
+    if frappe.db.get_value('WMS Slotting Analysis', analysis, 'status') in ('Queued', 'Running'):
+        return {'success': False, 'message': _("The analysis is already running")}
+
+    enqueue_slotting_analysis(analysis)
+    frappe.db.commit()
+
+    return {'success': True, 'queued': True}
+
+@frappe.whitelist()
+def create_slotting_stock_entry(analysis):
+    """Draft Material Transfer Stock Entry for the recommended moves of an analysis"""
+    frappe.only_for(('System Manager', 'Stock Manager'))
+    entry = create_transfer_stock_entry(analysis)
+    frappe.db.commit()
+
+    return {
+        'success': True,
+        'stock_entry': entry.name,
+        'items': len(entry.items)
+    }
+
+@frappe.whitelist()
+def get_unpacked_delivery_notes(customer=None, pick_list=None, after=None, limit=20):
     """
     Get list of delivery notes ready for packing
-    Returns DNs that are draft or have unpacked items
+    Returns one page of DNs that are draft and not fully packed, newest
+    first. Pass the returned next_cursor as after to get the next page
     """
-    # Query delivery notes that have pick_list and are not fully packed
-    dns = frappe.db.sql("""
-        SELECT DISTINCT
+    conditions = ''
+    values = {'limit': min(cint(limit) or 20, 100)}
+
+    if customer:
+        conditions += ' AND dn.customer = %(customer)s'
+        values['customer'] = customer
+
+    if pick_list:
+        conditions += ' AND dn.pick_list = %(pick_list)s'
+        values['pick_list'] = pick_list
+
+    if after:
+        # Keyset pagination on (creation, name)
+        parts = str(after).split('|', 1)
+        if len(parts) != 2 or not all(parts):
+            frappe.throw(_("Invalid cursor {0}: expected the next_cursor of a previous page").format(after))
+        values['after_creation'], values['after_name'] = parts
+        conditions += """ AND (dn.creation < %(after_creation)s
+            OR (dn.creation = %(after_creation)s AND dn.name < %(after_name)s))"""
+
+    # The packed/total summary is maintained on the delivery note by wms.progress
+    dns = frappe.db.sql(f"""
+        SELECT
             dn.name,
             dn.customer,
             dn.customer_name,
             dn.posting_date,
             dn.pick_list,
-            COUNT(DISTINCT dni.name) as total_items,
-            SUM(dni.qty) as total_qty,
-            SUM(IFNULL(dni.wms_packed_qty, 0)) as packed_qty
+            dn.creation,
+            dn.wms_total_lines as total_items,
+            dn.total_qty,
+            dn.wms_total_packed_qty as packed_qty
         FROM `tabDelivery Note` dn
-        INNER JOIN `tabDelivery Note Item` dni ON dni.parent = dn.name
-        WHERE dn.docstatus = 0
-            AND dn.pick_list IS NOT NULL
-            AND dn.pick_list != ''
-            AND (dn.wms_packing_complete IS NULL OR dn.wms_packing_complete = 0)
-        GROUP BY dn.name
-        HAVING packed_qty < total_qty
-        ORDER BY dn.creation DESC
-    """, as_dict=True)
+        WHERE dn.wms_pack_pending = 1
+            AND dn.docstatus = 0
+            {conditions}
+        ORDER BY dn.creation DESC, dn.name DESC
+        LIMIT %(limit)s
+    """, values, as_dict=True)
 
-    return dns
+    next_cursor = None
+    if len(dns) == values['limit']:
+        next_cursor = f"{dns[-1].creation}|{dns[-1].name}"
+
+    return {
+        'delivery_notes': dns,
+        'next_cursor': next_cursor
+    }
 
 @frappe.whitelist()
 def get_delivery_note_details(delivery_note):
@@ -544,6 +934,7 @@ def get_delivery_note_details(delivery_note):
     Similar to get_pick_list_details
     """
     dn = frappe.get_doc('Delivery Note', delivery_note)
+    item_details = get_item_attributes([item.item_code for item in dn.items])
 
     items = []
     for item in dn.items:
@@ -558,7 +949,7 @@ def get_delivery_note_details(delivery_note):
             'wms_box': item.get('wms_box') or '',
             'wms_packed_qty': item.get('wms_packed_qty') or 0,
             'wms_package_no': item.get('wms_package_no') or '',
-            'image': frappe.db.get_value('Item', item.item_code, 'image')
+            'image': item_details.get(item.item_code, 'image')
         })
 
     return {
@@ -566,6 +957,7 @@ def get_delivery_note_details(delivery_note):
         'customer': dn.customer,
         'customer_name': dn.customer_name,
         'pick_list': dn.get('pick_list'),
+        'version': cint(dn.get('wms_version')),
         'items': items,
         'total_items': len(items)
     }
@@ -576,54 +968,32 @@ def lock_delivery_note(delivery_note, session_id=None):
     Lock a delivery note for packing by current user
     Similar to lock_pick_list
     """
-    doc = frappe.get_doc('Delivery Note', delivery_note)
+    lock = acquire_lock('Delivery Note', delivery_note, session_id)
+
+    if not lock.acquired:
+        # Different user or different session
+        return {
+            'success': False,
+            'locked_by': lock.locked_by,
+            'is_same_user': lock.is_same_user,
+            'message': f'This delivery note is being packed by {lock.locked_by}' if not lock.is_same_user
+                      else 'This delivery note is being packed in another tab'
+        }
+
+    if not lock.is_new:
+        # Same session, allow
+        return {'success': True, 'heartbeat_interval': lock.ttl / 3, 'message': 'Lock refreshed'}
 
-    # Check if already locked
-    if doc.get('wms_locked_by'):
-        locked_by = doc.wms_locked_by
-        locked_at = doc.wms_locked_at
-        locked_session = doc.get('wms_session_id')
-
-        # Check if lock is still valid (30 minutes)
-        if locked_at:
-            lock_age = frappe.utils.time_diff_in_seconds(frappe.utils.now(), locked_at)
-            if lock_age < 1800:  # 30 minutes
-                # Check if same session (tab refresh)
-                if session_id and locked_session == session_id:
-                    # Same session, allow
-                    return {'success': True, 'message': 'Lock refreshed'}
-
-                # Different user or different session
-                is_same_user = locked_by == frappe.session.user
-                return {
-                    'success': False,
-                    'locked_by': locked_by,
-                    'is_same_user': is_same_user,
-                    'message': f'This delivery note is being packed by {locked_by}' if not is_same_user
-                              else 'This delivery note is being packed in another tab'
-                }
-
-    # Lock is expired or doesn't exist, acquire lock
-    doc.wms_locked_by = frappe.session.user
-    doc.wms_locked_at = frappe.utils.now()
-    doc.wms_session_id = session_id
-    doc.save(ignore_permissions=True)
     frappe.db.commit()
 
-    return {'success': True, 'message': 'Delivery note locked successfully'}
+    return {'success': True, 'heartbeat_interval': lock.ttl / 3, 'message': 'Delivery note locked successfully'}
 
 @frappe.whitelist()
-def unlock_delivery_note(delivery_note):
+def unlock_delivery_note(delivery_note, session_id=None):
     """Unlock a delivery note"""
     try:
-        doc = frappe.get_doc('Delivery Note', delivery_note)
-
         # Only allow unlocking if locked by current user
-        if doc.get('wms_locked_by') == frappe.session.user:
-            doc.wms_locked_by = None
-            doc.wms_locked_at = None
-            doc.wms_session_id = None
-            doc.save(ignore_permissions=True)
+        if release_lock('Delivery Note', delivery_note, session_id):
             frappe.db.commit()
 
         return {'success': True}
@@ -632,33 +1002,27 @@ def unlock_delivery_note(delivery_note):
         return {'success': False, 'message': str(e)}
 
 @frappe.whitelist()
-def update_packing_progress(delivery_note, item_idx, packed_qty, package_no, weight=None):
+def update_packing_progress(delivery_note, item_idx, packed_qty, package_no, weight=None, version=None):
     """
     Update packing progress for a specific item
     Similar to update_pick_progress
     """
-    doc = frappe.get_doc('Delivery Note', delivery_note)
-
-    # Find item by idx
-    for item in doc.items:
-        if item.idx == int(item_idx):
-            item.wms_packed_qty = float(packed_qty)
-            if package_no:
-                item.wms_package_no = package_no
-
-            doc.save(ignore_permissions=True)
-            frappe.db.commit()
+    try:
+        new_version, missing = update_progress_rows('Delivery Note', delivery_note,
+            [(item_idx, pack_event_values({'packed_qty': packed_qty, 'package_no': package_no}))],
+            expected_version=version
+        )
+    except VersionConflictError as e:
+        return _version_conflict('Delivery Note', delivery_note, e)
 
-            # Publish realtime update
-            frappe.publish_realtime('pack_progress_updated', {
-                'delivery_note': delivery_note,
-                'item_idx': item_idx,
-                'packed_qty': packed_qty
-            }, user=frappe.session.user)
+    if missing:
+        return {'success': False, 'message': 'Item not found in delivery note'}
 
-            return {'success': True, 'message': 'Packing progress updated successfully'}
+    log_scan_events('Pack', [('Delivery Note', delivery_note, item_idx, {'packed_qty': packed_qty})])
+    frappe.db.commit()
+    publish_progress('Delivery Note', delivery_note)
 
-    return {'success': False, 'message': 'Item not found in delivery note'}
+    return {'success': True, 'version': new_version, 'message': 'Packing progress updated successfully'}
 
 @frappe.whitelist()
 def confirm_packing(delivery_note, packages):
@@ -694,60 +1058,59 @@ def create_shipment(delivery_note, packages, carrier=None, tracking_no=None, shi
     """
     Create WMS Shipment record linked to delivery note
     """
-    import json
-
     # Parse packages if it's a string
     if isinstance(packages, str):
         packages = json.loads(packages)
 
-    dn = frappe.get_doc('Delivery Note', delivery_note)
-
-    # Create shipment document
     try:
-        shipment = frappe.new_doc('WMS Shipment')
-        shipment.delivery_note = delivery_note
-        shipment.customer = dn.customer
-        shipment.shipment_date = shipment_date or frappe.utils.today()
-        shipment.carrier = carrier or ''
-        shipment.tracking_number = tracking_no or ''
-        shipment.status = 'Draft'
-        shipment.notes = notes or ''
-
-        # Calculate totals
-        total_weight = 0
-        total_packages = len(packages)
-
-        # Add packages
-        for pkg in packages:
-            package_row = shipment.append('packages', {})
-            package_row.package_no = pkg.get('package_no', '')
-            package_row.weight = pkg.get('weight', 0)
-            package_row.items_count = pkg.get('items_count', 0)
-            package_row.package_items = json.dumps(pkg.get('items', []))
-
-            total_weight += pkg.get('weight', 0)
-
-        shipment.total_weight = total_weight
-        shipment.total_packages = total_packages
-
-        shipment.insert(ignore_permissions=True)
+        result = create_shipments([{
+            'delivery_note': delivery_note,
+            'carrier': carrier,
+            'tracking_no': tracking_no,
+            'notes': notes,
+            'packages': packages
+        }], shipment_date=shipment_date, from_packed_rows=False)
         frappe.db.commit()
-
-        # Update delivery note with shipment link
-        if hasattr(dn, 'wms_shipment'):
-            dn.wms_shipment = shipment.name
-            dn.save(ignore_permissions=True)
-            frappe.db.commit()
-
-        return {
-            'success': True,
-            'shipment': shipment.name,
-            'message': f'Shipment {shipment.name} created successfully'
-        }
-
     except Exception as e:
+        frappe.db.rollback()
         frappe.log_error(f"Error creating shipment: {str(e)}")
         return {
             'success': False,
             'message': str(e)
         }
+
+    if result['errors']:
+        return {
+            'success': False,
+            'message': result['errors'][0]['message']
+        }
+
+    shipment = result['manifests'][0]['shipments'][0]['shipment']
+    return {
+        'success': True,
+        'shipment': shipment,
+        'message': f'Shipment {shipment} created successfully'
+    }
+
+@frappe.whitelist()
+def create_shipment_manifest(delivery_notes, carrier=None, shipment_date=None):
+    """
+    Create shipments for many packed delivery notes in one transaction
+    Returns one manifest per carrier; delivery notes that cannot ship are listed in errors
+    """
+    if isinstance(delivery_notes, str):
+        delivery_notes = json.loads(delivery_notes)
+
+    try:
+        result = create_shipments(delivery_notes, carrier=carrier, shipment_date=shipment_date)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title='WMS shipment manifest failed')
+        raise
+
+    return {
+        'success': not result['errors'],
+        'manifests': result['manifests'],
+        'errors': result['errors']
+    }
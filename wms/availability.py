@@ -0,0 +1,340 @@
+"""
+WMS Availability
+Per-warehouse index of where items are stocked, best location first
+
+For every warehouse layout a Redis hash maps item codes to the WMS
+Locations holding them: (location, storage warehouse, qty, stocked
+since, distance to packing, fill level). Entries are kept in suggestion
+order: FIFO age first (the day the location was last empty), then the
+round-trip walk from the packing location, then the fullest location.
+Suggesting a source location is a hash lookup; a whole document needs
+one round trip per layout.
+
+A layout's index is warmed on first use from Bin and the stock ledger.
+Stock Ledger Entry postings keep it current: once their transaction
+commits, the items it touched are re-read from Bin, so the index never
+drifts from committed stock.
+"""
+
+import pickle
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from wms.routing import get_packing_distances
+
+AVAILABILITY_INDEX = 'wms_availability:'  # + layout warehouse
+AVAILABILITY_READY = 'wms_availability_ready'
+STORAGE_LAYOUTS = 'wms_storage_layouts'
+
+# Entries written per Redis round trip while warming
+WARM_CHUNK_SIZE = 5000
+
+
+def get_optimal_location(item_code, warehouse, required_qty):
+    """Best stocked location of an item in a warehouse (layout or storage), or None"""
+    return get_optimal_locations([(item_code, warehouse, required_qty)])[0]
+
+
+def get_optimal_locations(requests):
+    """
+    Suggest source locations for many (item_code, warehouse, required_qty)
+
+    The warehouse is either a layout warehouse, to choose among all its
+    locations, or a storage warehouse, to find the location within it.
+    The first entry that covers the required qty wins, else the one with
+    the most stock. Returns one suggestion dict (or None) per request.
+    """
+    layouts = {warehouse: get_layout(warehouse) for item_code, warehouse, qty in requests}
+
+    entries = {}
+    for layout in set(layouts.values()) - {''}:
+        items = list({item_code for item_code, warehouse, qty in requests if layouts[warehouse] == layout})
+        entries.update({(layout, item_code): value for item_code, value in zip(items, get_entries(layout, items))})
+
+    suggestions = []
+    for item_code, warehouse, qty in requests:
+        layout = layouts[warehouse]
+        candidates = [
+            entry for entry in entries.get((layout, item_code)) or ()
+            if layout == warehouse or entry[1] == warehouse
+        ]
+        suggestions.append(choose_location(candidates, flt(qty)))
+
+    return suggestions
+
+
+def choose_location(entries, required_qty):
+    if not entries:
+        return None
+
+    entry = next((entry for entry in entries if entry[2] >= required_qty), None) \
+        or max(entries, key=lambda entry: entry[2])
+    location, warehouse, qty, since, distance, fill = entry
+
+    return {
+        'location': location,
+        'warehouse': warehouse,
+        'qty': qty,
+        'since': since,
+        'distance': distance,
+        'fill': fill
+    }
+
+
+def get_entries(layout, item_codes):
+    """Index entries of items in one round trip, warming the layout's index if needed"""
+    if not frappe.cache().hget(AVAILABILITY_READY, layout):
+        warm_availability_index(layout)
+
+    cache = frappe.cache()
+    values = cache.hmget(cache.make_key(AVAILABILITY_INDEX + layout), item_codes)
+
+    return [pickle.loads(value) if value else [] for value in values]
+
+
+def get_stock_shortages(rows):
+    """
+    Source rows whose combined demand exceeds the stock in their warehouse
+
+    rows: dicts or documents with idx, item_code, s_warehouse and qty
+    (transfer_qty, in stock UOM, when set). Demand is summed per (item,
+    warehouse) so rows sharing a bin are checked together, against one
+    Bin query for all pairs. Returns a shortage report, one entry per
+    short (item, warehouse), in row order.
+    """
+    demand = {}
+    for row in rows:
+        if not row.get('s_warehouse') or not row.get('item_code'):
+            continue
+
+        qty = flt(row.get('transfer_qty')) or flt(row.get('qty')) * (flt(row.get('conversion_factor')) or 1)
+        entry = demand.setdefault((row.get('item_code'), row.get('s_warehouse')), {'required': 0.0, 'rows': []})
+        entry['required'] += qty
+        entry['rows'].append(row.get('idx'))
+
+    if not demand:
+        return []
+
+    available = {
+        (row.item_code, row.warehouse): flt(row.actual_qty) for row in frappe.get_all('Bin',
+            filters={
+                'item_code': ['in', list({item_code for item_code, warehouse in demand})],
+                'warehouse': ['in', list({warehouse for item_code, warehouse in demand})]
+            },
+            fields=['item_code', 'warehouse', 'actual_qty'])
+    }
+
+    shortages = []
+    for (item_code, warehouse), entry in demand.items():
+        in_stock = available.get((item_code, warehouse), 0.0)
+        if flt(entry['required'] - in_stock, 6) > 0:
+            shortages.append({
+                'item_code': item_code,
+                'warehouse': warehouse,
+                'required': entry['required'],
+                'available': in_stock,
+                'shortage': entry['required'] - in_stock,
+                'rows': entry['rows']
+            })
+
+    return shortages
+
+
+def format_shortage(shortage):
+    """One line of a shortage report, for messages"""
+    return _("Row {0}: Insufficient quantity of {1} in {2}. Available: {3}, Required: {4}").format(
+        ', '.join(str(idx) for idx in shortage['rows']), shortage['item_code'], shortage['warehouse'],
+        shortage['available'], shortage['required'])
+
+
+def get_layout(warehouse):
+    """Layout warehouse of a storage or layout warehouse; '' when it has no WMS Locations"""
+    if not warehouse:
+        return ''
+
+    return frappe.cache().hget(STORAGE_LAYOUTS, warehouse, generator=lambda: _find_layout(warehouse))
+
+
+def _find_layout(warehouse):
+    return (frappe.db.get_value('WMS Location', {'storage_warehouse': warehouse}, 'warehouse')
+        or (warehouse if frappe.db.exists('WMS Location', {'warehouse': warehouse}) else ''))
+
+
+def warm_availability_index(layout):
+    """Load every stocked item of a layout into its index"""
+    entries = build_entries(layout)
+
+    cache = frappe.cache()
+    name = cache.make_key(AVAILABILITY_INDEX + layout)
+    items = list(entries.items())
+
+    pipe = cache.pipeline()
+    pipe.delete(name)
+    for start in range(0, len(items), WARM_CHUNK_SIZE):
+        chunk = items[start:start + WARM_CHUNK_SIZE]
+        pipe.hset(name, mapping={key: pickle.dumps(value) for key, value in chunk})
+    pipe.execute()
+
+    frappe.cache().hset(AVAILABILITY_READY, layout, 1)
+    return len(entries)
+
+
+def build_entries(layout, item_codes=None, stocked_since=None):
+    """
+    Index entries of a layout from Bin, for all items or just item_codes
+
+    stocked_since: {(item_code, storage warehouse): date} for locations
+    already known; others get it from the stock ledger.
+    """
+    locations = {
+        loc.storage_warehouse: loc for loc in frappe.get_all('WMS Location',
+            filters={'warehouse': layout, 'storage_warehouse': ['is', 'set']},
+            fields=['name', 'storage_warehouse', 'capacity'],
+            order_by='name')
+    }
+    if not locations:
+        return {}
+
+    filters = {'warehouse': ['in', list(locations)], 'actual_qty': ['>', 0]}
+    if item_codes is not None:
+        filters['item_code'] = ['in', list(item_codes)]
+
+    bins = frappe.get_all('Bin', filters=filters, fields=['item_code', 'warehouse', 'actual_qty'])
+
+    stocked_since = dict(stocked_since or {})
+    missing = {(row.item_code, row.warehouse) for row in bins} - set(stocked_since)
+    if missing:
+        stocked_since.update(get_stocked_since(
+            list({warehouse for item_code, warehouse in missing}),
+            list({item_code for item_code, warehouse in missing}) if item_codes is not None else None
+        ))
+
+    distances = get_packing_distances(layout)
+
+    entries = {item_code: [] for item_code in item_codes or ()}
+    for row in bins:
+        loc = locations[row.warehouse]
+        entries.setdefault(row.item_code, []).append((
+            loc.name,
+            row.warehouse,
+            row.actual_qty,
+            str(stocked_since.get((row.item_code, row.warehouse)) or ''),
+            round(distances.get(loc.name, 0.0), 1),
+            round(row.actual_qty / loc.capacity, 3) if loc.capacity else None
+        ))
+
+    for rows in entries.values():
+        rows.sort(key=_entry_order)
+
+    return entries
+
+
+def _entry_order(entry):
+    location, warehouse, qty, since, distance, fill = entry
+    return (since, distance, -(fill or 0), -qty, location)
+
+
+def get_stocked_since(warehouses, item_codes=None):
+    """
+    The day each (item, warehouse) was last empty, else its first posting
+
+    Two grouped stock ledger queries; the oldest stock of a location is
+    at most as old as this, which is what FIFO ordering needs.
+    """
+    filters = {'warehouse': ['in', warehouses], 'is_cancelled': 0}
+    if item_codes is not None:
+        filters['item_code'] = ['in', item_codes]
+
+    since = {
+        (row.item_code, row.warehouse): row.posting_date for row in frappe.get_all('Stock Ledger Entry',
+            filters=filters,
+            fields=['item_code', 'warehouse', 'min(posting_date) as posting_date'],
+            group_by='item_code, warehouse')
+    }
+    for row in frappe.get_all('Stock Ledger Entry',
+            filters=dict(filters, qty_after_transaction=['<=', 0]),
+            fields=['item_code', 'warehouse', 'max(posting_date) as posting_date'],
+            group_by='item_code, warehouse'):
+        since[(row.item_code, row.warehouse)] = row.posting_date
+
+    return since
+
+
+def queue_availability_update(sle):
+    """Re-index the item of a stock ledger posting once its transaction commits"""
+    layout = get_layout(sle.warehouse)
+    if not layout:
+        return
+
+    pending = getattr(frappe.local, 'wms_availability_pending', None)
+    if pending is None:
+        pending = frappe.local.wms_availability_pending = {}
+        frappe.db.after_commit.add(flush_availability_updates)
+        frappe.db.after_rollback.add(discard_availability_updates)
+
+    key = (layout, sle.item_code, sle.warehouse)
+    pending[key] = min(pending.get(key) or str(sle.posting_date), str(sle.posting_date))
+
+
+def flush_availability_updates():
+    pending = getattr(frappe.local, 'wms_availability_pending', None) or {}
+    frappe.local.wms_availability_pending = None
+
+    by_layout = {}
+    for (layout, item_code, warehouse), posting_date in pending.items():
+        by_layout.setdefault(layout, {})[(item_code, warehouse)] = posting_date
+
+    for layout, postings in by_layout.items():
+        update_availability(layout, postings)
+
+
+def discard_availability_updates():
+    frappe.local.wms_availability_pending = None
+
+
+def update_availability(layout, postings):
+    """
+    Rewrite the index entries of the items posted to a layout
+
+    postings: {(item_code, storage warehouse): posting date}. A location
+    that was already stocked keeps its stocked-since date; one that was
+    empty is stocked since the posting.
+    """
+    if not frappe.cache().hget(AVAILABILITY_READY, layout):
+        # Not warmed yet; the warm-up reads current stock anyway
+        return
+
+    item_codes = list({item_code for item_code, warehouse in postings})
+    stocked_since = dict(postings)
+    for item_code, rows in zip(item_codes, get_entries(layout, item_codes)):
+        for location, warehouse, qty, since, distance, fill in rows:
+            stocked_since[(item_code, warehouse)] = since
+
+    entries = build_entries(layout, item_codes, stocked_since)
+
+    cache = frappe.cache()
+    name = cache.make_key(AVAILABILITY_INDEX + layout)
+    pipe = cache.pipeline()
+    for item_code, rows in entries.items():
+        if rows:
+            pipe.hset(name, item_code, pickle.dumps(rows))
+        else:
+            pipe.hdel(name, item_code)
+    pipe.execute()
+
+
+def invalidate_availability_index(layout=None):
+    """Forget a layout's index (or all of them); it is warmed again on the next lookup"""
+    cache = frappe.cache()
+    layouts = [layout] if layout else [
+        frappe.safe_decode(key) for key in cache.hkeys(AVAILABILITY_READY)
+    ]
+
+    if layouts:
+        cache.delete(*[cache.make_key(AVAILABILITY_INDEX + name) for name in layouts])
+        for name in layouts:
+            cache.hdel(AVAILABILITY_READY, name)
+
+    cache.delete_value(STORAGE_LAYOUTS)
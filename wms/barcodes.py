@@ -0,0 +1,107 @@
+"""
+WMS Barcodes
+Barcode -> item index kept in Redis
+
+Every Item Barcode and every item code maps to (item_code, item_name,
+stock_uom). The index is warmed in bulk on first use and kept current
+by the Item doc events in wms.events.item, so resolving a scan is a
+single hash lookup without touching the database.
+"""
+
+import pickle
+
+import frappe
+
+BARCODE_INDEX = 'wms_barcode_index'
+BARCODE_INDEX_READY = 'wms_barcode_index_ready'
+
+# Entries written per Redis round trip while warming
+WARM_CHUNK_SIZE = 5000
+
+
+def resolve_barcode(barcode):
+    """Return (item_code, item_name, stock_uom) for a barcode or item code, or None"""
+    entry = frappe.cache().hget(BARCODE_INDEX, barcode)
+    if entry is None and not frappe.cache().get_value(BARCODE_INDEX_READY):
+        warm_barcode_index()
+        entry = frappe.cache().hget(BARCODE_INDEX, barcode)
+
+    return entry
+
+
+def resolve_barcodes(barcodes):
+    """Resolve many barcodes in one round trip: {barcode: entry or None}"""
+    barcodes = list(dict.fromkeys(barcodes))
+    if not barcodes:
+        return {}
+
+    if not frappe.cache().get_value(BARCODE_INDEX_READY):
+        warm_barcode_index()
+
+    cache = frappe.cache()
+    values = cache.hmget(cache.make_key(BARCODE_INDEX), barcodes)
+
+    return {
+        barcode: pickle.loads(value) if value else None
+        for barcode, value in zip(barcodes, values)
+    }
+
+
+def warm_barcode_index():
+    """Load every item code and barcode into the index"""
+    entries = {}
+
+    for item in frappe.get_all('Item', fields=['name', 'item_name', 'stock_uom']):
+        entries[item.name] = (item.name, item.item_name, item.stock_uom)
+
+    for row in frappe.get_all('Item Barcode',
+            filters={'parenttype': 'Item'},
+            fields=['barcode', 'parent']):
+        if row.parent in entries:
+            entries[row.barcode] = entries[row.parent]
+
+    _write_entries(entries)
+    frappe.cache().set_value(BARCODE_INDEX_READY, 1)
+
+    return len(entries)
+
+
+def index_item(doc):
+    """Refresh the index entries of one Item after it was saved"""
+    entry = (doc.name, doc.item_name, doc.stock_uom)
+    barcodes = {row.barcode for row in doc.get('barcodes') or [] if row.barcode}
+
+    previous = doc.get_doc_before_save()
+    if previous:
+        stale = {row.barcode for row in previous.get('barcodes') or [] if row.barcode}
+        remove_barcodes(stale - barcodes)
+
+    _write_entries({barcode: entry for barcode in barcodes | {doc.name}})
+
+
+def remove_barcodes(barcodes):
+    """Drop barcodes (or item codes) from the index"""
+    for barcode in barcodes:
+        frappe.cache().hdel(BARCODE_INDEX, barcode)
+
+
+def clear_barcode_index():
+    """Forget the whole index; it is warmed again on the next scan"""
+    frappe.cache().delete_value([BARCODE_INDEX, BARCODE_INDEX_READY])
+
+
+def _write_entries(entries):
+    cache = frappe.cache()
+    name = cache.make_key(BARCODE_INDEX)
+    items = list(entries.items())
+
+    pipe = cache.pipeline()
+    for start in range(0, len(items), WARM_CHUNK_SIZE):
+        chunk = items[start:start + WARM_CHUNK_SIZE]
+        pipe.hset(name, mapping={key: pickle.dumps(value) for key, value in chunk})
+    pipe.execute()
+
+    # hget keeps request-local copies; drop them so this request sees the new values
+    local_cache = getattr(frappe.local, 'cache', None)
+    if local_cache:
+        local_cache.pop(name, None)
@@ -0,0 +1,399 @@
+"""
+WMS Cartonization
+3D packing of order lines into boxes from the WMS Box Type catalog
+
+Lines are packed first-fit-decreasing by unit volume. The free space of
+a box is kept as disjoint cuboids (guillotine cuts), and identical units
+are placed as whole blocks in the orientation that fits most of them, so
+a line of a thousand units costs a handful of placements. New boxes are
+opened with the largest box type to keep the box count down; afterwards
+every box is moved to the smallest box type its contents still fit in.
+"""
+
+import itertools
+import math
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from wms.item_attributes import get_item_attributes
+
+BOX_CATALOG = 'wms_box_catalog'
+
+# Planned packages per delivery note, see get_delivery_note_packages
+PACKING_PLAN_CACHE = 'wms_packing_plans'
+
+# Item fields a packing plan depends on
+PACK_ITEM_FIELDS = ('weight_per_unit', 'volume_per_unit', 'wms_length', 'wms_width', 'wms_height')
+
+# Used when WMS Settings leaves the package limits empty
+DEFAULT_MAX_WEIGHT = 25  # kg
+DEFAULT_MAX_VOLUME = 0.1  # m³
+
+# Tolerance for float dimensions (cm)
+EPSILON = 1e-6
+
+
+class BoxType:
+    """A box from the catalog; dimensions in cm, weights in kg"""
+
+    __slots__ = ('name', 'dims', 'outer_dims', 'volume', 'tare', 'capacity')
+
+    def __init__(self, name, dims, outer_dims=None, tare=0, max_weight=0):
+        self.name = name
+        self.dims = tuple(dims)
+        self.outer_dims = tuple(outer_dims) if outer_dims and all(outer_dims) else self.dims
+        self.volume = dims[0] * dims[1] * dims[2]
+        self.tare = tare
+        # Weight the contents may add; unlimited without a max weight
+        self.capacity = max_weight - tare if max_weight else math.inf
+
+    def fits(self, line):
+        """Whether a single unit of the line fits in an empty box"""
+        if line.weight > self.capacity:
+            return False
+        if line.dims is None:
+            return True
+        return any(_fits(self.dims, orientation) for orientation in line.orientations)
+
+
+class PackLine:
+    """All units of one item; dimensions in cm, weight per unit in kg"""
+
+    __slots__ = ('item_code', 'item_name', 'qty', 'weight', 'dims', 'sorted_dims', 'volume', 'orientations')
+
+    def __init__(self, item_code, item_name, qty, weight=0, dims=None):
+        self.item_code = item_code
+        self.item_name = item_name
+        self.qty = qty
+        self.weight = weight
+        # Items without dimensions only count towards the weight limit
+        self.dims = tuple(dims) if dims and all(dims) else None
+        self.sorted_dims = tuple(sorted(self.dims)) if self.dims else ()
+        self.volume = self.dims[0] * self.dims[1] * self.dims[2] if self.dims else 0
+        self.orientations = tuple(set(itertools.permutations(self.dims))) if self.dims else ()
+
+
+class Carton:
+    """
+    A box being filled
+
+    Free spaces are (dims, volume, sorted dims) tuples. Spaces with a side
+    shorter than min_side cannot hold any unit and are dropped.
+    """
+
+    __slots__ = ('box_type', 'spaces', 'largest_space', 'min_side', 'contents', 'weight', 'volume')
+
+    def __init__(self, box_type, min_side=0):
+        self.box_type = box_type
+        self.spaces = [_space(box_type.dims)]
+        self.largest_space = box_type.volume
+        self.min_side = min_side
+        self.contents = {}
+        self.weight = 0
+        self.volume = 0
+
+    def add(self, line, qty):
+        self.contents[line] = self.contents.get(line, 0) + qty
+        self.weight += line.weight * qty
+        self.volume += line.volume * qty
+
+
+def cartonize(lines, box_types):
+    """
+    Pack lines into as few and as small boxes as possible
+
+    Returns a list of Carton. Units that fit no box type are shipped one
+    per carton in a box type of their own size (name None).
+    """
+    lines = sorted((line for line in lines if line.qty > 0),
+        key=lambda line: (line.volume, line.weight), reverse=True)
+    by_size = sorted(box_types, key=lambda box_type: box_type.volume)
+    min_side = min((line.sorted_dims[0] for line in lines if line.dims), default=0)
+    cartons = []
+    open_cartons = []
+    oversize = []
+
+    # Smallest unit volume among the lines still to come
+    smallest = [0] * len(lines)
+    for i in range(len(lines) - 1, -1, -1):
+        smallest[i] = min(lines[i].volume, smallest[i + 1]) if i + 1 < len(lines) else lines[i].volume
+
+    for i, line in enumerate(lines):
+        remaining = line.qty
+
+        # Boxes without room for any remaining unit are not searched again
+        open_cartons = [carton for carton in open_cartons if carton.largest_space + EPSILON >= smallest[i]]
+
+        # First fit into the boxes already open
+        for carton in open_cartons:
+            if not remaining:
+                break
+            if carton.largest_space + EPSILON < line.volume:
+                continue
+            remaining -= place_units(carton, line, remaining)
+
+        while remaining:
+            box_type = next((box_type for box_type in reversed(by_size) if box_type.fits(line)), None)
+            if not box_type:
+                # Ships in its own packaging, one unit per package
+                carton = Carton(BoxType(None, line.dims or (0, 0, 0)))
+                carton.add(line, 1)
+                oversize.append(carton)
+                remaining -= 1
+                continue
+
+            carton = Carton(box_type, min_side)
+            remaining -= place_units(carton, line, remaining)
+            cartons.append(carton)
+            open_cartons.append(carton)
+
+    return [downsize(carton, by_size) for carton in cartons] + oversize
+
+
+def place_units(carton, line, qty):
+    """Place up to qty units of a line in a carton; returns how many were placed"""
+    limit = qty
+    if line.weight > 0:
+        limit = min(qty, int((carton.box_type.capacity - carton.weight) / line.weight + EPSILON))
+
+    if line.dims is None or limit <= 0:
+        placed = max(limit, 0)
+    else:
+        placed = 0
+        while placed < limit:
+            fit = _best_fit(carton.spaces, line, limit - placed)
+            if not fit:
+                break
+
+            index, block, count = fit
+            carton.spaces[index:index + 1] = _split(carton.spaces[index][0], block, carton.min_side)
+            placed += count
+
+        carton.largest_space = max((space[1] for space in carton.spaces), default=0)
+
+    if placed:
+        carton.add(line, placed)
+
+    return placed
+
+
+def downsize(carton, by_size):
+    """Move a carton's contents to the smallest box type they fit in"""
+    for box_type in by_size:
+        if box_type.volume >= carton.box_type.volume:
+            break
+        if box_type.volume < carton.volume or box_type.capacity < carton.weight:
+            continue
+
+        trial = Carton(box_type, carton.min_side)
+        if all(place_units(trial, line, qty) == qty for line, qty in carton.contents.items()):
+            return trial
+
+    return carton
+
+
+def _best_fit(spaces, line, wanted):
+    """
+    Find the space and orientation that take the most units
+
+    Ties go to the smallest space, keeping large spaces free for large
+    items. Returns (space index, block dimensions, unit count) or None.
+    """
+    best = None
+    best_key = None
+
+    small, mid, large = line.sorted_dims
+
+    for index, (space, space_volume, sorted_space) in enumerate(spaces):
+        # A unit fits in some orientation only if its sorted sides do
+        if (space_volume + EPSILON < line.volume or sorted_space[0] + EPSILON < small
+                or sorted_space[1] + EPSILON < mid or sorted_space[2] + EPSILON < large):
+            continue
+
+        for orientation in line.orientations:
+            nx = int(space[0] / orientation[0] + EPSILON)
+            ny = int(space[1] / orientation[1] + EPSILON)
+            nz = int(space[2] / orientation[2] + EPSILON)
+            fit = nx * ny * nz
+            if not fit:
+                continue
+
+            key = (min(fit, wanted), -space_volume)
+            if best_key is None or key > best_key:
+                best_key = key
+                best = (index, orientation, (nx, ny, nz))
+
+    if not best:
+        return None
+
+    index, orientation, (nx, ny, nz) = best
+    count = best_key[0]
+
+    # Full layers first; the remainder is placed by later calls
+    if count >= nx * ny * nz:
+        shape = (nx, ny, nz)
+    elif count >= nx * ny:
+        shape = (nx, ny, count // (nx * ny))
+    elif count >= nx:
+        shape = (nx, count // nx, 1)
+    else:
+        shape = (count, 1, 1)
+
+    block = tuple(unit * n for unit, n in zip(orientation, shape))
+    return index, block, shape[0] * shape[1] * shape[2]
+
+
+def _split(space, block, min_side=0):
+    """
+    Free spaces left after placing a block in the corner of a space
+
+    The three pieces are disjoint. Of the two ways to cut the floor the
+    one leaving the larger single piece is used, as it wastes less.
+    """
+    length, width, height = space
+    l, w, h = block
+
+    along_length = [(length - l, width, height), (l, width - w, height)]
+    along_width = [(length, width - w, height), (length - l, w, height)]
+    pieces = max(along_length, along_width, key=lambda cut: max(p[0] * p[1] * p[2] for p in cut))
+    pieces = pieces + [(l, w, height - h)]
+
+    return [_space(piece) for piece in pieces if min(piece) > EPSILON and min(piece) + EPSILON >= min_side]
+
+
+def _space(dims):
+    return dims, dims[0] * dims[1] * dims[2], tuple(sorted(dims))
+
+
+def _fits(space, dims):
+    return all(side + EPSILON >= unit for side, unit in zip(space, dims))
+
+
+def plan_packages(items, item_details=None):
+    """
+    Cartonize order rows (dicts with item_code and qty)
+
+    Returns package dicts with the box type, its dimensions (cm), gross
+    weight (kg), content and shipped volume (m³) and the items.
+    """
+    lines = get_pack_lines(items, item_details)
+    packages = []
+
+    for carton in cartonize(lines, get_box_types()):
+        box_type = carton.box_type
+        length, width, height = box_type.outer_dims
+
+        packages.append({
+            'box_type': box_type.name,
+            'length': flt(length, 2),
+            'width': flt(width, 2),
+            'height': flt(height, 2),
+            'weight': flt(box_type.tare + carton.weight, 3),
+            'volume': flt(carton.volume / 1e6, 6),
+            'box_volume': flt(length * width * height / 1e6, 6),
+            'fill': flt(100 * carton.volume / box_type.volume, 1) if box_type.volume else 0,
+            'items': [{
+                'item_code': line.item_code,
+                'item_name': line.item_name,
+                'qty': qty
+            } for line, qty in carton.contents.items()]
+        })
+
+    return packages
+
+
+def get_delivery_note_packages(delivery_note, items, item_details=None):
+    """
+    plan_packages for the items of a delivery note, cached per delivery note
+
+    The cached plan is used as long as the delivery note has the same
+    items and quantities; wms.tasks plans draft delivery notes ahead of
+    time. Box catalog and item dimension changes drop all plans.
+    """
+    cache = frappe.cache()
+    signature = sorted((row.get('item_code'), flt(row.get('qty'))) for row in items)
+
+    cached = cache.hget(PACKING_PLAN_CACHE, delivery_note)
+    if cached and cached['signature'] == signature:
+        return cached['packages']
+
+    packages = plan_packages(items, item_details)
+    cache.hset(PACKING_PLAN_CACHE, delivery_note, {'signature': signature, 'packages': packages})
+    return packages
+
+
+def clear_packing_plans():
+    frappe.cache().delete_value(PACKING_PLAN_CACHE)
+
+
+def get_pack_lines(items, item_details=None):
+    """
+    One PackLine per item code, with dimensions from the Item master
+
+    item_details: a wms.item_attributes store holding the items, to plan
+    many packages with one lookup. Items that are not in the store cannot
+    be planned and raise instead of being left out of the packages.
+    """
+    qty_by_item = {}
+    for row in items:
+        qty_by_item[row.get('item_code')] = qty_by_item.get(row.get('item_code'), 0) + flt(row.get('qty'))
+
+    if item_details is None:
+        item_details = get_item_attributes(qty_by_item)
+
+    unknown = [str(item_code) for item_code in qty_by_item if item_code not in item_details]
+    if unknown:
+        frappe.throw(_("Items {0} are not in the Item master and cannot be packed").format(', '.join(unknown)))
+
+    lines = []
+    for item_code, qty in qty_by_item.items():
+        item = item_details.row(item_code)
+
+        dims = (item.wms_length, item.wms_width, item.wms_height)
+        if not all(dims) and item.volume_per_unit:
+            # Only a volume is known: treat the unit as a cube
+            side = (item.volume_per_unit * 1e6) ** (1 / 3)
+            dims = (side, side, side)
+
+        lines.append(PackLine(item_code, item.item_name,
+            math.ceil(qty - EPSILON),
+            item.weight_per_unit, dims))
+
+    return lines
+
+
+def get_box_types():
+    """Enabled box types, or one box sized from WMS Settings when the catalog is empty"""
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    default_max_weight = flt(settings.get('max_package_weight')) or DEFAULT_MAX_WEIGHT
+
+    catalog = frappe.cache().get_value(BOX_CATALOG, generator=_load_box_catalog)
+    box_types = [
+        BoxType(box.name,
+            (box.inner_length, box.inner_width, box.inner_height),
+            (box.outer_length, box.outer_width, box.outer_height),
+            flt(box.tare_weight),
+            flt(box.max_weight) or default_max_weight)
+        for box in catalog
+    ]
+
+    if not box_types:
+        side = (flt(settings.get('max_package_volume')) or DEFAULT_MAX_VOLUME) ** (1 / 3) * 100
+        box_types.append(BoxType(None, (side, side, side), max_weight=default_max_weight))
+
+    return box_types
+
+
+def _load_box_catalog():
+    return frappe.get_all('WMS Box Type',
+        filters={'enabled': 1},
+        fields=['name', 'inner_length', 'inner_width', 'inner_height',
+            'outer_length', 'outer_width', 'outer_height', 'tare_weight', 'max_weight']
+    )
+
+
+def clear_box_catalog():
+    frappe.cache().delete_value(BOX_CATALOG)
+    clear_packing_plans()
@@ -0,0 +1,217 @@
+"""
+WMS Dashboard
+Dashboard counters maintained incrementally from Pick List events
+
+Counters and open pick list summaries live in Redis. Every Pick List
+change (doc events and lock calls) updates them in O(1) and pushes the
+change to everyone subscribed to the Pick List doctype room, so the
+dashboard page never polls. Open pick lists are also kept in a sorted
+set by creation, so a read fetches only the newest DASHBOARD_LIST_LIMIT
+summaries.
+"""
+
+import pickle
+
+import frappe
+from frappe.realtime import get_doctype_room
+from frappe.utils import get_datetime, today
+
+DASHBOARD_COUNTS = 'wms_dashboard_counts'
+DASHBOARD_FLAGS = 'wms_dashboard_flags'
+DASHBOARD_PICK_LISTS = 'wms_dashboard_pick_lists'
+DASHBOARD_RECENT = 'wms_dashboard_recent'  # raw sorted set, open pick lists by creation
+DASHBOARD_COMPLETED = 'wms_dashboard_completed:'
+DASHBOARD_READY = 'wms_dashboard_ready'
+
+DASHBOARD_EVENT = 'wms_dashboard_update'
+DASHBOARD_LIST_LIMIT = 20
+
+# Completed-today sets are kept a little longer than a day
+COMPLETED_TTL = 2 * 24 * 60 * 60
+
+# Atomically swap the stored flags of one pick list and apply the
+# difference to the counters, so concurrent events cannot double count
+UPDATE_FLAGS_SCRIPT = """
+local old = redis.call('HGET', KEYS[1], ARGV[1]) or '00'
+local new = ARGV[2]
+if old ~= new then
+    local d_open = tonumber(string.sub(new, 1, 1)) - tonumber(string.sub(old, 1, 1))
+    local d_locked = tonumber(string.sub(new, 2, 2)) - tonumber(string.sub(old, 2, 2))
+    if d_open ~= 0 then redis.call('HINCRBY', KEYS[2], 'open_picks', d_open) end
+    if d_locked ~= 0 then redis.call('HINCRBY', KEYS[2], 'in_progress', d_locked) end
+    if new == '00' then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    else
+        redis.call('HSET', KEYS[1], ARGV[1], new)
+    end
+end
+return old
+"""
+
+
+def get_dashboard_data():
+    """Stats and the most recent open pick lists, read from the cache"""
+    ensure_dashboard()
+
+    cache = frappe.cache()
+    names = cache.zrevrange(cache.make_key(DASHBOARD_RECENT), 0, DASHBOARD_LIST_LIMIT - 1)
+    summaries = cache.hmget(cache.make_key(DASHBOARD_PICK_LISTS),
+        [frappe.safe_decode(name) for name in names]) if names else []
+
+    return {
+        'stats': get_stats(),
+        'pick_lists': [pickle.loads(summary) for summary in summaries if summary]
+    }
+
+
+def get_stats():
+    # Counters are plain Redis integers (HINCRBY), not pickled cache values
+    cache = frappe.cache()
+    open_picks, in_progress = cache.hmget(cache.make_key(DASHBOARD_COUNTS),
+        ['open_picks', 'in_progress'])
+
+    return {
+        'open_picks': int(open_picks or 0),
+        'in_progress': int(in_progress or 0),
+        'completed_today': cache.hlen(cache.make_key(DASHBOARD_COMPLETED + today()))
+    }
+
+
+def track_pick_list(doc, deleted=False, total_items=None):
+    """
+    Bring the dashboard in line with the current state of a pick list
+
+    Idempotent: the counters only move when the pick list's stored
+    open/locked flags change, so calling it twice is harmless.
+    """
+    if not frappe.cache().get_value(DASHBOARD_READY):
+        # Counters are rebuilt from the database on the next read
+        return
+
+    is_open = not deleted and doc.status == 'Open' and doc.docstatus == 0
+    is_locked = not deleted and bool(doc.get('wms_locked_by'))
+
+    cache = frappe.cache()
+    update_flags = cache.register_script(UPDATE_FLAGS_SCRIPT)
+    update_flags(
+        keys=[cache.make_key(DASHBOARD_FLAGS), cache.make_key(DASHBOARD_COUNTS)],
+        args=[doc.name, f'{int(is_open)}{int(is_locked)}']
+    )
+
+    completed = DASHBOARD_COMPLETED + today()
+    if not deleted and doc.status == 'Completed':
+        cache.hset(completed, doc.name, 1)
+        cache.expire(cache.make_key(completed), COMPLETED_TTL)
+    else:
+        cache.hdel(completed, doc.name)
+
+    summary = None
+    if is_open:
+        summary = get_pick_list_summary(doc, total_items=total_items)
+        cache.hset(DASHBOARD_PICK_LISTS, doc.name, summary)
+        cache.zadd(cache.make_key(DASHBOARD_RECENT), {doc.name: _creation_score(doc)})
+    else:
+        cache.hdel(DASHBOARD_PICK_LISTS, doc.name)
+        cache.zrem(cache.make_key(DASHBOARD_RECENT), doc.name)
+
+    frappe.publish_realtime(DASHBOARD_EVENT, {
+        'stats': get_stats(),
+        'name': doc.name,
+        'pick_list': summary
+    }, room=get_doctype_room('Pick List'), after_commit=True)
+
+
+def track_pick_list_row(pick_list):
+    """Track a pick list changed without doc events (e.g. lock calls)"""
+    if not frappe.cache().get_value(DASHBOARD_READY):
+        return
+
+    doc = frappe.db.get_value('Pick List', pick_list,
+        ['name', 'status', 'docstatus', 'wms_locked_by', 'wms_locked_at', 'creation'],
+        as_dict=True)
+    if not doc:
+        return
+
+    cached = frappe.cache().hget(DASHBOARD_PICK_LISTS, pick_list)
+    total_items = cached.total_items if cached else frappe.db.count('Pick List Item',
+        {'parent': pick_list, 'parenttype': 'Pick List'})
+
+    track_pick_list(doc, total_items=total_items)
+
+
+def get_pick_list_summary(doc, total_items=None):
+    """The row shown for a pick list in the dashboard list"""
+    summary = frappe._dict({
+        'name': doc.name,
+        'status': doc.status,
+        'wms_locked_by': doc.get('wms_locked_by'),
+        'wms_locked_at': doc.get('wms_locked_at'),
+        'creation': doc.creation,
+        'total_items': total_items if total_items is not None else len(doc.get('locations') or [])
+    })
+
+    if summary.wms_locked_by:
+        summary.locked_by_name = frappe.get_cached_value('User', summary.wms_locked_by, 'full_name')
+
+    return summary
+
+
+def _creation_score(doc):
+    return get_datetime(doc.creation).timestamp()
+
+
+def ensure_dashboard():
+    if not frappe.cache().get_value(DASHBOARD_READY):
+        rebuild_dashboard()
+
+
+def rebuild_dashboard():
+    """Recompute all counters and summaries from the database"""
+    cache = frappe.cache()
+    completed = DASHBOARD_COMPLETED + today()
+    cache.delete_value([DASHBOARD_COUNTS, DASHBOARD_FLAGS, DASHBOARD_PICK_LISTS, DASHBOARD_RECENT, completed])
+
+    tracked = frappe.get_all('Pick List',
+        or_filters={'status': 'Open', 'wms_locked_by': ['is', 'set']},
+        fields=['name', 'status', 'docstatus', 'wms_locked_by', 'wms_locked_at', 'creation']
+    )
+
+    open_names = [pick.name for pick in tracked if pick.status == 'Open' and pick.docstatus == 0]
+    item_counts = dict(frappe.get_all('Pick List Item',
+        filters={'parent': ['in', open_names], 'parenttype': 'Pick List'},
+        fields=['parent', 'count(name) as total_items'],
+        group_by='parent',
+        as_list=True
+    )) if open_names else {}
+
+    flags = {}
+    recent = {}
+    counts = {'open_picks': 0, 'in_progress': 0}
+    for pick in tracked:
+        is_open = pick.status == 'Open' and pick.docstatus == 0
+        is_locked = bool(pick.wms_locked_by)
+        counts['open_picks'] += int(is_open)
+        counts['in_progress'] += int(is_locked)
+        flags[pick.name] = f'{int(is_open)}{int(is_locked)}'
+
+        if is_open:
+            cache.hset(DASHBOARD_PICK_LISTS, pick.name,
+                get_pick_list_summary(pick, total_items=item_counts.get(pick.name, 0)))
+            recent[pick.name] = _creation_score(pick)
+
+    # Flags and counters are read by the Lua script, so they are written raw
+    pipe = cache.pipeline()
+    if flags:
+        pipe.hset(cache.make_key(DASHBOARD_FLAGS), mapping=flags)
+    if recent:
+        pipe.zadd(cache.make_key(DASHBOARD_RECENT), recent)
+    pipe.hset(cache.make_key(DASHBOARD_COUNTS), mapping=counts)
+    pipe.execute()
+
+    for name in frappe.get_all('Pick List',
+            filters={'status': 'Completed', 'modified': ['>=', today()]},
+            pluck='name'):
+        cache.hset(completed, name, 1)
+    cache.expire(cache.make_key(completed), COMPLETED_TTL)
+
+    cache.set_value(DASHBOARD_READY, 1)
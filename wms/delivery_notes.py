@@ -0,0 +1,202 @@
+"""
+WMS Delivery Notes
+Bulk delivery note generation from a completed pick list
+
+Runs as a background job: a wave-sized pick list can cover hundreds of
+sales orders. Sales orders and their lines are fetched in two queries
+and indexed, delivery notes are inserted one savepoint per order and
+committed in batches, and progress is pushed to the user over realtime.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import today
+
+PROGRESS_EVENT = 'wms_delivery_note_progress'
+
+# Delivery notes inserted between commits and progress updates
+COMMIT_BATCH_SIZE = 20
+
+JOB_TIMEOUT = 60 * 60
+
+SALES_ORDER_FIELDS = [
+    'name', 'customer', 'customer_name', 'company',
+    'contact_person', 'contact_display', 'contact_mobile', 'contact_email',
+    'shipping_address_name', 'shipping_address', 'dispatch_address_name', 'dispatch_address'
+]
+
+
+def enqueue_delivery_notes(pick_list):
+    """
+    Start creating the delivery notes of a pick list in the background
+
+    Returns the number of sales orders to deliver. A job already running
+    for the same pick list is not started twice.
+    """
+    orders = {
+        row.sales_order for row in frappe.get_all('Pick List Item',
+            filters={'parent': pick_list, 'parenttype': 'Pick List', 'sales_order': ['is', 'set']},
+            fields=['sales_order'])
+    }
+
+    if orders:
+        frappe.enqueue('wms.delivery_notes.create_delivery_notes',
+            queue='long',
+            timeout=JOB_TIMEOUT,
+            job_id=f'wms_delivery_notes::{pick_list}',
+            deduplicate=True,
+            enqueue_after_commit=True,
+            pick_list=pick_list,
+            user=frappe.session.user
+        )
+
+    return len(orders)
+
+
+def create_delivery_notes(pick_list, user=None):
+    """
+    Create one delivery note per sales order of a pick list
+
+    Orders that already have an active delivery note from this pick list
+    are skipped, so the job can safely be run again after a failure.
+    """
+    user = user or frappe.session.user
+    locations = get_order_locations(pick_list)
+    delivered = get_delivered_orders(pick_list)
+
+    groups = {}
+    for loc in locations:
+        if loc.sales_order not in delivered:
+            groups.setdefault(loc.sales_order, []).append(loc)
+
+    sales_orders, so_items = get_sales_orders(list(groups))
+    total = len(groups)
+    created = []
+    failed = []
+
+    _publish_progress(user, pick_list, 'Running', 0, total)
+
+    for done, (order_ref, items) in enumerate(groups.items(), 1):
+        frappe.db.savepoint('wms_delivery_note')
+        try:
+            if order_ref not in sales_orders:
+                frappe.throw(_("Sales Order {0} not found").format(order_ref), frappe.DoesNotExistError)
+
+            dn = build_delivery_note(pick_list, items, sales_orders[order_ref], so_items.get(order_ref, {}))
+            if dn.items:
+                dn.insert(ignore_permissions=True)
+                created.append(dn.name)
+        except Exception as e:
+            frappe.db.rollback(save_point='wms_delivery_note')
+            frappe.log_error(title=f"Error creating delivery note for {order_ref}")
+            failed.append({'sales_order': order_ref, 'message': str(e)})
+
+        if done % COMMIT_BATCH_SIZE == 0:
+            frappe.db.commit()
+            _publish_progress(user, pick_list, 'Running', done, total)
+
+    frappe.db.commit()
+    _publish_progress(user, pick_list, 'Failed' if failed and not created else 'Completed', total, total,
+        delivery_notes=created, failed=failed)
+
+    return {'delivery_notes': created, 'failed': failed}
+
+
+def get_order_locations(pick_list):
+    return frappe.get_all('Pick List Item',
+        filters={'parent': pick_list, 'parenttype': 'Pick List', 'sales_order': ['is', 'set']},
+        fields=['item_code', 'item_name', 'qty', 'picked_qty', 'uom', 'stock_uom', 'warehouse',
+            'sales_order', 'sales_order_item', 'wms_box'],
+        order_by='idx'
+    )
+
+
+def get_delivered_orders(pick_list):
+    """Sales orders that already have a draft or submitted delivery note from this pick list"""
+    rows = frappe.get_all('Delivery Note',
+        filters={'pick_list': pick_list, 'docstatus': ['<', 2]},
+        fields=['`tabDelivery Note Item`.against_sales_order as sales_order'],
+        distinct=True
+    )
+    return {row.sales_order for row in rows if row.sales_order}
+
+
+def get_sales_orders(names):
+    """
+    Prefetch sales orders and their lines
+
+    Returns ({name: order}, {name: {'by_name': {so_detail: line},
+    'by_item': {item_code: first line}}}).
+    """
+    if not names:
+        return {}, {}
+
+    orders = {
+        order.name: order for order in frappe.get_all('Sales Order',
+            filters={'name': ['in', names]},
+            fields=SALES_ORDER_FIELDS)
+    }
+
+    lines = {}
+    for item in frappe.get_all('Sales Order Item',
+            filters={'parent': ['in', names], 'parenttype': 'Sales Order'},
+            fields=['name', 'parent', 'item_code', 'description', 'conversion_factor'],
+            order_by='idx'):
+        index = lines.setdefault(item.parent, {'by_name': {}, 'by_item': {}})
+        index['by_name'][item.name] = item
+        # The first matching line wins, as in the per-order lookup this replaces
+        index['by_item'].setdefault(item.item_code, item)
+
+    return orders, lines
+
+
+def build_delivery_note(pick_list, locations, sales_order, so_lines):
+    """Unsaved Delivery Note for the picked lines of one sales order"""
+    dn = frappe.new_doc('Delivery Note')
+    dn.customer = sales_order.customer
+    dn.posting_date = today()
+    dn.set_posting_time = 0
+
+    # Link to pick list
+    if dn.meta.has_field('pick_list'):
+        dn.pick_list = pick_list
+
+    # Copy customer details from sales order
+    for fieldname in SALES_ORDER_FIELDS[1:]:
+        dn.set(fieldname, sales_order.get(fieldname))
+
+    by_name = so_lines.get('by_name', {})
+    by_item = so_lines.get('by_item', {})
+
+    for loc in locations:
+        so_item = by_name.get(loc.sales_order_item) or by_item.get(loc.item_code)
+        if not so_item:
+            continue
+
+        dn.append('items', {
+            'item_code': loc.item_code,
+            'item_name': loc.item_name,
+            'description': so_item.description,
+            'qty': loc.picked_qty or loc.qty,
+            'uom': loc.uom or loc.stock_uom,
+            'stock_uom': loc.stock_uom,
+            'conversion_factor': so_item.conversion_factor,
+            'warehouse': loc.warehouse,
+            'against_sales_order': sales_order.name,
+            'so_detail': so_item.name,
+            # Transfer box assignment from pick list
+            'wms_box': loc.wms_box,
+            'wms_packed_qty': 0
+        })
+
+    return dn
+
+
+def _publish_progress(user, pick_list, status, done, total, **extra):
+    frappe.publish_realtime(PROGRESS_EVENT, {
+        'pick_list': pick_list,
+        'status': status,
+        'done': done,
+        'total': total,
+        **extra
+    }, user=user)
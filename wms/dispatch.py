@@ -0,0 +1,361 @@
+"""
+WMS Dispatch
+Pull-based work queue: the next pick or pack task for a user
+
+Instead of choosing from lists (and running into documents someone else
+just opened), pickers and packers ask for their next task. get_next_task
+ranks the open work for the user: tasks assigned to them first, then by
+ship-by date, by zone (tasks in the user's own zones before others) and
+by the walking distance from where the user scanned last. The best task
+nobody holds is claimed with one atomic lock step over the ranked list
+(wms.locks.claim_first_lock), so users asking at the same time each get
+a different task in one round trip, without retrying on each other's
+locks.
+
+A claim reserves the task for the user: whichever of their pick or pack
+pages opens it takes the lock over. Reservations that are not opened
+expire with the lock TTL and the task goes back to the queue.
+
+The open work (due date, zones and stops of every task) is read into a
+pool per task type that all users rank from. It is rebuilt by one
+caller once it is DISPATCH_POOL_TTL seconds old, while the others keep
+using the previous one; a task that was finished meanwhile is caught
+when it is claimed.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate
+
+from wms.availability import get_layout
+from wms.locks import claim_first_lock, get_lock_holder, release_lock
+from wms.routing import get_distance_matrix, resolve_row_locations
+from wms.scan_log import get_user_location
+from wms.waves import ACTIVE_WAVE_STATUSES
+from wms.zones import ACTIVE_ZONE_TASK_STATUSES, get_zone, get_zone_map
+
+TASK_TYPES = ('Pick', 'Pack')
+
+DISPATCH_POOL = 'wms_dispatch_pool:'  # + task type, pickled list of tasks
+DISPATCH_POOL_FRESH = 'wms_dispatch_pool_fresh:'  # raw key, set while the pool is current
+DISPATCH_POOL_REBUILD = 'wms_dispatch_pool_rebuild:'  # raw key, held by the caller rebuilding it
+DISPATCH_RESERVATIONS = 'wms_dispatch_reservations'  # user -> (task type, doctype, name)
+
+DISPATCH_POOL_TTL = 30  # seconds
+DISPATCH_POOL_KEEP = 10 * 60  # a stale pool is still served while it is rebuilt
+POOL_REBUILD_TIMEOUT = 60
+
+# Ranked tasks handed to one claim step
+CLAIM_BATCH = 25
+
+# Distance rank of tasks in another layout than the user's
+OTHER_LAYOUT_DISTANCE = 1e9
+
+TASK_ROUTES = {
+    'Pick List': ['pick'],
+    'WMS Wave': ['pick', 'wave'],
+    'WMS Zone Task': ['pick', 'zone'],
+    'Delivery Note': ['pack']
+}
+
+
+def claim_next_task(task_type='Pick', warehouse=None, user=None):
+    """
+    Reserve the best open task of task_type ('Pick' or 'Pack') for a user
+
+    warehouse: only tasks of this layout warehouse. A reservation the
+    user has not opened yet is returned again. Returns the task as a
+    dict (doctype, name, route, due, zones, distance) or None when there
+    is no work left.
+    """
+    if task_type not in TASK_TYPES:
+        frappe.throw(_("Unknown task type {0}").format(task_type))
+
+    user = user or frappe.session.user
+    tasks = get_task_pool(task_type)
+    if warehouse:
+        tasks = [task for task in tasks if task[3] == warehouse]
+
+    reserved = frappe.cache().hget(DISPATCH_RESERVATIONS, user)
+    ranked = rank_tasks(tasks, user, get_user_zones(user), get_user_location(user))
+
+    if reserved and reserved[0] == task_type:
+        doctype, name = reserved[1:]
+        current = next((task for task in ranked if task['doctype'] == doctype and task['name'] == name), None)
+        if current and get_lock_holder(doctype, name) == (user, None) and is_task_open(doctype, name, user):
+            return current
+
+    for start in range(0, len(ranked), CLAIM_BATCH):
+        batch = ranked[start:start + CLAIM_BATCH]
+        while batch:
+            claimed = claim_first_lock([(task['doctype'], task['name']) for task in batch], user)
+            if not claimed:
+                break
+
+            doctype, name, is_new = claimed
+            position = next(i for i, task in enumerate(batch)
+                if task['doctype'] == doctype and task['name'] == name)
+
+            if is_task_open(doctype, name, user):
+                frappe.cache().hset(DISPATCH_RESERVATIONS, user, (task_type, doctype, name))
+                return batch[position]
+
+            # Finished since the pool was built: hand it back and take the next
+            release_lock(doctype, name, user=user)
+            expire_task_pool(task_type)
+            batch = batch[position + 1:]
+
+    return None
+
+
+def rank_tasks(tasks, user, user_zones, position=None):
+    """
+    Tasks the user may take, best first
+
+    Tasks assigned to the user come first, then by due date, zone rank
+    (0: all stops in the user's zones, 1: some, 2: none; 0 for users
+    without zones), walking distance from position (location, layout)
+    and creation.
+    """
+    location, layout = position or (None, None)
+    matrix = origin = None
+    if location and layout:
+        matrix = get_distance_matrix(layout)
+        origin = matrix.index.get(location)
+        if origin is None:
+            # A storage warehouse scanned instead of a WMS Location
+            resolved = resolve_row_locations([frappe._dict({'location': location, 'warehouse': location})])
+            origin = matrix.index.get((resolved.get(location) or (None,))[0])
+
+    ranked = []
+    for doctype, name, due, task_layout, zones, stops, assigned_to, creation in tasks:
+        if assigned_to and assigned_to != user:
+            continue
+
+        zone_rank = 0
+        if user_zones and not set(zones) <= user_zones:
+            zone_rank = 1 if user_zones & set(zones) else 2
+
+        distance = 0
+        if origin is not None:
+            if task_layout != layout:
+                distance = OTHER_LAYOUT_DISTANCE
+            else:
+                offset = origin * matrix.size
+                gaps = [matrix.data[offset + matrix.index[stop]] for stop in stops if stop in matrix.index]
+                distance = min(gaps) if gaps else 0
+
+        ranked.append((
+            (assigned_to != user, due, zone_rank, distance, creation),
+            {
+                'doctype': doctype,
+                'name': name,
+                'route': TASK_ROUTES[doctype] + [name],
+                'warehouse': task_layout,
+                'due': due,
+                'zones': list(zones),
+                'distance': round(distance, 1) if distance < OTHER_LAYOUT_DISTANCE else None,
+                'assigned_to': assigned_to
+            }
+        ))
+
+    ranked.sort(key=lambda entry: entry[0])
+    return [task for key, task in ranked]
+
+
+def is_task_open(doctype, name, user):
+    """Whether a task in the pool still needs doing and may go to the user"""
+    if doctype == 'Pick List':
+        pick = frappe.db.get_value('Pick List', name,
+            ['docstatus', 'status', 'wms_wave', 'wms_zone_picking'], as_dict=True)
+        if not pick or pick.docstatus == 2 or pick.status not in ('Draft', 'Open') \
+                or pick.wms_wave or cint(pick.wms_zone_picking):
+            return False
+
+        return any(flt(row.picked_qty) < flt(row.qty) for row in frappe.get_all('Pick List Item',
+            filters={'parent': name, 'parenttype': 'Pick List'},
+            fields=['qty', 'picked_qty']))
+
+    if doctype == 'WMS Wave':
+        return frappe.db.get_value('WMS Wave', name, 'status') in ACTIVE_WAVE_STATUSES
+
+    if doctype == 'WMS Zone Task':
+        task = frappe.db.get_value('WMS Zone Task', name, ['status', 'assigned_to'], as_dict=True)
+        return bool(task) and task.status in ACTIVE_ZONE_TASK_STATUSES and task.assigned_to in (None, '', user)
+
+    dn = frappe.db.get_value('Delivery Note', name, ['docstatus', 'wms_pack_pending'], as_dict=True)
+    return bool(dn) and dn.docstatus == 0 and bool(cint(dn.wms_pack_pending))
+
+
+def get_user_zones(user):
+    """Zones the user picks in"""
+    return set(frappe.get_all('WMS Zone Picker',
+        filters={'user': user, 'parenttype': 'WMS Zone'},
+        pluck='parent'))
+
+
+def get_task_pool(task_type):
+    """
+    Open tasks of a type as (doctype, name, due, layout, zones, stops,
+    assigned_to, creation) tuples
+
+    Rebuilt by one caller once stale; the others keep using the stale
+    pool meanwhile.
+    """
+    cache = frappe.cache()
+    tasks = cache.get_value(DISPATCH_POOL + task_type)
+    if tasks is not None and cache.get(cache.make_key(DISPATCH_POOL_FRESH + task_type)):
+        return tasks
+
+    rebuild_key = cache.make_key(DISPATCH_POOL_REBUILD + task_type)
+    if tasks is not None and not cache.set(rebuild_key, 1, nx=True, ex=POOL_REBUILD_TIMEOUT):
+        return tasks
+
+    tasks = load_pick_tasks() if task_type == 'Pick' else load_pack_tasks()
+    cache.set_value(DISPATCH_POOL + task_type, tasks, expires_in_sec=DISPATCH_POOL_KEEP)
+    cache.set(cache.make_key(DISPATCH_POOL_FRESH + task_type), 1, ex=DISPATCH_POOL_TTL)
+    cache.delete(rebuild_key)
+    return tasks
+
+
+def expire_task_pool(task_type=None):
+    """Have the next claim rebuild the pool (all task types by default)"""
+    cache = frappe.cache()
+    for name in ([task_type] if task_type else TASK_TYPES):
+        cache.delete(cache.make_key(DISPATCH_POOL_FRESH + name))
+
+
+def load_pick_tasks():
+    """Pick lists picked on their own, waves and zone tasks that are still open"""
+    pick_lists = frappe.get_all('Pick List',
+        filters={
+            'docstatus': ['<', 2],
+            'status': ['in', ['Draft', 'Open']],
+            'wms_wave': ['is', 'not set'],
+            'wms_zone_picking': 0
+        },
+        fields=['name', 'creation'])
+    waves = frappe.get_all('WMS Wave',
+        filters={'status': ['in', list(ACTIVE_WAVE_STATUSES)]},
+        fields=['name', 'creation', 'warehouse'])
+    zone_tasks = frappe.get_all('WMS Zone Task',
+        filters={'status': ['in', list(ACTIVE_ZONE_TASK_STATUSES)]},
+        fields=['name', 'creation', 'warehouse', 'zone', 'assigned_to'])
+
+    # Pick lists: their rows still to pick, resolved to WMS Locations
+    pick_rows = {}
+    if pick_lists:
+        fields = ['parent', 'warehouse', 'sales_order', 'qty', 'picked_qty']
+        if frappe.get_meta('Pick List Item').has_field('location'):
+            fields.append('location')
+
+        for row in frappe.get_all('Pick List Item',
+                filters={'parent': ['in', [pick.name for pick in pick_lists]], 'parenttype': 'Pick List'},
+                fields=fields):
+            if flt(row.picked_qty) < flt(row.qty):
+                pick_rows.setdefault(row.parent, []).append(row)
+
+    resolved = resolve_row_locations([row for rows in pick_rows.values() for row in rows])
+
+    # Waves and zone tasks: their routed rows
+    routed_rows = {}
+    for child_doctype, parenttype, parents in (('WMS Wave Item', 'WMS Wave', waves),
+            ('WMS Zone Task Item', 'WMS Zone Task', zone_tasks)):
+        if parents:
+            for row in frappe.get_all(child_doctype,
+                    filters={'parent': ['in', [parent.name for parent in parents]], 'parenttype': parenttype},
+                    fields=['parent', 'location', 'order_ref']):
+                routed_rows.setdefault(row.parent, []).append(row)
+
+    orders = {row.sales_order for rows in pick_rows.values() for row in rows if row.sales_order}
+    orders |= {row.order_ref for rows in routed_rows.values() for row in rows if row.order_ref}
+    delivery_dates = get_delivery_dates(orders)
+
+    locations = {location for location, layout in resolved.values()}
+    locations |= {row.location for rows in routed_rows.values() for row in rows if row.location}
+    aisles = {
+        loc.name: (loc.warehouse, loc.aisle) for loc in frappe.get_all('WMS Location',
+            filters={'name': ['in', list(locations)]},
+            fields=['name', 'warehouse', 'aisle'])
+    } if locations else {}
+    zone_map = get_zone_map()
+
+    def get_zones(stops):
+        return tuple({
+            get_zone(aisles[stop][0], aisles[stop][1], zone_map) for stop in stops if stop in aisles
+        } - {None})
+
+    tasks = []
+    for pick in pick_lists:
+        rows = pick_rows.get(pick.name)
+        if not rows:
+            continue
+
+        stops = set()
+        layout = None
+        for row in rows:
+            location, row_layout = resolved.get(row.get('location')) or resolved.get(row.warehouse) or (None, None)
+            stops.add(location)
+            layout = layout or row_layout or get_layout(row.warehouse)
+        stops.discard(None)
+
+        tasks.append(('Pick List', pick.name, _due(rows, 'sales_order', delivery_dates, pick.creation),
+            layout, get_zones(stops), tuple(stops), None, str(pick.creation)))
+
+    for wave in waves:
+        rows = routed_rows.get(wave.name) or []
+        stops = {row.location for row in rows if row.location}
+        tasks.append(('WMS Wave', wave.name, _due(rows, 'order_ref', delivery_dates, wave.creation),
+            wave.warehouse, get_zones(stops), tuple(stops), None, str(wave.creation)))
+
+    for task in zone_tasks:
+        rows = routed_rows.get(task.name) or []
+        stops = {row.location for row in rows if row.location}
+        tasks.append(('WMS Zone Task', task.name, _due(rows, 'order_ref', delivery_dates, task.creation),
+            task.warehouse, (task.zone,) if task.zone else get_zones(stops), tuple(stops),
+            task.assigned_to or None, str(task.creation)))
+
+    return tasks
+
+
+def load_pack_tasks():
+    """Draft delivery notes waiting to be packed; packers pack at their layout's station"""
+    delivery_notes = frappe.get_all('Delivery Note',
+        filters={'docstatus': 0, 'wms_pack_pending': 1},
+        fields=['name', 'creation', 'posting_date'])
+
+    items = {}
+    if delivery_notes:
+        for row in frappe.get_all('Delivery Note Item',
+                filters={'parent': ['in', [dn.name for dn in delivery_notes]], 'parenttype': 'Delivery Note'},
+                fields=['parent', 'warehouse', 'against_sales_order']):
+            items.setdefault(row.parent, []).append(row)
+
+    delivery_dates = get_delivery_dates({
+        row.against_sales_order for rows in items.values() for row in rows if row.against_sales_order
+    })
+
+    tasks = []
+    for dn in delivery_notes:
+        rows = items.get(dn.name) or []
+        warehouse = next((row.warehouse for row in rows if row.warehouse), None)
+        tasks.append(('Delivery Note', dn.name,
+            _due(rows, 'against_sales_order', delivery_dates, dn.posting_date or dn.creation),
+            get_layout(warehouse) if warehouse else None, (), (), None, str(dn.creation)))
+
+    return tasks
+
+
+def get_delivery_dates(orders):
+    """{sales order: delivery date} in one query"""
+    return dict(frappe.get_all('Sales Order',
+        filters={'name': ['in', list(orders)]},
+        fields=['name', 'delivery_date'],
+        as_list=True
+    )) if orders else {}
+
+
+def _due(rows, order_field, delivery_dates, fallback):
+    """Ship-by date: the earliest delivery date of the rows' orders, else fallback"""
+    dates = [delivery_dates[row.get(order_field)] for row in rows if delivery_dates.get(row.get(order_field))]
+    return str(getdate(min(dates) if dates else fallback))
@@ -1,11 +1,18 @@
 import frappe
 from frappe import _
+from frappe.utils import cint, flt
+
+from wms.item_attributes import get_item_attributes
+from wms.progress import calculate_progress_totals
 
 def before_save(doc, method):
     """Actions before Delivery Note is saved"""
     # Calculate packing requirements
     calculate_packing_requirements(doc)
 
+    # Packed qty/lines, also maintained incrementally by wms.progress
+    calculate_progress_totals(doc)
+
     # Validate packing if required
     if doc.get('wms_require_packing'):
         validate_packing(doc)
@@ -21,35 +28,42 @@ def on_submit(doc, method):
     # Update pick list status if linked
     update_linked_pick_list(doc)
 
-def calculate_packing_requirements(doc):
-    """Calculate total weight, volume, and packing requirements"""
-    if not doc.items:
-        return
-
-    total_weight = 0
-    total_volume = 0
-    fragile_count = 0
+# Packing totals: (field, item attribute, per unit)
+PACKING_TOTALS = (
+    ('wms_total_weight', 'weight_per_unit', True),
+    ('wms_total_volume', 'volume_per_unit', True),
+    ('wms_fragile_items', 'is_fragile', False)
+)
 
-    for item in doc.items:
-        # Get item details
-        item_doc = frappe.get_cached_doc('Item', item.item_code)
+def calculate_packing_requirements(doc):
+    """
+    Calculate total weight, volume, and packing requirements
 
-        weight = (item_doc.weight_per_unit or 0) * item.qty
-        volume = (item_doc.get('volume_per_unit') or 0) * item.qty
+    Most saves (locks, packing progress) leave the item rows alone and
+    keep the stored totals. Otherwise they are recomputed from all rows,
+    with the item attributes of the whole document from one cache lookup.
+    """
+    # Store in custom fields if they exist
+    fields = [total for total in PACKING_TOTALS if hasattr(doc, total[0])]
+    if not fields:
+        return
 
-        total_weight += weight
-        total_volume += volume
+    previous = doc.get_doc_before_save()
+    if previous and all(previous.get(field) is not None for field, attribute, per_unit in fields):
+        before = [(row.name, row.item_code, flt(row.qty)) for row in previous.items]
+        if before == [(row.name, row.item_code, flt(row.qty)) for row in doc.items]:
+            return
 
-        if item_doc.get('is_fragile'):
-            fragile_count += 1
+    attributes = get_item_attributes([row.item_code for row in doc.items])
+    totals = {field: 0 for field, attribute, per_unit in fields}
+    for row in doc.items:
+        if row.item_code not in attributes:
+            continue
+        for field, attribute, per_unit in fields:
+            totals[field] += attributes.get(row.item_code, attribute) * (flt(row.qty) if per_unit else 1)
 
-    # Store in custom fields if they exist
-    if hasattr(doc, 'wms_total_weight'):
-        doc.wms_total_weight = total_weight
-    if hasattr(doc, 'wms_total_volume'):
-        doc.wms_total_volume = total_volume
-    if hasattr(doc, 'wms_fragile_items'):
-        doc.wms_fragile_items = fragile_count
+    for field, attribute, per_unit in fields:
+        doc.set(field, flt(totals[field], 6) if per_unit else cint(totals[field]))
 
 def validate_packing(doc):
     """Validate that all items have been properly packed"""
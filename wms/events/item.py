@@ -0,0 +1,22 @@
+from wms.barcodes import clear_barcode_index, index_item, remove_barcodes
+from wms.cartonization import PACK_ITEM_FIELDS, clear_packing_plans
+from wms.item_attributes import clear_item_attributes, invalidate_item_attributes
+
+def on_update(doc, method):
+    """Keep the barcode index and item attributes current when an Item changes"""
+    index_item(doc)
+    invalidate_item_attributes([doc.name])
+
+    if any(doc.has_value_changed(field) for field in PACK_ITEM_FIELDS if doc.meta.has_field(field)):
+        clear_packing_plans()
+
+def on_trash(doc, method):
+    """Drop a deleted Item and its barcodes from the barcode index"""
+    barcodes = {row.barcode for row in doc.get('barcodes') or [] if row.barcode}
+    remove_barcodes(barcodes | {doc.name})
+    invalidate_item_attributes([doc.name])
+
+def after_rename(doc, method, old_name, new_name, merge=False):
+    """Renames and merges touch other items' barcodes too; rebuild lazily"""
+    clear_barcode_index()
+    clear_item_attributes()
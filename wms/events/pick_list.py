@@ -1,15 +1,30 @@
 import frappe
 from frappe import _
 
+from wms.availability import get_optimal_locations
+from wms.dashboard import track_pick_list
+from wms.progress import calculate_progress_totals
+from wms.zones import split_on_submit
+
 def validate(doc, method):
     """Validate Pick List before save"""
     # Add custom validation logic
     validate_warehouse_locations(doc)
+    suggest_source_locations(doc)
     calculate_pick_metrics(doc)
 
 def on_submit(doc, method):
     """Actions to perform when Pick List is submitted"""
-    pass
+    # Large pick lists spanning several zones are picked by zone, in parallel
+    split_on_submit(doc)
+
+def on_change(doc, method):
+    """Push status and lock changes to the WMS dashboard"""
+    track_pick_list(doc)
+
+def on_trash(doc, method):
+    """Remove a deleted Pick List from the WMS dashboard"""
+    track_pick_list(doc, deleted=True)
 
 def before_cancel(doc, method):
     """Actions before Pick List is cancelled"""
@@ -21,6 +36,25 @@ def validate_warehouse_locations(doc):
         if not item.warehouse:
             frappe.throw(_("Row {0}: Warehouse is required").format(item.idx))
 
+def suggest_source_locations(doc):
+    """Point draft rows at the WMS Location to pick from, from the availability index"""
+    if doc.docstatus != 0:
+        return
+
+    rows = [
+        item for item in doc.locations
+        if item.warehouse and not item.get('wms_source_location') and hasattr(item, 'wms_source_location')
+    ]
+    if not rows:
+        return
+
+    suggestions = get_optimal_locations([(item.item_code, item.warehouse, item.stock_qty or item.qty)
+        for item in rows])
+
+    for item, suggestion in zip(rows, suggestions):
+        if suggestion:
+            item.wms_source_location = suggestion['location']
+
 def calculate_pick_metrics(doc):
     """Calculate metrics like estimated time, distance, etc."""
     if not doc.locations:
@@ -41,3 +75,6 @@ def calculate_pick_metrics(doc):
         doc.wms_total_qty = total_qty
     if hasattr(doc, 'wms_estimated_minutes'):
         doc.wms_estimated_minutes = estimated_minutes
+
+    # Picked qty/lines, also maintained incrementally by wms.progress
+    calculate_progress_totals(doc)
@@ -1,6 +1,8 @@
 import frappe
 from frappe import _
 
+from wms.availability import format_shortage, get_optimal_locations, get_stock_shortages
+
 def validate(doc, method):
     """Validate Stock Entry"""
     # Validate warehouse locations if WMS is enabled
@@ -11,41 +13,36 @@ def validate(doc, method):
     suggest_source_locations(doc)
 
 def validate_warehouse_locations(doc):
-    """Validate that warehouse locations are correct"""
-    for item in doc.items:
-        if item.s_warehouse:
-            # Verify item exists in source warehouse
-            available_qty = frappe.db.get_value('Bin', {
-                'item_code': item.item_code,
-                'warehouse': item.s_warehouse
-            }, 'actual_qty') or 0
-
-            if available_qty < item.qty:
-                frappe.throw(_(
-                    "Row {0}: Insufficient quantity in {1}. "
-                    "Available: {2}, Required: {3}"
-                ).format(item.idx, item.s_warehouse, available_qty, item.qty))
+    """Validate that the source warehouses hold enough stock for all rows together"""
+    shortages = get_stock_shortages(doc.items)
+    if shortages:
+        frappe.throw('<br>'.join(format_shortage(shortage) for shortage in shortages),
+            title=_("Insufficient Stock"))
 
 def suggest_source_locations(doc):
-    """Suggest optimal source locations based on stock levels"""
+    """Suggest optimal source locations from the availability index"""
     if doc.stock_entry_type != 'Material Transfer':
         return
 
-    for item in doc.items:
-        if not item.s_warehouse or item.get('wms_source_location'):
-            continue
+    rows = [
+        item for item in doc.items
+        if item.s_warehouse and not item.get('wms_source_location') and hasattr(item, 'wms_source_location')
+    ]
+    if not rows:
+        return
 
-        # Find best location with sufficient stock
-        location = get_optimal_location(item.item_code, item.s_warehouse, item.qty)
+    # One index lookup per warehouse layout for the whole entry
+    suggestions = get_optimal_locations([(item.item_code, item.s_warehouse, item.get('transfer_qty') or item.qty)
+        for item in rows])
 
-        if location and hasattr(item, 'wms_source_location'):
-            item.wms_source_location = location
+    for item, suggestion in zip(rows, suggestions):
+        if suggestion:
+            item.wms_source_location = suggestion['location']
 
 def get_optimal_location(item_code, warehouse, required_qty):
     """
     Get optimal warehouse location for picking
     Priority: FIFO, nearest to packing area, fullest bins
     """
-    # This is a placeholder - would need custom Warehouse Location doctype
-    # For now, return None
-    return None
+    suggestion = get_optimal_locations([(item_code, warehouse, required_qty)])[0]
+    return suggestion['location'] if suggestion else None
@@ -0,0 +1,5 @@
+from wms.availability import queue_availability_update
+
+def on_submit(doc, method):
+    """Keep the availability index current; cancellations post reversing entries too"""
+    queue_availability_update(doc)
@@ -44,7 +44,9 @@ doc_events = {
     "Pick List": {
         "validate": "wms.events.pick_list.validate",
         "on_submit": "wms.events.pick_list.on_submit",
-        "before_cancel": "wms.events.pick_list.before_cancel"
+        "before_cancel": "wms.events.pick_list.before_cancel",
+        "on_change": "wms.events.pick_list.on_change",
+        "on_trash": "wms.events.pick_list.on_trash"
     },
     "Delivery Note": {
         "before_save": "wms.events.delivery_note.before_save",
@@ -52,6 +54,15 @@ doc_events = {
     },
     "Stock Entry": {
         "validate": "wms.events.stock_entry.validate"
+    },
+    "Stock Ledger Entry": {
+        "on_submit": "wms.events.stock_ledger_entry.on_submit"
+    },
+    # Item Barcode rows are saved with their Item, so Item events cover them
+    "Item": {
+        "on_update": "wms.events.item.on_update",
+        "on_trash": "wms.events.item.on_trash",
+        "after_rename": "wms.events.item.after_rename"
     }
 }
 
@@ -59,15 +70,25 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
-    # "all": [
-    #     "wms.tasks.all"
-    # ],
-    # "daily": [
-    #     "wms.tasks.daily"
-    # ],
-    # "hourly": [
-    #     "wms.tasks.hourly"
-    # ],
+    "all": [
+        "wms.progress_feed.flush_progress_snapshots"
+    ],
+    "daily": [
+        "wms.scan_log.purge_scan_events"
+    ],
+    "hourly": [
+        "wms.scan_log.rollup_scan_events"
+    ],
+    "cron": {
+        # Expired pick / pack locks
+        "*/5 * * * *": [
+            "wms.tasks.release_stale_locks"
+        ],
+        # Off-peak: routes and packing plans for the morning shift
+        "0 4 * * *": [
+            "wms.tasks.schedule_precompute"
+        ]
+    },
     # "weekly": [
     #     "wms.tasks.weekly"
     # ],
@@ -85,6 +106,7 @@ scheduler_events = {
 # ------------
 
 after_install = "wms.install.after_install"
+after_migrate = "wms.install.after_migrate"
 
 # Fixtures
 # --------
@@ -130,8 +152,9 @@ fixtures = [
 
 # Request Events
 # ----------------
-# before_request = ["wms.utils.before_request"]
-# after_request = ["wms.utils.after_request"]
+# Opt-in profiling of wms.* API calls (see wms.profiling)
+before_request = ["wms.profiling.before_request"]
+after_request = ["wms.profiling.after_request"]
 
 # Job Events
 # ----------
@@ -2,13 +2,36 @@
 import frappe
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 
+from wms.dashboard import DASHBOARD_READY
+
+
+# Composite indexes (doctype, index name, columns) for WMS queue queries
+WMS_INDEXES = [
+    ('Delivery Note', 'wms_pack_queue_index', ['wms_pack_pending', 'docstatus', 'creation'])
+]
+
 
 def after_install():
     """Run after app installation"""
     create_wms_custom_fields()
+    create_wms_indexes()
     frappe.db.commit()
 
 
+def after_migrate():
+    """Run after every migrate so new WMS fields reach existing sites"""
+    create_wms_custom_fields()
+    create_wms_indexes()
+    # Dashboard counters are rebuilt on the next read, in the current layout
+    frappe.cache().delete_value(DASHBOARD_READY)
+
+
+def create_wms_indexes():
+    """Create the composite indexes; existing ones are left alone"""
+    for doctype, index_name, columns in WMS_INDEXES:
+        frappe.db.add_index(doctype, columns, index_name=index_name)
+
+
 def create_wms_custom_fields():
     """Create custom fields for WMS functionality"""
     custom_fields = {
@@ -46,6 +69,49 @@ def create_wms_custom_fields():
                 "fieldname": "wms_column_break",
                 "fieldtype": "Column Break",
                 "insert_after": "wms_session_id"
+            },
+            {
+                "fieldname": "wms_picked_qty",
+                "fieldtype": "Float",
+                "label": "Picked Qty",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_column_break"
+            },
+            {
+                "fieldname": "wms_picked_lines",
+                "fieldtype": "Int",
+                "label": "Picked Lines",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_picked_qty"
+            },
+            {
+                "fieldname": "wms_version",
+                "fieldtype": "Int",
+                "label": "WMS Version",
+                "read_only": 1,
+                "hidden": 1,
+                "no_copy": 1,
+                "insert_after": "wms_picked_lines"
+            },
+            {
+                "fieldname": "wms_wave",
+                "fieldtype": "Link",
+                "label": "Wave",
+                "options": "WMS Wave",
+                "read_only": 1,
+                "no_copy": 1,
+                "search_index": 1,
+                "insert_after": "wms_version"
+            },
+            {
+                "fieldname": "wms_zone_picking",
+                "fieldtype": "Check",
+                "label": "Zone Picking",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_wave"
             }
         ],
         "Delivery Note": [
@@ -61,6 +127,7 @@ def create_wms_custom_fields():
                 "label": "Pick List",
                 "options": "Pick List",
                 "read_only": 1,
+                "search_index": 1,
                 "insert_after": "wms_packing_section"
             },
             {
@@ -105,6 +172,48 @@ def create_wms_custom_fields():
                 "read_only": 1,
                 "hidden": 1,
                 "insert_after": "wms_locked_at"
+            },
+            {
+                "fieldname": "wms_total_packed_qty",
+                "fieldtype": "Float",
+                "label": "Packed Qty",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_session_id"
+            },
+            {
+                "fieldname": "wms_packed_lines",
+                "fieldtype": "Int",
+                "label": "Packed Lines",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_total_packed_qty"
+            },
+            {
+                "fieldname": "wms_version",
+                "fieldtype": "Int",
+                "label": "WMS Version",
+                "read_only": 1,
+                "hidden": 1,
+                "no_copy": 1,
+                "insert_after": "wms_packed_lines"
+            },
+            {
+                "fieldname": "wms_total_lines",
+                "fieldtype": "Int",
+                "label": "Total Lines",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "wms_version"
+            },
+            {
+                "fieldname": "wms_pack_pending",
+                "fieldtype": "Check",
+                "label": "Waiting for Packing",
+                "read_only": 1,
+                "hidden": 1,
+                "no_copy": 1,
+                "insert_after": "wms_total_lines"
             }
         ],
         "Delivery Note Item": [
@@ -135,6 +244,51 @@ def create_wms_custom_fields():
                 "fieldtype": "Data",
                 "label": "Box",
                 "insert_after": "picked_qty"
+            },
+            {
+                "fieldname": "wms_source_location",
+                "fieldtype": "Link",
+                "label": "Source Location",
+                "options": "WMS Location",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "warehouse"
+            }
+        ],
+        "Stock Entry Detail": [
+            {
+                "fieldname": "wms_source_location",
+                "fieldtype": "Link",
+                "label": "Source Location",
+                "options": "WMS Location",
+                "insert_after": "s_warehouse"
+            }
+        ],
+        "Item": [
+            {
+                "fieldname": "wms_dimensions_section",
+                "fieldtype": "Section Break",
+                "label": "Package Dimensions (cm)",
+                "collapsible": 1,
+                "insert_after": "weight_uom"
+            },
+            {
+                "fieldname": "wms_length",
+                "fieldtype": "Float",
+                "label": "Length",
+                "insert_after": "wms_dimensions_section"
+            },
+            {
+                "fieldname": "wms_width",
+                "fieldtype": "Float",
+                "label": "Width",
+                "insert_after": "wms_length"
+            },
+            {
+                "fieldname": "wms_height",
+                "fieldtype": "Float",
+                "label": "Height",
+                "insert_after": "wms_width"
             }
         ]
     }
@@ -0,0 +1,139 @@
+"""
+WMS Item Attributes
+Compact item attributes shared by the pick, pack and packing paths
+
+The hot paths only need a handful of Item fields: weight, volume and
+dimensions for packing, fragility, the batch flag, stock UOM, name and
+image for the pick and pack views. get_item_attributes returns them for
+a list of item codes as an ItemAttributes store: numbers in one flat
+array and texts in one list, indexed by position, instead of an Item
+document (with all child tables) or a dict per item.
+
+Each item is cached in Redis as a plain tuple of ITEM_FIELDS. Lookups
+for a whole document are one round trip; items missing from the cache
+are loaded with one query and written back. The Item doc events in
+wms.events.item drop entries when an item changes.
+"""
+
+import pickle
+from array import array
+
+import frappe
+from frappe.utils import flt
+
+ITEM_ATTRIBUTES = 'wms_item_attributes'
+
+NUMBER_FIELDS = ('weight_per_unit', 'volume_per_unit', 'wms_length', 'wms_width', 'wms_height',
+    'is_fragile', 'has_batch_no')
+TEXT_FIELDS = ('item_name', 'stock_uom', 'image')
+ITEM_FIELDS = NUMBER_FIELDS + TEXT_FIELDS
+
+# Item fields that only exist on some sites
+OPTIONAL_FIELDS = ('volume_per_unit', 'is_fragile', 'wms_length', 'wms_width', 'wms_height')
+
+_NUMBER_INDEX = {field: i for i, field in enumerate(NUMBER_FIELDS)}
+_TEXT_INDEX = {field: i for i, field in enumerate(TEXT_FIELDS)}
+
+
+class ItemAttributes:
+    """
+    ITEM_FIELDS of a set of items
+
+    get(item_code, field) reads one value; row(item_code) returns all of
+    them as a dict for code that wants a row.
+    """
+
+    __slots__ = ('index', 'numbers', 'texts')
+
+    def __init__(self):
+        self.index = {}  # item code -> position
+        self.numbers = array('d')
+        self.texts = []
+
+    def add(self, item_code, values):
+        if item_code in self.index:
+            return
+        self.index[item_code] = len(self.index)
+        self.numbers.extend(values[:len(NUMBER_FIELDS)])
+        self.texts.extend(values[len(NUMBER_FIELDS):])
+
+    def __contains__(self, item_code):
+        return item_code in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def get(self, item_code, field, default=None):
+        position = self.index.get(item_code)
+        if position is None:
+            return default
+
+        if field in _NUMBER_INDEX:
+            return self.numbers[position * len(NUMBER_FIELDS) + _NUMBER_INDEX[field]]
+        return self.texts[position * len(TEXT_FIELDS) + _TEXT_INDEX[field]]
+
+    def row(self, item_code):
+        """All attributes of an item as a dict, or None for unknown items"""
+        if item_code not in self.index:
+            return None
+
+        row = frappe._dict({field: self.get(item_code, field) for field in ITEM_FIELDS})
+        row.name = item_code
+        return row
+
+
+def get_item_attributes(item_codes):
+    """ItemAttributes of the existing items among item_codes"""
+    attributes = ItemAttributes()
+    item_codes = list(dict.fromkeys(code for code in item_codes if code))
+    if not item_codes:
+        return attributes
+
+    cache = frappe.cache()
+    name = cache.make_key(ITEM_ATTRIBUTES)
+
+    missing = []
+    for item_code, value in zip(item_codes, cache.hmget(name, item_codes)):
+        values = pickle.loads(value) if value else None
+        # Entries cached in another layout are loaded again
+        if values and len(values) == len(ITEM_FIELDS):
+            attributes.add(item_code, values)
+        else:
+            missing.append(item_code)
+
+    if missing:
+        loaded = load_item_attributes(missing)
+        if loaded:
+            pipe = cache.pipeline()
+            pipe.hset(name, mapping={key: pickle.dumps(value) for key, value in loaded.items()})
+            pipe.execute()
+        for item_code, values in loaded.items():
+            attributes.add(item_code, values)
+
+    return attributes
+
+
+def load_item_attributes(item_codes):
+    """{item_code: ITEM_FIELDS tuple} from the database"""
+    meta = frappe.get_meta('Item')
+    fields = [field for field in ITEM_FIELDS if field not in OPTIONAL_FIELDS or meta.has_field(field)]
+
+    return {
+        item.name: tuple(flt(item.get(field)) for field in NUMBER_FIELDS)
+            + tuple(item.get(field) or None for field in TEXT_FIELDS)
+        for item in frappe.get_all('Item',
+            filters={'name': ['in', item_codes]},
+            fields=['name'] + fields)
+    }
+
+
+def invalidate_item_attributes(item_codes):
+    for item_code in item_codes:
+        frappe.cache().hdel(ITEM_ATTRIBUTES, item_code)
+
+
+def clear_item_attributes():
+    frappe.cache().delete_value(ITEM_ATTRIBUTES)
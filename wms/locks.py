@@ -0,0 +1,352 @@
+"""
+WMS Locks
+Pick and pack session locks with atomic compare-and-set and TTL expiry
+
+A lock belongs to a user and browser session (tab). It is a Redis key
+that expires on its own unless the holder keeps renewing it with a
+heartbeat. The wms_locked_by / wms_locked_at / wms_session_id fields on
+the document are only a denormalised view for lists and reports and are
+written when ownership changes, never on refresh or heartbeat.
+
+Tests run against an in-process backend with the same semantics.
+"""
+
+import threading
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now
+
+from wms.dashboard import track_pick_list_row
+
+LOCK_KEY = 'wms_lock:'
+LOCKABLE_DOCTYPES = ('Pick List', 'Delivery Note', 'WMS Wave', 'WMS Zone Task')
+
+# Lock lifetime when WMS Settings does not set one
+DEFAULT_LOCK_TTL_MINUTES = 30
+
+# Returns {acquired, holder, is_new}; the holder may refresh its own lock,
+# and a session of the user takes over the user's reservation (ARGV[3])
+ACQUIRE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if not holder or (ARGV[3] ~= '' and holder == ARGV[3]) then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return {1, ARGV[1], 1}
+elseif holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return {1, holder, 0}
+end
+return {0, holder, 0}
+"""
+
+# Takes the first of KEYS (in rank order) that is free or already the
+# owner's; returns its 1-based position and whether it is new, {0, 0} if none
+CLAIM_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local holder = redis.call('GET', key)
+    if not holder then
+        redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+        return {i, 1}
+    elseif holder == ARGV[1] then
+        redis.call('PEXPIRE', key, ARGV[2])
+        return {i, 0}
+    end
+end
+return {0, 0}
+"""
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# ARGV[1] is the exact owner, ARGV[2] an optional owner prefix (any session of a user)
+RELEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if not holder then
+    return 1
+end
+if holder == ARGV[1] or (ARGV[2] ~= '' and string.sub(holder, 1, string.len(ARGV[2])) == ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+
+class RedisLockBackend:
+    def __init__(self, cache):
+        self.cache = cache
+        self._acquire = cache.register_script(ACQUIRE_SCRIPT)
+        self._claim = cache.register_script(CLAIM_SCRIPT)
+        self._renew = cache.register_script(RENEW_SCRIPT)
+        self._release = cache.register_script(RELEASE_SCRIPT)
+
+    def acquire(self, key, owner, ttl_ms, reservation=''):
+        acquired, holder, is_new = self._acquire(keys=[self.cache.make_key(key)], args=[owner, ttl_ms, reservation])
+        return bool(acquired), frappe.safe_decode(holder), bool(is_new)
+
+    def claim(self, keys, owner, ttl_ms):
+        position, is_new = self._claim(keys=[self.cache.make_key(key) for key in keys], args=[owner, ttl_ms])
+        return (int(position) - 1 if position else None), bool(is_new)
+
+    def renew(self, key, owner, ttl_ms):
+        return bool(self._renew(keys=[self.cache.make_key(key)], args=[owner, ttl_ms]))
+
+    def release(self, key, owner, owner_prefix=''):
+        return bool(self._release(keys=[self.cache.make_key(key)], args=[owner, owner_prefix]))
+
+    def holder(self, key):
+        return frappe.safe_decode(self.cache.get(self.cache.make_key(key)))
+
+    def holders(self, keys):
+        values = self.cache.mget([self.cache.make_key(key) for key in keys]) if keys else []
+        return [frappe.safe_decode(value) for value in values]
+
+
+class InProcessLockBackend:
+    """Stand-in for tests and single-process tools"""
+
+    def __init__(self):
+        self._locks = {}
+        self._mutex = threading.Lock()
+
+    def _current(self, key):
+        lock = self._locks.get(key)
+        if lock and lock[1] <= time.monotonic():
+            del self._locks[key]
+            return None
+        return lock[0] if lock else None
+
+    def acquire(self, key, owner, ttl_ms, reservation=''):
+        with self._mutex:
+            holder = self._current(key)
+            if reservation and holder == reservation:
+                holder = None
+            if holder not in (None, owner):
+                return False, holder, False
+            self._locks[key] = (owner, time.monotonic() + ttl_ms / 1000)
+            return True, owner, holder is None
+
+    def claim(self, keys, owner, ttl_ms):
+        with self._mutex:
+            for position, key in enumerate(keys):
+                holder = self._current(key)
+                if holder in (None, owner):
+                    self._locks[key] = (owner, time.monotonic() + ttl_ms / 1000)
+                    return position, holder is None
+            return None, False
+
+    def renew(self, key, owner, ttl_ms):
+        with self._mutex:
+            if self._current(key) != owner:
+                return False
+            self._locks[key] = (owner, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def release(self, key, owner, owner_prefix=''):
+        with self._mutex:
+            holder = self._current(key)
+            if holder is None:
+                return True
+            if holder == owner or (owner_prefix and holder.startswith(owner_prefix)):
+                del self._locks[key]
+                return True
+            return False
+
+    def holder(self, key):
+        with self._mutex:
+            return self._current(key)
+
+    def holders(self, keys):
+        with self._mutex:
+            return [self._current(key) for key in keys]
+
+
+_in_process_backend = InProcessLockBackend()
+
+# Scripts are registered once per process, not on every lock call
+_redis_backend = None
+
+
+def get_lock_backend():
+    global _redis_backend
+    if frappe.flags.in_test:
+        return _in_process_backend
+
+    cache = frappe.cache()
+    if _redis_backend is None or _redis_backend.cache is not cache:
+        _redis_backend = RedisLockBackend(cache)
+    return _redis_backend
+
+
+def get_lock_ttl():
+    """Lock lifetime in seconds"""
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    return cint(settings.get('lock_ttl_minutes') or DEFAULT_LOCK_TTL_MINUTES) * 60
+
+
+def acquire_lock(doctype, name, session_id=None, user=None):
+    """
+    Take or refresh the lock on a document for a user session
+
+    Returns a dict with acquired, is_new (ownership changed) and, when
+    someone else holds it, locked_by (user) and is_same_user.
+    """
+    _check_doctype(doctype)
+    user = user or frappe.session.user
+    owner = _owner(user, session_id)
+    ttl = get_lock_ttl()
+
+    # A task reserved for the user by claim_first_lock goes to the first of their sessions
+    reservation = _owner(user, None) if session_id else ''
+    acquired, holder, is_new = get_lock_backend().acquire(LOCK_KEY + f'{doctype}:{name}', owner, ttl * 1000,
+        reservation)
+
+    if not acquired:
+        holder_user = _parse_owner(holder)[0]
+        return frappe._dict({
+            'acquired': False,
+            'locked_by': holder_user,
+            'is_same_user': holder_user == user
+        })
+
+    if is_new:
+        _update_lock_view(doctype, name, user, session_id)
+
+    return frappe._dict({
+        'acquired': True,
+        'is_new': is_new,
+        'ttl': ttl
+    })
+
+
+def claim_first_lock(documents, user=None):
+    """
+    Reserve the first of documents ((doctype, name) in order of
+    preference) that nobody holds, in one atomic step
+
+    Users claiming at the same time each get a different document
+    without retrying. The reservation belongs to the user; the page
+    session that opens the document takes it over (acquire_lock).
+    Returns (doctype, name, is_new) or None when all are taken.
+    """
+    documents = list(documents)
+    for doctype, name in documents:
+        _check_doctype(doctype)
+    if not documents:
+        return None
+
+    user = user or frappe.session.user
+    position, is_new = get_lock_backend().claim(
+        [LOCK_KEY + f'{doctype}:{name}' for doctype, name in documents],
+        _owner(user, None), get_lock_ttl() * 1000)
+    if position is None:
+        return None
+
+    doctype, name = documents[position]
+    if is_new:
+        _update_lock_view(doctype, name, user, None)
+
+    return doctype, name, is_new
+
+
+def renew_lock(doctype, name, session_id=None, user=None):
+    """Heartbeat: extend the lock if this session still holds it"""
+    _check_doctype(doctype)
+    owner = _owner(user or frappe.session.user, session_id)
+    return get_lock_backend().renew(LOCK_KEY + f'{doctype}:{name}', owner, get_lock_ttl() * 1000)
+
+
+def release_lock(doctype, name, session_id=None, user=None):
+    """
+    Release a lock held by this user
+
+    Without a session_id any session of the user may release it, which
+    matches the pages' unlock-on-navigate behaviour.
+    """
+    _check_doctype(doctype)
+    user = user or frappe.session.user
+    owner = _owner(user, session_id)
+    prefix = '' if session_id else _owner(user, '')
+
+    released = get_lock_backend().release(LOCK_KEY + f'{doctype}:{name}', owner, prefix)
+
+    if released and frappe.db.get_value(doctype, name, 'wms_locked_by') == user:
+        _update_lock_view(doctype, name, None, None)
+
+    return released
+
+
+def get_lock_holder(doctype, name):
+    """(user, session_id) of the current holder, or None"""
+    holder = get_lock_backend().holder(LOCK_KEY + f'{doctype}:{name}')
+    return _parse_owner(holder) if holder else None
+
+
+def get_lock_holders(doctype, names):
+    """{name: (user, session_id)} of the documents that are locked now, in one round trip"""
+    names = list(names)
+    holders = get_lock_backend().holders([LOCK_KEY + f'{doctype}:{name}' for name in names])
+    return {name: _parse_owner(holder) for name, holder in zip(names, holders) if holder}
+
+
+def clear_expired_lock_views(doctype, locked_before):
+    """
+    Clear the lock fields of documents whose lock expired
+
+    A lock that times out (closed tab, dead device) leaves the fields
+    set, as only the holder clears them. Views written at or after
+    locked_before are kept: their lock may be newer than this check.
+    Returns the names cleared.
+    """
+    _check_doctype(doctype)
+    locked = frappe.get_all(doctype,
+        filters={'wms_locked_by': ['is', 'set'], 'wms_locked_at': ['<', locked_before]},
+        pluck='name')
+    if not locked:
+        return []
+
+    holders = get_lock_holders(doctype, locked)
+    expired = [name for name in locked if name not in holders]
+    if expired:
+        frappe.db.set_value(doctype, {'name': ['in', expired], 'wms_locked_at': ['<', locked_before]}, {
+            'wms_locked_by': None,
+            'wms_locked_at': None,
+            'wms_session_id': None
+        }, update_modified=False)
+
+        if doctype == 'Pick List':
+            for name in expired:
+                track_pick_list_row(name)
+
+    return expired
+
+
+def _update_lock_view(doctype, name, user, session_id):
+    """Mirror lock ownership onto the document without saving it"""
+    frappe.db.set_value(doctype, name, {
+        'wms_locked_by': user,
+        'wms_locked_at': now() if user else None,
+        'wms_session_id': session_id if user else None
+    }, update_modified=False)
+
+    if doctype == 'Pick List':
+        track_pick_list_row(name)
+
+
+def _owner(user, session_id):
+    return f'{user}::{session_id or ""}'
+
+
+def _parse_owner(owner):
+    user, sep, session_id = (owner or '').partition('::')
+    return user, session_id or None
+
+
+def _check_doctype(doctype):
+    if doctype not in LOCKABLE_DOCTYPES:
+        frappe.throw(_("WMS locks are not supported for {0}").format(doctype))
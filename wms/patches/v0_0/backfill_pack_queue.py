@@ -0,0 +1,26 @@
+import frappe
+
+from wms.install import create_wms_custom_fields, create_wms_indexes
+
+
+def execute():
+    """Initialise the per delivery note summary read by the pack queue"""
+    create_wms_custom_fields()
+    create_wms_indexes()
+
+    frappe.db.sql("""
+        UPDATE `tabDelivery Note` dn
+        SET
+            dn.wms_total_lines = (
+                SELECT COUNT(*)
+                FROM `tabDelivery Note Item` dni
+                WHERE dni.parent = dn.name AND dni.parenttype = 'Delivery Note'
+            ),
+            dn.wms_pack_pending = IF(
+                IFNULL(dn.pick_list, '') != ''
+                    AND IFNULL(dn.wms_packing_complete, 0) = 0
+                    AND IFNULL(dn.wms_total_packed_qty, 0) < dn.total_qty,
+                1, 0
+            )
+        WHERE dn.docstatus = 0
+    """)
@@ -0,0 +1,42 @@
+import frappe
+
+from wms.install import create_wms_custom_fields
+
+
+def execute():
+    """Initialise the progress totals that are now maintained incrementally"""
+    create_wms_custom_fields()
+
+    frappe.db.sql("""
+        UPDATE `tabPick List` pl
+        SET
+            pl.wms_picked_qty = (
+                SELECT IFNULL(SUM(pli.picked_qty), 0)
+                FROM `tabPick List Item` pli
+                WHERE pli.parent = pl.name AND pli.parenttype = 'Pick List'
+            ),
+            pl.wms_picked_lines = (
+                SELECT COUNT(*)
+                FROM `tabPick List Item` pli
+                WHERE pli.parent = pl.name AND pli.parenttype = 'Pick List'
+                    AND pli.qty > 0 AND pli.picked_qty >= pli.qty
+            )
+        WHERE pl.docstatus < 2
+    """)
+
+    frappe.db.sql("""
+        UPDATE `tabDelivery Note` dn
+        SET
+            dn.wms_total_packed_qty = (
+                SELECT IFNULL(SUM(dni.wms_packed_qty), 0)
+                FROM `tabDelivery Note Item` dni
+                WHERE dni.parent = dn.name AND dni.parenttype = 'Delivery Note'
+            ),
+            dn.wms_packed_lines = (
+                SELECT COUNT(*)
+                FROM `tabDelivery Note Item` dni
+                WHERE dni.parent = dn.name AND dni.parenttype = 'Delivery Note'
+                    AND dni.qty > 0 AND dni.wms_packed_qty >= dni.qty
+            )
+        WHERE dn.docstatus = 0
+    """)
@@ -0,0 +1,50 @@
+import json
+
+import frappe
+from frappe.utils import flt, now
+
+
+def execute():
+    """Move the JSON package contents of WMS Package into WMS Package Item rows"""
+    frappe.reload_doc('wms', 'doctype', 'wms_package_item')
+    frappe.reload_doc('wms', 'doctype', 'wms_package')
+    frappe.reload_doc('wms', 'doctype', 'wms_shipment')
+
+    if not frappe.db.has_column('WMS Package', 'package_items'):
+        return
+
+    packages = frappe.db.sql("""
+        SELECT pkg.parent, pkg.package_no, pkg.package_items
+        FROM `tabWMS Package` pkg
+        WHERE pkg.parenttype = 'WMS Shipment'
+            AND IFNULL(pkg.package_items, '') NOT IN ('', '[]')
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabWMS Package Item` pi
+                WHERE pi.parent = pkg.parent AND pi.parenttype = 'WMS Shipment'
+            )
+        ORDER BY pkg.parent, pkg.idx
+    """, as_dict=True)
+
+    timestamp = now()
+    rows = []
+    idx = {}
+    for package in packages:
+        try:
+            items = json.loads(package.package_items)
+        except ValueError:
+            continue
+
+        for item in items if isinstance(items, list) else ():
+            if not isinstance(item, dict) or not item.get('item_code'):
+                continue
+
+            idx[package.parent] = idx.get(package.parent, 0) + 1
+            rows.append((frappe.generate_hash(length=10), package.parent, 'WMS Shipment', 'package_items',
+                idx[package.parent], package.package_no or '', item['item_code'], item.get('item_name'),
+                flt(item.get('wms_packed_qty') or item.get('qty')), item.get('name'),
+                timestamp, timestamp, 'Administrator', 'Administrator'))
+
+    frappe.db.bulk_insert('WMS Package Item',
+        ('name', 'parent', 'parenttype', 'parentfield', 'idx', 'package_no', 'item_code', 'item_name', 'qty',
+            'delivery_note_item', 'creation', 'modified', 'owner', 'modified_by'),
+        rows)
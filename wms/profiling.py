@@ -0,0 +1,219 @@
+"""
+WMS Profiling
+Opt-in instrumentation of whitelisted WMS methods
+
+When profiling is enabled in WMS Settings, every /api/method/wms.* request
+records its wall time, database query count and time, cache hits and
+misses and response size. Samples go to a capped Redis list per method (a
+ring buffer of the most recent calls) and are aggregated into percentiles
+when read. With profiling disabled the request hooks cost one cached
+settings lookup for WMS requests and a string check for all others.
+"""
+
+import json
+import time
+
+import frappe
+
+PROFILE_METHODS = 'wms_profile_methods'
+PROFILE_SAMPLES = 'wms_profile_samples:'
+WMS_METHOD_PREFIX = 'wms.'
+DEFAULT_SAMPLE_SIZE = 1000
+
+# Reading the profile would otherwise fill it with its own calls
+EXCLUDED_METHODS = {'wms.api.get_wms_profile', 'wms.api.clear_wms_profile'}
+
+
+def before_request():
+    method = get_request_method()
+    if not method or not is_profiling_enabled():
+        return
+
+    frappe.local.wms_profile = frappe._dict({
+        'method': method,
+        'start': time.perf_counter(),
+        'queries': 0,
+        'query_time': 0.0,
+        'cache_hits': 0,
+        'cache_misses': 0
+    })
+    instrument_db()
+    instrument_cache()
+
+
+def after_request(response=None, request=None):
+    profile = getattr(frappe.local, 'wms_profile', None)
+    if not profile:
+        return
+
+    # Stop counting before the sample itself is written
+    frappe.local.wms_profile = None
+    frappe.db.sql = profile.sql
+
+    record_sample(profile.method, {
+        'at': int(time.time()),
+        'user': frappe.session.user,
+        'ms': round((time.perf_counter() - profile.start) * 1000, 2),
+        'queries': profile.queries,
+        'query_ms': round(profile.query_time * 1000, 2),
+        'cache_hits': profile.cache_hits,
+        'cache_misses': profile.cache_misses,
+        'bytes': (response.calculate_content_length() or 0) if response else 0,
+        'status': response.status_code if response else 0
+    })
+
+
+def get_request_method():
+    """The dotted method of an /api/method/wms.* request, else None"""
+    request = getattr(frappe.local, 'request', None)
+    path = request.path if request else ''
+    if '/method/' not in path:
+        return None
+
+    method = path.rpartition('/method/')[2]
+    if method.startswith(WMS_METHOD_PREFIX) and method not in EXCLUDED_METHODS:
+        return method
+
+
+def is_profiling_enabled():
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    return bool(settings.get('enable_profiling'))
+
+
+def get_sample_size():
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    return settings.get('profiling_sample_size') or DEFAULT_SAMPLE_SIZE
+
+
+def instrument_db():
+    """Time every query of this request; the connection is per request, so patching it is safe"""
+    profile = frappe.local.wms_profile
+    profile.sql = sql = frappe.db.sql
+
+    def profiled_sql(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return sql(*args, **kwargs)
+        finally:
+            profile.queries += 1
+            profile.query_time += time.perf_counter() - start
+
+    frappe.db.sql = profiled_sql
+
+
+def instrument_cache():
+    """
+    Count hits and misses of the shared cache client
+
+    The client is shared by all requests of the process, so it is wrapped
+    once and the wrappers count into the profile of the current request,
+    if any.
+    """
+    cache = frappe.cache()
+    if getattr(cache, 'wms_profiled', False):
+        return
+
+    get_value = cache.get_value
+    hget = cache.hget
+
+    def profiled_get_value(key, generator=None, *args, **kwargs):
+        generated = []
+        if generator:
+            original = generator
+
+            def generator():
+                generated.append(True)
+                return original()
+
+        value = get_value(key, generator, *args, **kwargs)
+        count_cache_lookup(value is not None and not generated)
+        return value
+
+    def profiled_hget(name, key, *args, **kwargs):
+        value = hget(name, key, *args, **kwargs)
+        count_cache_lookup(value is not None)
+        return value
+
+    cache.get_value = profiled_get_value
+    cache.hget = profiled_hget
+    cache.wms_profiled = True
+
+
+def count_cache_lookup(hit):
+    profile = getattr(frappe.local, 'wms_profile', None)
+    if not profile:
+        return
+
+    if hit:
+        profile.cache_hits += 1
+    else:
+        profile.cache_misses += 1
+
+
+def record_sample(method, sample):
+    """Push a sample onto the method's ring buffer"""
+    cache = frappe.cache()
+    key = cache.make_key(PROFILE_SAMPLES + method)
+
+    pipe = cache.pipeline()
+    pipe.lpush(key, json.dumps(sample))
+    pipe.ltrim(key, 0, get_sample_size() - 1)
+    pipe.sadd(cache.make_key(PROFILE_METHODS), method)
+    pipe.execute()
+
+
+def get_profile_stats(method=None):
+    """Aggregated samples per method, slowest p95 first"""
+    cache = frappe.cache()
+    methods = [method] if method else sorted(
+        frappe.safe_decode(name) for name in cache.smembers(PROFILE_METHODS)
+    )
+
+    pipe = cache.pipeline()
+    for name in methods:
+        pipe.lrange(cache.make_key(PROFILE_SAMPLES + name), 0, -1)
+
+    stats = []
+    for name, samples in zip(methods, pipe.execute()):
+        if samples:
+            stats.append(summarize_samples(name, [json.loads(sample) for sample in samples]))
+
+    stats.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return stats
+
+
+def summarize_samples(method, samples):
+    timings = [sample['ms'] for sample in samples]
+    calls = len(samples)
+    cache_lookups = sum(sample['cache_hits'] + sample['cache_misses'] for sample in samples)
+
+    return {
+        'method': method,
+        'calls': calls,
+        'errors': sum(1 for sample in samples if sample['status'] >= 400),
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings),
+        'avg_queries': round(sum(sample['queries'] for sample in samples) / calls, 1),
+        'max_queries': max(sample['queries'] for sample in samples),
+        'avg_query_ms': round(sum(sample['query_ms'] for sample in samples) / calls, 2),
+        'cache_hit_rate': round(sum(sample['cache_hits'] for sample in samples) / cache_lookups, 3)
+            if cache_lookups else None,
+        'avg_bytes': int(sum(sample['bytes'] for sample in samples) / calls),
+        'last_called': max(sample['at'] for sample in samples)
+    }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def clear_profile():
+    cache = frappe.cache()
+    methods = cache.smembers(PROFILE_METHODS)
+    keys = [cache.make_key(PROFILE_SAMPLES + frappe.safe_decode(name)) for name in methods]
+    cache.delete(cache.make_key(PROFILE_METHODS), *keys)
@@ -0,0 +1,163 @@
+"""
+WMS Progress
+Row-level pick and pack progress writes
+
+Scans only change a few fields on one child row. Instead of saving the
+whole Pick List / Delivery Note (and re-running its validate hooks), the
+row is updated directly and the parent's progress totals are adjusted
+by the difference. The parent row is locked and its wms_version checked
+and bumped, so concurrent writers and stale clients are detected.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+
+class VersionConflictError(frappe.ValidationError):
+    pass
+
+
+PROGRESS_DOCTYPES = {
+    'Pick List': frappe._dict({
+        'child_doctype': 'Pick List Item',
+        'qty_field': 'picked_qty',
+        'total_field': 'wms_picked_qty',
+        'lines_field': 'wms_picked_lines'
+    }),
+    'Delivery Note': frappe._dict({
+        'child_doctype': 'Delivery Note Item',
+        'qty_field': 'wms_packed_qty',
+        'total_field': 'wms_total_packed_qty',
+        'lines_field': 'wms_packed_lines',
+        # Keeps the pack queue (wms.api.get_unpacked_delivery_notes) current
+        'pending_field': 'wms_pack_pending'
+    })
+}
+
+# Parent fields that decide whether a delivery note waits in the pack queue
+PACK_QUEUE_FIELDS = ['docstatus', 'pick_list', 'wms_packing_complete', 'total_qty']
+
+
+def update_progress_rows(doctype, name, updates, expected_version=None):
+    """
+    Apply row updates to a Pick List or Delivery Note without saving it
+
+    updates: list of (row idx, {fieldname: value}) applied in order.
+    Empty values and fields the child table does not have are skipped.
+
+    Returns (new_version, missing) where missing lists the idx values that
+    matched no row. Raises VersionConflictError when expected_version is
+    given and the document changed since.
+    """
+    config = PROGRESS_DOCTYPES[doctype]
+    parent = lock_parent(doctype, name, expected_version)
+
+    idxs = list({cint(idx) for idx, values in updates})
+    rows = {
+        row.idx: row for row in frappe.get_all(config.child_doctype,
+            filters={'parent': name, 'parenttype': doctype, 'idx': ['in', idxs]},
+            fields=['name', 'idx', 'qty', config.qty_field])
+    }
+
+    meta = frappe.get_meta(config.child_doctype)
+    total = flt(parent.get(config.total_field))
+    lines = cint(parent.get(config.lines_field))
+    missing = []
+
+    for idx, values in updates:
+        row = rows.get(cint(idx))
+        if not row:
+            missing.append(idx)
+            continue
+
+        values = {
+            fieldname: value for fieldname, value in values.items()
+            if value not in (None, '') and meta.has_field(fieldname)
+        }
+        if not values:
+            continue
+
+        if config.qty_field in values:
+            old_qty = flt(row.get(config.qty_field))
+            new_qty = values[config.qty_field] = flt(values[config.qty_field])
+            total += new_qty - old_qty
+            lines += _is_complete(new_qty, row.qty) - _is_complete(old_qty, row.qty)
+
+        frappe.db.set_value(config.child_doctype, row.name, values)
+        row.update(values)
+
+    version = cint(parent.wms_version) + 1
+    values = {
+        'wms_version': version,
+        config.total_field: total,
+        config.lines_field: lines
+    }
+    if config.pending_field:
+        values[config.pending_field] = is_pack_pending(parent, total)
+
+    frappe.db.set_value(doctype, name, values)
+
+    return version, missing
+
+
+def lock_parent(doctype, name, expected_version=None):
+    """Lock the parent row for update and check its version"""
+    config = PROGRESS_DOCTYPES[doctype]
+    fields = ['name', 'wms_version', config.total_field, config.lines_field]
+    if config.pending_field:
+        fields += PACK_QUEUE_FIELDS
+
+    parent = frappe.db.get_value(doctype, name, fields, as_dict=True, for_update=True)
+
+    if not parent:
+        frappe.throw(_("{0} {1} not found").format(_(doctype), name), frappe.DoesNotExistError)
+
+    if expected_version not in (None, '') and cint(expected_version) != cint(parent.wms_version):
+        raise VersionConflictError(
+            _("{0} {1} has been changed by someone else").format(_(doctype), name)
+        )
+
+    return parent
+
+
+def get_version(doctype, name):
+    """Current progress version of a document"""
+    return cint(frappe.db.get_value(doctype, name, 'wms_version'))
+
+
+def calculate_progress_totals(doc):
+    """Recompute the progress totals on a full document save"""
+    config = PROGRESS_DOCTYPES[doc.doctype]
+    rows = doc.locations if doc.doctype == 'Pick List' else doc.items
+
+    total = 0
+    lines = 0
+    for row in rows:
+        qty = flt(row.get(config.qty_field))
+        total += qty
+        lines += _is_complete(qty, row.qty)
+
+    doc.set(config.total_field, total)
+    doc.set(config.lines_field, lines)
+
+    if config.pending_field:
+        doc.wms_total_lines = len(rows)
+        doc.set(config.pending_field, is_pack_pending(doc, total))
+
+    # Any full save invalidates versions held by scanning clients
+    doc.wms_version = cint(doc.get('wms_version')) + 1
+
+
+def is_pack_pending(doc, packed_qty):
+    """Whether a delivery note belongs in the pack queue"""
+    return 1 if (
+        cint(doc.docstatus) == 0
+        and doc.get('pick_list')
+        and not cint(doc.get('wms_packing_complete'))
+        and flt(packed_qty) < flt(doc.get('total_qty'))
+    ) else 0
+
+
+def _is_complete(done_qty, qty):
+    return 1 if flt(qty) > 0 and flt(done_qty) >= flt(qty) else 0
@@ -0,0 +1,206 @@
+"""
+WMS Progress Feed
+Coalesced pick and pack progress for supervisors
+
+Scans do not publish realtime events themselves. publish_progress is
+called once a scan is committed and sends a snapshot of the document
+(lines and qty done) at most once per SNAPSHOT_INTERVAL: the first scan
+after a quiet spell goes out at once, later scans in the same interval
+only mark the document as changed. Changed documents are published
+together, once their interval is over, by a short job queued with the
+mark; the scheduler sweeps up anything left. The number of events follows the number
+of active documents, not the scan rate.
+
+Snapshots go to the document's room (anyone with the form open) and,
+batched into one event per warehouse, to the room of the layout
+warehouse, which supervisors join with
+frappe.realtime.doc_subscribe('Warehouse', warehouse).
+"""
+
+import frappe
+from frappe.realtime import get_doc_room
+from frappe.utils import cint, flt, now
+
+from wms.availability import get_layout
+from wms.progress import PROGRESS_DOCTYPES
+
+SNAPSHOT_EVENT = 'wms_progress_snapshot'
+WAREHOUSE_EVENT = 'wms_warehouse_progress'
+
+# Documents scanned since their last snapshot, and the per-document
+# interval that is open after a snapshot went out
+PROGRESS_CHANGED = 'wms_progress_changed'
+PROGRESS_WINDOW = 'wms_progress_window:'  # + doctype::name
+
+SNAPSHOT_INTERVAL = 2  # seconds
+
+# Raw key set while a flush job is queued, so there is one at a time;
+# expires in case a queued job is lost
+FLUSH_QUEUED = 'wms_progress_flush_queued'
+FLUSH_QUEUED_TTL = 60
+
+
+def publish_progress(doctype, name):
+    """Publish the progress of a document after a committed scan, coalescing bursts"""
+    cache = frappe.cache()
+    doc_key = f'{doctype}::{name}'
+
+    if cache.set(cache.make_key(PROGRESS_WINDOW + doc_key), 1, nx=True, ex=SNAPSHOT_INTERVAL):
+        cache.hdel(PROGRESS_CHANGED, doc_key)
+        publish_progress_snapshots([(doctype, name)])
+        return
+
+    # Raw hash field; only the first scan of an interval queues the flush
+    if cache.hsetnx(cache.make_key(PROGRESS_CHANGED), doc_key, 1):
+        queue_progress_flush()
+
+
+def queue_progress_flush():
+    """Queue flush_progress_snapshots unless a run is queued already"""
+    cache = frappe.cache()
+    if cache.set(cache.make_key(FLUSH_QUEUED), 1, nx=True, ex=FLUSH_QUEUED_TTL):
+        frappe.enqueue('wms.progress_feed.flush_progress_snapshots', queue='short')
+
+
+def flush_progress_snapshots():
+    """
+    Publish a snapshot of every changed document whose interval is over
+
+    One pass, run as the job queued by publish_progress and by the
+    scheduler as a sweep. While documents are still inside their
+    interval the job queues itself again behind the other short jobs
+    instead of waiting, so the last scans of a burst go out right after
+    their interval.
+    """
+    cache = frappe.cache()
+    name = cache.make_key(PROGRESS_CHANGED)
+    # A scan marking a document from here on queues the next run
+    cache.delete(cache.make_key(FLUSH_QUEUED))
+
+    doc_keys = [frappe.safe_decode(doc_key) for doc_key in cache.hkeys(PROGRESS_CHANGED)]
+    if not doc_keys:
+        return
+
+    windows = cache.mget([cache.make_key(PROGRESS_WINDOW + doc_key) for doc_key in doc_keys])
+    due = [doc_key for doc_key, window in zip(doc_keys, windows) if not window]
+    if len(due) < len(doc_keys):
+        queue_progress_flush()
+    if not due:
+        return
+
+    # Open a new interval for the published documents, so scans right
+    # after this snapshot are coalesced again
+    pipe = cache.pipeline()
+    pipe.hdel(name, *due)
+    for doc_key in due:
+        pipe.set(cache.make_key(PROGRESS_WINDOW + doc_key), 1, ex=SNAPSHOT_INTERVAL)
+    pipe.execute()
+
+    publish_progress_snapshots([tuple(doc_key.split('::', 1)) for doc_key in due])
+
+
+def publish_progress_snapshots(docs):
+    """Send snapshots of (doctype, name) pairs to their document and warehouse rooms"""
+    by_warehouse = {}
+    for snapshot in get_progress_snapshots(docs):
+        frappe.publish_realtime(SNAPSHOT_EVENT, snapshot,
+            room=get_doc_room(snapshot['doctype'], snapshot['name']))
+        if snapshot['warehouse']:
+            by_warehouse.setdefault(snapshot['warehouse'], []).append(snapshot)
+
+    for warehouse, snapshots in by_warehouse.items():
+        frappe.publish_realtime(WAREHOUSE_EVENT, {
+            'warehouse': warehouse,
+            'documents': snapshots
+        }, room=get_doc_room('Warehouse', warehouse))
+
+
+def get_progress_snapshots(docs):
+    """
+    Lines and qty done of Pick Lists, Delivery Notes and WMS Waves
+
+    Two queries per doctype however many documents are asked for; a
+    wave adds up the pick lists it holds.
+    """
+    names = {}
+    for doctype, name in docs:
+        names.setdefault(doctype, set()).add(name)
+
+    waves = names.pop('WMS Wave', set())
+    members = {}
+    wave_warehouses = {}
+    if waves:
+        for row in frappe.get_all('WMS Wave Pick List',
+                filters={'parent': ['in', list(waves)], 'parenttype': 'WMS Wave'},
+                fields=['parent', 'pick_list']):
+            members.setdefault(row.parent, []).append(row.pick_list)
+        wave_warehouses = dict(frappe.get_all('WMS Wave',
+            filters={'name': ['in', list(waves)]},
+            fields=['name', 'warehouse'],
+            as_list=True))
+
+    member_names = {pick_list for pick_lists in members.values() for pick_list in pick_lists}
+    fetch = dict(names)
+    fetch['Pick List'] = names.get('Pick List', set()) | member_names
+
+    progress = {}
+    for doctype, doc_names in fetch.items():
+        if doc_names:
+            progress.update(_get_document_progress(doctype, doc_names))
+
+    snapshots = []
+    for doctype, doc_names in names.items():
+        for name in doc_names:
+            if (doctype, name) in progress:
+                snapshots.append(progress[(doctype, name)])
+
+    for wave in waves:
+        parts = [progress[('Pick List', pick_list)] for pick_list in members.get(wave, ())
+            if ('Pick List', pick_list) in progress]
+        snapshots.append(_snapshot('WMS Wave', wave, wave_warehouses.get(wave),
+            sum(part['lines_done'] for part in parts), sum(part['total_lines'] for part in parts),
+            sum(part['qty_done'] for part in parts), sum(part['total_qty'] for part in parts)))
+
+    return snapshots
+
+
+def _get_document_progress(doctype, names):
+    config = PROGRESS_DOCTYPES[doctype]
+    names = list(names)
+
+    totals = {
+        row.parent: row for row in frappe.get_all(config.child_doctype,
+            filters={'parent': ['in', names], 'parenttype': doctype},
+            fields=['parent', 'count(name) as total_lines', 'sum(qty) as total_qty',
+                'max(warehouse) as warehouse'],
+            group_by='parent')
+    }
+
+    progress = {}
+    for doc in frappe.get_all(doctype,
+            filters={'name': ['in', names]},
+            fields=['name', 'wms_version', 'wms_locked_by', config.total_field, config.lines_field]):
+        total = totals.get(doc.name) or frappe._dict()
+        progress[(doctype, doc.name)] = _snapshot(doctype, doc.name,
+            get_layout(total.warehouse) or total.warehouse,
+            cint(doc.get(config.lines_field)), cint(total.total_lines),
+            flt(doc.get(config.total_field)), flt(total.total_qty),
+            locked_by=doc.wms_locked_by, version=cint(doc.wms_version))
+
+    return progress
+
+
+def _snapshot(doctype, name, warehouse, lines_done, total_lines, qty_done, total_qty,
+        locked_by=None, version=None):
+    return {
+        'doctype': doctype,
+        'name': name,
+        'warehouse': warehouse,
+        'lines_done': lines_done,
+        'total_lines': total_lines,
+        'qty_done': qty_done,
+        'total_qty': total_qty,
+        'locked_by': locked_by,
+        'version': version,
+        'at': now()
+    }
@@ -76,7 +76,8 @@ wms.optimize_packing = function(frm) {
                 let msg = __('Förslag på {0} paket:', [result.packages.length]) + '<br><br>';
 
                 result.packages.forEach((pkg, idx) => {
-                    msg += `<strong>Paket ${idx + 1}:</strong> ${pkg.items.length} artiklar, ${pkg.weight} kg<br>`;
+                    let box = pkg.box_type ? `${pkg.box_type} (${pkg.length}×${pkg.width}×${pkg.height} cm)` : __('Egen förpackning');
+                    msg += `<strong>Paket ${idx + 1}:</strong> ${box}, ${pkg.items.length} artiklar, ${pkg.weight} kg, ${pkg.fill}% fyllt<br>`;
                 });
 
                 frappe.msgprint({
@@ -16,11 +16,22 @@ frappe.ui.form.on('Pick List', {
                 }, __('WMS'));
             }
 
-            // Open or Draft - show pick button
-            if (frm.doc.status === 'Open' || frm.doc.status === 'Draft') {
+            // Picked by zone - show its zone tasks instead
+            if (frm.doc.wms_zone_picking) {
+                frm.add_custom_button(__('Zone Tasks'), function() {
+                    frappe.set_route('List', 'WMS Zone Task', { pick_list: frm.doc.name });
+                }, __('WMS')).addClass('btn-primary');
+            } else if (frm.doc.status === 'Open' || frm.doc.status === 'Draft') {
+                // Open or Draft - show pick button
                 frm.add_custom_button(__('Start Picking'), function() {
                     wms.open_optimized_pick_view(frm);
                 }, __('WMS')).addClass('btn-primary');
+
+                if (!frm.doc.wms_wave) {
+                    frm.add_custom_button(__('Split by Zone'), function() {
+                        wms.split_pick_list_by_zone(frm);
+                    }, __('WMS'));
+                }
             }
         }
     },
@@ -58,8 +69,8 @@ wms.optimize_pick_route = function(frm) {
                 frappe.msgprint({
                     title: __('Rutt Optimerad'),
                     indicator: 'green',
-                    message: __('Plockrutten har optimerats. {0} steg, beräknad tid: {1} minuter',
-                        [r.message.steps, r.message.estimated_time])
+                    message: __('Plockrutten har optimerats. {0} steg, {1} m gångväg, beräknad tid: {2} minuter',
+                        [r.message.steps, r.message.distance, r.message.estimated_time])
                 });
 
                 frm.reload_doc();
@@ -68,6 +79,34 @@ wms.optimize_pick_route = function(frm) {
     });
 };
 
+wms.split_pick_list_by_zone = function(frm) {
+    frappe.call({
+        method: 'wms.api.split_pick_list_by_zone',
+        args: {
+            pick_list: frm.doc.name
+        },
+        freeze: true,
+        callback: function(r) {
+            if (!r.message) return;
+
+            const tasks = r.message.zone_tasks || [];
+            frappe.msgprint({
+                title: __('Zone Tasks'),
+                indicator: tasks.length ? 'green' : 'orange',
+                message: tasks.length
+                    ? tasks.map(task => __('{0} ({1}): {2} lines, ~{3} min, {4}',
+                        [task.name, task.zone || __('Other'), task.lines, task.estimated_time,
+                            task.assigned_to || __('unassigned')])).join('<br>')
+                        + '<br><br>' + __('~{0} min in parallel instead of ~{1} min for one picker',
+                            [r.message.estimated_time, r.message.single_picker_time])
+                    : r.message.message
+            });
+
+            frm.reload_doc();
+        }
+    });
+};
+
 wms.show_pick_stats = function(frm) {
     if (!frm.doc.locations) return;
 
@@ -35,11 +35,12 @@ frappe.ui.form.on('Stock Entry Detail', {
                 method: 'wms.api.get_item_location',
                 args: {
                     item_code: row.item_code,
-                    warehouse: row.s_warehouse
+                    warehouse: row.s_warehouse,
+                    qty: row.transfer_qty || row.qty || 0
                 },
                 callback: function(r) {
                     if (r.message) {
-                        frappe.model.set_value(cdt, cdn, 'wms_source_location', r.message);
+                        frappe.model.set_value(cdt, cdn, 'wms_source_location', r.message.location);
                     }
                 }
             });
@@ -136,7 +137,7 @@ wms.verify_locations = function(frm) {
                     frappe.msgprint({
                         title: __('Verifieringsfel'),
                         indicator: 'red',
-                        message: __('Problem: {0}', [result.errors.join(', ')])
+                        message: result.errors.join('<br>')
                     });
                 }
             }
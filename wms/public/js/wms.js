@@ -83,6 +83,198 @@ wms.utils = {
     }
 };
 
+// Durable queue of scan confirmations for one document
+//
+// Scans are confirmed on the device right away and kept in IndexedDB
+// until wms.api.replay_scan_events has them, so nothing is lost when the
+// network drops or the tab is closed. Events left over from an earlier
+// visit are picked up again by open(). Without IndexedDB (private mode)
+// the queue only lives in memory.
+wms.ScanQueue = class ScanQueue {
+    constructor(opts) {
+        this.doctype = opts.doctype;
+        this.name = opts.name;
+        this.session_id = opts.session_id;
+        this.on_result = opts.on_result || (() => {});  // conflicts and errors
+        this.on_stored = opts.on_stored || (() => {});  // new document version
+
+        this.doc_key = `${frappe.session.user}::${this.doctype}::${this.name}`;
+        this.events = [];
+        this.seq = 0;
+        this.flush_timer = null;
+        this.retry_ms = ScanQueue.RETRY_MS;
+        this.flushing = null;
+
+        $(window).on('online', () => this.flush());
+    }
+
+    open() {
+        // Resolves with the events still waiting from earlier visits
+        return ScanQueue.get_db().then(db => {
+            this.db = db;
+            if (!db) return [];
+
+            return new Promise(resolve => {
+                const request = db.transaction('events').objectStore('events')
+                    .index('doc').getAll(this.doc_key);
+                request.onsuccess = () => resolve(request.result || []);
+                request.onerror = () => resolve([]);
+            });
+        }).then(records => {
+            records.sort((a, b) => a.seq - b.seq);
+            this.events = records.map(record => record.event).concat(this.events);
+            this.seq = records.length ? records[records.length - 1].seq : 0;
+            this.schedule_flush(0);
+            return this.pending();
+        });
+    }
+
+    pending() {
+        return this.events.slice();
+    }
+
+    push(event) {
+        this.events.push(event);
+        this.seq = Math.max(this.seq + 1, Date.now());
+        this.store('put', { key: event.key, doc: this.doc_key, seq: this.seq, event: event });
+        this.schedule_flush();
+    }
+
+    store(action, value) {
+        if (!this.db) return;
+        try {
+            this.db.transaction('events', 'readwrite').objectStore('events')[action](value);
+        } catch (e) {
+            console.error('Scan queue write failed:', e);
+        }
+    }
+
+    schedule_flush(delay = ScanQueue.FLUSH_DELAY_MS) {
+        if (this.events.length >= ScanQueue.BATCH_SIZE) {
+            delay = 0;
+        }
+
+        if (this.flush_timer) {
+            if (delay) return;
+            clearTimeout(this.flush_timer);
+        }
+        this.flush_timer = setTimeout(() => this.flush(), delay);
+    }
+
+    flush() {
+        // Resolves true when every queued event is stored on the server
+        clearTimeout(this.flush_timer);
+        this.flush_timer = null;
+
+        if (this.flushing) {
+            return this.flushing.then(() => this.flush());
+        }
+
+        if (!this.events.length) {
+            return Promise.resolve(true);
+        }
+
+        if (navigator.onLine === false) {
+            // Sent once the device is back online
+            return Promise.resolve(false);
+        }
+
+        const batch = this.events.slice(0, ScanQueue.MAX_BATCH_SIZE);
+        let rejected = false;
+
+        this.flushing = new Promise(resolve => {
+            frappe.call({
+                method: 'wms.api.replay_scan_events',
+                args: {
+                    doctype: this.doctype,
+                    name: this.name,
+                    events: batch,
+                    session_id: this.session_id
+                },
+                freeze: false,
+                callback: (r) => {
+                    const data = r.message || {};
+                    const done = new Set();
+
+                    (data.results || []).forEach((res, i) => {
+                        // Every result is final; conflicts and errors are reported, not retried
+                        done.add(batch[i].key);
+                        if (res.status === 'conflict' || res.status === 'error') {
+                            rejected = true;
+                            this.on_result(res, batch[i]);
+                        }
+                    });
+
+                    this.events = this.events.filter(event => !done.has(event.key));
+                    done.forEach(key => this.store('delete', key));
+                    this.retry_ms = ScanQueue.RETRY_MS;
+
+                    if (data.version) {
+                        this.on_stored(data.version);
+                    }
+                    resolve();
+                },
+                error: () => {
+                    // Kept for the next attempt; the server skips keys it already applied
+                    this.retry_ms = Math.min(this.retry_ms * 2, ScanQueue.MAX_RETRY_MS);
+                    resolve();
+                }
+            });
+        }).finally(() => {
+            this.flushing = null;
+        }).then(() => {
+            if (!this.events.length) return !rejected;
+
+            this.schedule_flush(this.events.length > batch.length ? 0 : this.retry_ms);
+            return false;
+        });
+
+        return this.flushing;
+    }
+
+    static get_db() {
+        if (!ScanQueue.db) {
+            ScanQueue.db = new Promise(resolve => {
+                if (!window.indexedDB) return resolve(null);
+
+                const request = indexedDB.open('wms_scan_queue', 1);
+                request.onupgradeneeded = () => {
+                    const store = request.result.createObjectStore('events', { keyPath: 'key' });
+                    store.createIndex('doc', 'doc');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => resolve(null);
+                request.onblocked = () => resolve(null);
+            });
+        }
+        return ScanQueue.db;
+    }
+};
+
+// Confirmed scans are sent in batches; failed sends back off up to a minute
+wms.ScanQueue.FLUSH_DELAY_MS = 1500;
+wms.ScanQueue.BATCH_SIZE = 5;
+wms.ScanQueue.MAX_BATCH_SIZE = 100;
+wms.ScanQueue.RETRY_MS = 5000;
+wms.ScanQueue.MAX_RETRY_MS = 60000;
+
+// Pull-based work queue: reserve the next pick or pack task and open it
+wms.open_next_task = function(task_type) {
+    frappe.call({
+        method: 'wms.api.get_next_task',
+        args: { task_type: task_type || 'Pick' },
+        freeze: true,
+        callback: function(r) {
+            const task = r.message && r.message.task;
+            if (task) {
+                frappe.set_route(...task.route);
+            } else {
+                frappe.show_alert({ message: (r.message && r.message.message) || __('No open tasks'), indicator: 'blue' }, 5);
+            }
+        }
+    });
+};
+
 // Initialize when page loads
 frappe.ready(function() {
     console.log('WMS Module Loaded');
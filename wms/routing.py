@@ -0,0 +1,510 @@
+"""
+WMS Routing
+Warehouse layout graph, cached distance matrix and pick route sequencing
+"""
+
+import heapq
+import math
+import time
+from array import array
+
+import frappe
+
+DISTANCE_MATRIX_CACHE = 'wms_distance_matrix'
+
+# Planned routes per pick list, see get_pick_list_route
+PICK_ROUTE_CACHE = 'wms_pick_routes'
+
+# Default time budget for the improvement heuristics (seconds)
+ROUTE_TIME_BUDGET = 0.5
+
+
+class DistanceMatrix:
+    """
+    Shortest walking distances between all positions of a warehouse
+
+    Locations sharing aisle and bay are one position (different levels of
+    the same rack), so the matrix is sized by positions, not by locations.
+    """
+
+    __slots__ = ('index', 'size', 'data', 'depot')
+
+    def __init__(self, index, size, data, depot=None):
+        self.index = index  # location name -> position
+        self.size = size
+        self.data = data  # array('d'), row-major size x size
+        self.depot = depot
+
+    def __contains__(self, location):
+        return location in self.index
+
+    def distance(self, from_location, to_location):
+        i = self.index[from_location]
+        j = self.index[to_location]
+        return self.data[i * self.size + j]
+
+    def to_cache(self):
+        return {
+            'index': self.index,
+            'size': self.size,
+            'data': self.data.tobytes(),
+            'depot': self.depot
+        }
+
+    @classmethod
+    def from_cache(cls, payload):
+        data = array('d')
+        data.frombytes(payload['data'])
+        return cls(payload['index'], payload['size'], data, payload.get('depot'))
+
+
+def get_distance_matrix(warehouse):
+    """Get the distance matrix for a warehouse, building it on a cache miss"""
+    payload = frappe.cache().hget(DISTANCE_MATRIX_CACHE, warehouse)
+    if payload:
+        return DistanceMatrix.from_cache(payload)
+
+    return build_distance_matrix(warehouse)
+
+
+def build_distance_matrix(warehouse):
+    """Compute the distance matrix for a warehouse layout and cache it"""
+    locations = frappe.get_all('WMS Location',
+        filters={'warehouse': warehouse},
+        fields=['name', 'aisle', 'bay', 'level', 'x_coord', 'y_coord', 'is_depot'],
+        order_by='name'
+    )
+
+    aisle_directions = {}
+    connections = []
+    if frappe.db.exists('WMS Warehouse Layout', warehouse):
+        layout = frappe.get_doc('WMS Warehouse Layout', warehouse)
+        aisle_directions = {row.aisle: row.direction for row in layout.aisles}
+        connections = [
+            (row.from_location, row.to_location, row.distance, row.one_way)
+            for row in layout.connections
+        ]
+
+    matrix = compute_distance_matrix(locations, aisle_directions, connections)
+    frappe.cache().hset(DISTANCE_MATRIX_CACHE, warehouse, matrix.to_cache())
+
+    return matrix
+
+
+def get_packing_distances(warehouse):
+    """Round-trip walking distance from the packing location to every location of a layout"""
+    matrix = get_distance_matrix(warehouse)
+    packing = get_packing_location(warehouse, matrix)
+    if not packing:
+        return dict.fromkeys(matrix.index, 0.0)
+
+    return {
+        location: matrix.distance(packing, location) + matrix.distance(location, packing)
+        for location in matrix.index
+    }
+
+
+def get_packing_location(warehouse, matrix):
+    """The WMS Location of default_packing_location, else the layout's depot"""
+    packing_warehouse = frappe.get_cached_doc('WMS Settings', None).get('default_packing_location')
+    if packing_warehouse:
+        location = frappe.db.get_value('WMS Location',
+            {'warehouse': warehouse, 'storage_warehouse': packing_warehouse}, 'name')
+        if location in matrix:
+            return location
+
+    return matrix.depot
+
+
+def invalidate_distance_matrix(warehouse):
+    """Drop the cached matrix and the routes planned on it; rebuilt on the next route request"""
+    if warehouse:
+        frappe.cache().hdel(DISTANCE_MATRIX_CACHE, warehouse)
+        frappe.cache().delete_value(PICK_ROUTE_CACHE)
+
+
+def compute_distance_matrix(locations, aisle_directions=None, connections=()):
+    """
+    Build the all-pairs shortest path matrix for a set of locations
+
+    locations: dicts with name, aisle, bay, level, x_coord, y_coord, is_depot
+    aisle_directions: aisle -> 'Two-way' | 'Ascending' | 'Descending'
+    connections: (from_location, to_location, distance, one_way) tuples
+
+    Consecutive bays of an aisle are linked, respecting one-way aisles.
+    Positions that cannot reach each other through the graph fall back to
+    the rectilinear distance between their coordinates.
+    """
+    aisle_directions = aisle_directions or {}
+
+    index = {}
+    coords = []
+    by_aisle = {}
+    position_of_bay = {}
+    depot = None
+
+    for loc in locations:
+        aisle = loc.get('aisle')
+        key = (aisle, loc.get('bay') or 0) if aisle else None
+
+        if key in position_of_bay:
+            index[loc['name']] = position_of_bay[key]
+        else:
+            position = len(coords)
+            coords.append((loc.get('x_coord') or 0.0, loc.get('y_coord') or 0.0))
+            index[loc['name']] = position
+            if key:
+                position_of_bay[key] = position
+                by_aisle.setdefault(aisle, []).append((key[1], position))
+
+        if loc.get('is_depot') and not depot:
+            depot = loc['name']
+
+    size = len(coords)
+    adjacency = [[] for _ in range(size)]
+
+    def add_edge(a, b, weight, one_way=False):
+        if a == b:
+            return
+        adjacency[a].append((b, weight))
+        if not one_way:
+            adjacency[b].append((a, weight))
+
+    for aisle, bays in by_aisle.items():
+        bays.sort()
+        direction = aisle_directions.get(aisle) or 'Two-way'
+        for (_, a), (_, b) in zip(bays, bays[1:]):
+            weight = _euclidean(coords[a], coords[b])
+            if direction == 'Ascending':
+                add_edge(a, b, weight, one_way=True)
+            elif direction == 'Descending':
+                add_edge(b, a, weight, one_way=True)
+            else:
+                add_edge(a, b, weight)
+
+    for from_location, to_location, distance, one_way in connections:
+        if from_location not in index or to_location not in index:
+            continue
+        a, b = index[from_location], index[to_location]
+        add_edge(a, b, distance or _euclidean(coords[a], coords[b]), one_way=bool(one_way))
+
+    data = array('d', bytes(8 * size * size))
+    has_edges = any(adjacency)
+
+    for source in range(size):
+        row = source * size
+        shortest = _dijkstra(adjacency, source) if has_edges else {source: 0.0}
+        sx, sy = coords[source]
+        for target in range(size):
+            if target in shortest:
+                data[row + target] = shortest[target]
+            else:
+                tx, ty = coords[target]
+                data[row + target] = abs(sx - tx) + abs(sy - ty)
+
+    return DistanceMatrix(index, size, data, depot)
+
+
+def _dijkstra(adjacency, source):
+    shortest = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        dist, node = heapq.heappop(heap)
+        if dist > shortest.get(node, math.inf):
+            continue
+        for neighbour, weight in adjacency[node]:
+            candidate = dist + weight
+            if candidate < shortest.get(neighbour, math.inf):
+                shortest[neighbour] = candidate
+                heapq.heappush(heap, (candidate, neighbour))
+    return shortest
+
+
+def _euclidean(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def plan_pick_route(rows, time_budget=ROUTE_TIME_BUDGET, resolved=None):
+    """
+    Order pick list rows along the shortest walking route
+
+    Rows are grouped by warehouse as before. Within a warehouse that has
+    WMS Locations, stops are sequenced on its distance matrix starting and
+    ending at the depot. Rows without a known location keep the old
+    location/item_code ordering at the end of their warehouse.
+
+    resolved: a resolve_row_locations() result the caller already has.
+
+    Returns the ordered rows and the total walking distance in meters.
+    """
+    if resolved is None:
+        resolved = resolve_row_locations(rows)
+
+    groups = {}
+    for row in rows:
+        location, warehouse = _row_location(row, resolved)
+        groups.setdefault(warehouse, []).append((location, row))
+
+    ordered = []
+    total_distance = 0.0
+
+    for warehouse, members in groups.items():
+        routed = [m for m in members if m[0]]
+        unrouted = [row for location, row in members if not location]
+
+        if routed:
+            matrix = get_distance_matrix(warehouse)
+            route, distance = sequence_locations(
+                matrix, [location for location, _ in routed], time_budget=time_budget
+            )
+            total_distance += distance
+
+            position = {location: i for i, location in enumerate(route)}
+            routed.sort(key=lambda m: (position.get(m[0], len(route)), m[1].idx))
+            ordered.extend(row for _, row in routed)
+
+        unrouted.sort(key=lambda x: x.get('location') or x.item_code)
+        ordered.extend(unrouted)
+
+    return {
+        'rows': ordered,
+        'distance': total_distance
+    }
+
+
+def get_pick_list_route(pick_list, rows, resolved=None):
+    """
+    plan_pick_route for the rows of a pick list, cached per pick list
+
+    The cached route is used as long as the pick list has the same rows
+    at the same locations; wms.tasks plans the routes of open pick lists
+    ahead of time.
+    """
+    cache = frappe.cache()
+    signature = sorted((row.name, row.warehouse or '', row.get('location') or '') for row in rows)
+
+    cached = cache.hget(PICK_ROUTE_CACHE, pick_list)
+    if cached and cached['signature'] == signature:
+        by_name = {row.name: row for row in rows}
+        return {
+            'rows': [by_name[name] for name in cached['rows']],
+            'distance': cached['distance']
+        }
+
+    route = plan_pick_route(rows, resolved=resolved)
+    cache.hset(PICK_ROUTE_CACHE, pick_list, {
+        'signature': signature,
+        'rows': [row.name for row in route['rows']],
+        'distance': route['distance']
+    })
+    return route
+
+
+def estimate_pick_minutes(distance, lines):
+    """Estimate picking time from walking distance and number of lines"""
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    walking_speed = settings.get('walking_speed') or 1.2  # m/s
+    pick_time_per_line = settings.get('pick_time_per_line') or 30  # seconds
+
+    return round((distance / walking_speed + lines * pick_time_per_line) / 60, 1)
+
+
+def resolve_row_locations(rows):
+    """
+    Map pick rows to WMS Locations
+
+    A row matches by its location field, or by a location whose storage
+    warehouse is the row's warehouse. Returns {location: (name, warehouse)}
+    keyed by both location names and storage warehouses.
+    """
+    names = list({row.get('location') for row in rows if row.get('location')})
+    warehouses = list({row.warehouse for row in rows if row.warehouse})
+
+    resolved = {}
+    if names:
+        for loc in frappe.get_all('WMS Location',
+                filters={'name': ['in', names]},
+                fields=['name', 'warehouse']):
+            resolved[loc.name] = (loc.name, loc.warehouse)
+
+    if warehouses:
+        for loc in frappe.get_all('WMS Location',
+                filters={'storage_warehouse': ['in', warehouses]},
+                fields=['name', 'warehouse', 'storage_warehouse'],
+                order_by='name'):
+            resolved.setdefault(loc.storage_warehouse, (loc.name, loc.warehouse))
+
+    return resolved
+
+
+def _row_location(row, resolved):
+    match = resolved.get(row.get('location')) or resolved.get(row.warehouse)
+    return match or (None, row.warehouse)
+
+
+def sequence_locations(matrix, locations, time_budget=ROUTE_TIME_BUDGET):
+    """
+    Sequence distinct locations on a distance matrix
+
+    Starts and ends at the depot when the layout has one, otherwise walks
+    an open path from the first stop. Returns (route, distance).
+    """
+    stops = []
+    for location in locations:
+        if location in matrix and location not in stops:
+            stops.append(location)
+
+    if not stops:
+        return [], 0.0
+
+    closed = bool(matrix.depot)
+    points = ([matrix.depot] if closed else []) + stops
+    positions = [matrix.index[p] for p in points]
+    size = matrix.size
+    data = matrix.data
+    cost = [[data[i * size + j] for j in positions] for i in positions]
+
+    order = solve_route(cost, closed=closed, time_budget=time_budget)
+    distance = route_length(cost, order, closed=closed)
+
+    route = [points[i] for i in order]
+    if closed:
+        route = route[1:]
+
+    return route, distance
+
+
+def solve_route(cost, closed=True, time_budget=ROUTE_TIME_BUDGET):
+    """
+    Find a short route through all points of a cost matrix
+
+    Point 0 is the fixed start. When closed, the route returns to it.
+    Nearest neighbour construction, then 2-opt and Or-opt improvement
+    until no move helps or the time budget runs out. The cost matrix
+    may be asymmetric (one-way aisles).
+    """
+    n = len(cost)
+    if n <= 2:
+        return list(range(n))
+
+    deadline = time.monotonic() + time_budget
+
+    path = _nearest_neighbour(cost)
+    if closed:
+        path.append(0)
+
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = _two_opt(cost, path, closed, deadline)
+        improved = _or_opt(cost, path, closed, deadline) or improved
+
+    if closed:
+        path.pop()
+
+    return path
+
+
+def route_length(cost, order, closed=True):
+    """Total cost of visiting points in order"""
+    length = sum(cost[a][b] for a, b in zip(order, order[1:]))
+    if closed and len(order) > 1:
+        length += cost[order[-1]][order[0]]
+    return length
+
+
+def _nearest_neighbour(cost):
+    n = len(cost)
+    path = [0]
+    unvisited = set(range(1, n))
+    current = 0
+    while unvisited:
+        row = cost[current]
+        current = min(unvisited, key=row.__getitem__)
+        unvisited.remove(current)
+        path.append(current)
+    return path
+
+
+def _prefix_costs(cost, path):
+    forward = [0.0]
+    backward = [0.0]
+    for a, b in zip(path, path[1:]):
+        forward.append(forward[-1] + cost[a][b])
+        backward.append(backward[-1] + cost[b][a])
+    return forward, backward
+
+
+def _two_opt(cost, path, closed, deadline):
+    """Reverse segments while it shortens the path; returns True if it changed"""
+    n = len(path)
+    last = n - 2 if closed else n - 1
+    changed = False
+
+    forward, backward = _prefix_costs(cost, path)
+    i = 1
+    while i < last:
+        if time.monotonic() > deadline:
+            break
+        applied = False
+        before = path[i - 1]
+        for j in range(i + 1, last + 1):
+            after = path[j + 1] if j + 1 < n else None
+            old = cost[before][path[i]] + forward[j] - forward[i]
+            new = cost[before][path[j]] + backward[j] - backward[i]
+            if after is not None:
+                old += cost[path[j]][after]
+                new += cost[path[i]][after]
+            if new < old - 1e-9:
+                path[i:j + 1] = path[i:j + 1][::-1]
+                forward, backward = _prefix_costs(cost, path)
+                changed = applied = True
+                break
+        if not applied:
+            i += 1
+
+    return changed
+
+
+def _or_opt(cost, path, closed, deadline):
+    """Move chains of up to three stops to a better position"""
+    n = len(path)
+    last = n - 2 if closed else n - 1
+    changed = False
+
+    for length in (1, 2, 3):
+        i = 1
+        while i + length - 1 <= last:
+            if time.monotonic() > deadline:
+                return changed
+            j = i + length - 1
+            prev, first, tail = path[i - 1], path[i], path[j]
+            nxt = path[j + 1] if j + 1 < n else None
+
+            gain = cost[prev][first]
+            if nxt is not None:
+                gain += cost[tail][nxt] - cost[prev][nxt]
+
+            best_k, best_delta = None, -1e-9
+            for k in range(n if not closed else n - 1):
+                if i - 1 <= k <= j:
+                    continue
+                a = path[k]
+                b = path[k + 1] if k + 1 < n else None
+                added = cost[a][first]
+                if b is not None:
+                    added += cost[tail][b] - cost[a][b]
+                delta = added - gain
+                if delta < best_delta:
+                    best_k, best_delta = k, delta
+
+            if best_k is None:
+                i += 1
+                continue
+
+            segment = path[i:j + 1]
+            del path[i:j + 1]
+            insert_at = best_k + 1 if best_k < i else best_k - length + 1
+            path[insert_at:insert_at] = segment
+            changed = True
+
+    return changed
@@ -0,0 +1,235 @@
+"""
+WMS Scan Events
+Idempotent replay of scan confirmations queued on the device
+
+The pick and pack pages confirm scans locally and keep them in a durable
+queue (IndexedDB) until the server has them. A queue is replayed in
+order: events whose key was applied before are reported as duplicates,
+and events that no longer apply as they were made are reported as
+conflicts instead of being stored:
+
+- lock_taken: another user or session holds the document lock now
+- over_pick / over_pack: the qty is more than the row asks for
+- row_changed: the row now holds another item (e.g. after re-routing)
+
+Events whose row no longer exists are errors. Conflicts and errors are
+final; the client drops them from its queue and shows them.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from wms.locks import get_lock_holder
+from wms.progress import get_version, update_progress_rows
+from wms.progress_feed import publish_progress
+from wms.scan_log import log_scan_events
+from wms.waves import validate_wave_status
+from wms.zones import validate_zone_task_status
+
+# Applied scan event idempotency keys are remembered for a day, per document
+SCAN_EVENT_CACHE_KEY = 'wms_scan_event:'
+SCAN_EVENT_KEY_TTL = 24 * 60 * 60
+
+EPSILON = 1e-9
+
+# doctype -> (event qty field, conflict reason when the qty is too high)
+REPLAY_DOCTYPES = {
+    'Pick List': ('picked_qty', 'over_pick'),
+    'WMS Wave': ('picked_qty', 'over_pick'),
+    'WMS Zone Task': ('picked_qty', 'over_pick'),
+    'Delivery Note': ('packed_qty', 'over_pack')
+}
+
+
+def accept_scan_events(doctype, name, events):
+    """
+    Claim the idempotency keys of events for a document
+
+    Each key is claimed atomically, so of two requests replaying the same
+    queue only one applies an event; the other reports it as duplicate.
+    Claims are dropped again if the transaction rolls back.
+
+    Returns (results, accepted): a result per event in order, and the
+    new (event, result) pairs, whose result status is 'applied'.
+    """
+    cache = frappe.cache()
+    results = []
+    accepted = []
+    seen_keys = set()
+
+    for event in events:
+        key = event.get('key')
+        if not key:
+            results.append({'key': key, 'status': 'error', 'message': 'Missing idempotency key'})
+            continue
+
+        if key in seen_keys or not cache.set(cache.make_key(_scan_event_key(doctype, name, key)), 1,
+                nx=True, ex=SCAN_EVENT_KEY_TTL):
+            results.append({'key': key, 'status': 'duplicate'})
+            continue
+        seen_keys.add(key)
+
+        result = {'key': key, 'status': 'applied'}
+        accepted.append((event, result))
+        results.append(result)
+
+    if accepted:
+        claimed = [event for event, result in accepted]
+        frappe.db.after_rollback.add(lambda: release_scan_events(doctype, name, claimed))
+
+    return results, accepted
+
+
+def release_scan_events(doctype, name, events):
+    """Drop the claims of events that were not applied, so a retry is applied"""
+    if events:
+        cache = frappe.cache()
+        cache.delete(*[cache.make_key(_scan_event_key(doctype, name, event['key'])) for event in events])
+
+
+def _scan_event_key(doctype, name, key):
+    return f'{SCAN_EVENT_CACHE_KEY}{doctype}:{name}:{key}'
+
+
+def pick_event_values(event):
+    """Map a pick confirmation onto Pick List Item fields"""
+    return {
+        'picked_qty': flt(event.get('picked_qty')),
+        'location': event.get('location'),
+        'batch_no': event.get('batch_no'),
+        'wms_box': event.get('box')
+    }
+
+
+def pack_event_values(event):
+    """Map a pack confirmation onto Delivery Note Item fields"""
+    return {
+        'wms_packed_qty': flt(event.get('packed_qty')),
+        'wms_package_no': event.get('package_no')
+    }
+
+
+def replay_scan_events(doctype, name, events, session_id=None):
+    """
+    Apply queued scan events of one document in order
+
+    Pick List and Delivery Note events name their row by item_idx; wave
+    and zone task events by pick_list and pick_list_idx. An event's
+    item_code, when given, must still be on that row. Returns a result
+    per event and, for single documents, the new version.
+    """
+    if doctype not in REPLAY_DOCTYPES:
+        frappe.throw(_("Scan events cannot be replayed for {0}").format(doctype))
+
+    qty_field, over_reason = REPLAY_DOCTYPES[doctype]
+    results, accepted = accept_scan_events(doctype, name, events)
+    if not accepted:
+        return _replay_response(doctype, name, results)
+
+    holder = get_lock_holder(doctype, name)
+    if holder and holder != (frappe.session.user, session_id or None):
+        for event, result in accepted:
+            result.update({'status': 'conflict', 'reason': 'lock_taken', 'locked_by': holder[0]})
+        release_scan_events(doctype, name, [event for event, result in accepted])
+        return _replay_response(doctype, name, results)
+
+    zone_rows = None
+    outside = 'Pick list is not part of this wave'
+    if doctype == 'WMS Wave':
+        status = frappe.db.get_value('WMS Wave', name, 'status')
+        validate_wave_status(status)
+        parent_doctype = 'Pick List'
+        members = set(frappe.get_all('WMS Wave Pick List',
+            filters={'parent': name, 'parenttype': 'WMS Wave'},
+            pluck='pick_list'))
+        targets = [(event.get('pick_list'), event.get('pick_list_idx')) for event, result in accepted]
+    elif doctype == 'WMS Zone Task':
+        task = frappe.db.get_value('WMS Zone Task', name, ['status', 'pick_list'], as_dict=True) or {}
+        status = task.get('status')
+        validate_zone_task_status(status)
+        parent_doctype = 'Pick List'
+        members = {task.pick_list}
+        # Only the rows of the task's own zone
+        zone_rows = set(frappe.get_all('WMS Zone Task Item',
+            filters={'parent': name, 'parenttype': 'WMS Zone Task'},
+            pluck='pick_list_idx'))
+        outside = 'Item is not part of this zone task'
+        targets = [(event.get('pick_list'), event.get('pick_list_idx')) for event, result in accepted]
+    else:
+        parent_doctype = doctype
+        members = {name}
+        targets = [(name, event.get('item_idx')) for event, result in accepted]
+
+    child_doctype = 'Pick List Item' if parent_doctype == 'Pick List' else 'Delivery Note Item'
+    parents = list({parent for parent, idx in targets if parent in members})
+    rows = {
+        (row.parent, row.idx): row for row in frappe.get_all(child_doctype,
+            filters={'parent': ['in', parents], 'parenttype': parent_doctype},
+            fields=['parent', 'idx', 'item_code', 'qty'])
+    } if parents else {}
+
+    values = pick_event_values if parent_doctype == 'Pick List' else pack_event_values
+    updates = {}
+    for (event, result), (parent, idx) in zip(accepted, targets):
+        if parent not in members or (zone_rows is not None and _int(idx) not in zone_rows):
+            result.update({'status': 'error', 'message': outside})
+            continue
+
+        row = rows.get((parent, _int(idx)))
+        if not row:
+            result.update({'status': 'error', 'message': 'Item not found'})
+        elif event.get('item_code') and event.get('item_code') != row.item_code:
+            result.update({'status': 'conflict', 'reason': 'row_changed', 'item_code': row.item_code})
+        elif flt(event.get(qty_field)) > flt(row.qty) + EPSILON:
+            result.update({'status': 'conflict', 'reason': over_reason, 'qty': flt(row.qty),
+                qty_field: flt(event.get(qty_field))})
+        else:
+            updates.setdefault(parent, []).append((event, idx))
+
+    result_of = {id(event): result for event, result in accepted}
+    applied = []
+    for parent, parent_events in updates.items():
+        new_version, missing = update_progress_rows(parent_doctype, parent,
+            [(idx, values(event)) for event, idx in parent_events])
+        for event, idx in parent_events:
+            if idx in missing:
+                result_of[id(event)].update({'status': 'error', 'message': 'Item not found'})
+            else:
+                applied.append((parent, idx, event))
+
+    if applied:
+        if doctype == 'WMS Wave' and status == 'Open':
+            frappe.db.set_value('WMS Wave', name, 'status', 'Picking')
+        elif doctype == 'WMS Zone Task' and status == 'Open':
+            frappe.db.set_value('WMS Zone Task', name, 'status', 'Picking')
+
+        log_scan_events('Pick' if parent_doctype == 'Pick List' else 'Pack',
+            [(parent_doctype, parent, idx, event) for parent, idx, event in applied])
+        frappe.db.commit()
+        if doctype == 'WMS Zone Task':
+            # Zone picks show as progress of the pick list
+            publish_progress('Pick List', task.pick_list)
+        else:
+            publish_progress(doctype, name)
+
+    applied_events = {id(event) for parent, idx, event in applied}
+    release_scan_events(doctype, name, [event for event, result in accepted if id(event) not in applied_events])
+
+    return _replay_response(doctype, name, results)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _replay_response(doctype, name, results):
+    return {
+        'success': all(result['status'] not in ('error', 'conflict') for result in results),
+        'version': get_version(doctype, name) if doctype not in ('WMS Wave', 'WMS Zone Task') else None,
+        'results': results,
+        'conflicts': [result for result in results if result['status'] == 'conflict']
+    }
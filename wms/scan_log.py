@@ -0,0 +1,256 @@
+"""
+WMS Scan Log
+Append-only record of every scan, rolled up into hourly throughput
+
+The pick and pack endpoints append a WMS Scan Event for each scan step
+of a line (Location, Batch, Item, Box, as set up in WMS Scan Step) and
+one for its confirmation (Pick, Pack), with one multi-row insert per
+request. Events keep the time they were scanned on the device, so
+offline scans replayed later land in the hour they happened; warehouse
+and zone are resolved on the way in so rollups never join.
+
+The log is organised by event_date: rollups read single hours of one
+date through that index and old days are dropped whole, oldest first
+(SCAN_LOG_RETENTION_DAYS). Every hour that got new events is rebuilt
+into WMS User Throughput and WMS Zone Throughput by an hourly job, and
+reports read those instead of raw events.
+
+The last confirmed location of every user is kept in Redis
+(get_user_location) so the task dispatcher can hand out work close to
+where the picker or packer is standing.
+"""
+
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import add_days, convert_utc_to_system_timezone, flt, get_datetime, now, now_datetime, today
+
+from wms.availability import get_layout
+from wms.zones import get_zone, get_zone_map
+
+STEP_TYPES = ('Location', 'Batch', 'Item', 'Box')
+
+SCAN_EVENT_FIELDS = ('scanned_at', 'event_date', 'user', 'step_type', 'reference_doctype', 'reference_name',
+    'row_idx', 'item_code', 'location', 'warehouse', 'zone', 'qty', 'duration')
+STANDARD_FIELDS = ('creation', 'modified', 'owner', 'modified_by')
+
+# Hours with events that are not rolled up yet
+SCAN_LOG_HOURS = 'wms_scan_log_hours'
+
+# Where each user scanned last: user -> (location, layout warehouse)
+USER_LOCATIONS = 'wms_user_locations'
+
+# Gaps between two scans of a user longer than this are breaks, not work
+IDLE_GAP_SECONDS = 5 * 60
+
+SCAN_LOG_RETENTION_DAYS = 90
+
+
+def log_scan_events(confirm_type, entries):
+    """
+    Append the scans behind confirmed lines to the scan log
+
+    confirm_type: 'Pick' or 'Pack'. entries: (reference_doctype,
+    reference_name, row_idx, event) for every applied event, where the
+    event may carry at (device time in ms), item_code, location,
+    picked_qty / packed_qty and steps: [{step_type, at}] in scan order.
+    """
+    if not entries:
+        return
+
+    user = frappe.session.user
+    zones = get_location_zones({event.get('location') for doctype, name, idx, event in entries} - {None, ''})
+
+    rows = []
+    last_location = None
+    for reference_doctype, reference_name, row_idx, event in entries:
+        location = event.get('location') or None
+        warehouse, zone = zones.get(location, (None, None))
+        line = (reference_doctype, reference_name, row_idx, event.get('item_code'), location, warehouse, zone)
+
+        confirmed_at = _scan_time(event.get('at'))
+        if location and warehouse and (not last_location or confirmed_at >= last_location[0]):
+            last_location = (confirmed_at, location, warehouse)
+
+        started_at = previous = None
+        for step in event.get('steps') or ():
+            step_type = (step.get('step_type') or '').title()
+            if step_type not in STEP_TYPES:
+                continue
+
+            at = min(_scan_time(step.get('at')), confirmed_at)
+            rows.append(_row(at, user, step_type, line, 0,
+                (at - previous).total_seconds() if previous else None))
+            started_at = started_at or at
+            previous = at
+
+        qty = event.get('picked_qty') if confirm_type == 'Pick' else event.get('packed_qty')
+        rows.append(_row(confirmed_at, user, confirm_type, line, flt(qty),
+            (confirmed_at - started_at).total_seconds() if started_at else None))
+
+    timestamp = now()
+    frappe.db.bulk_insert('WMS Scan Event', SCAN_EVENT_FIELDS + STANDARD_FIELDS,
+        [row + (timestamp, timestamp, user, user) for row in rows])
+
+    for hour in {row[0].strftime('%Y-%m-%d %H:00:00') for row in rows}:
+        frappe.cache().hset(SCAN_LOG_HOURS, hour, 1)
+
+    if last_location:
+        frappe.cache().hset(USER_LOCATIONS, user, last_location[1:])
+
+
+def get_user_location(user):
+    """(location, layout warehouse) of the user's latest scan, or None"""
+    return frappe.cache().hget(USER_LOCATIONS, user)
+
+
+def _row(at, user, step_type, line, qty, duration):
+    reference_doctype, reference_name, row_idx, item_code, location, warehouse, zone = line
+    return (at, at.date(), user, step_type, reference_doctype, reference_name, row_idx, item_code,
+        location, warehouse, zone, qty, duration)
+
+
+def _scan_time(value):
+    """Device time in ms since the epoch as system time; the server time if missing or ahead"""
+    current = now_datetime()
+    if not value:
+        return current
+
+    try:
+        at = convert_utc_to_system_timezone(datetime.utcfromtimestamp(flt(value) / 1000)).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        return current
+
+    return min(at, current)
+
+
+def get_location_zones(locations):
+    """
+    {location or storage warehouse: (layout warehouse, zone)} for scanned locations
+
+    The zone is the WMS Zone of the location's aisle; on layouts without
+    zones, the aisle itself.
+    """
+    if not locations:
+        return {}
+
+    locations = list(locations)
+    zone_map = get_zone_map()
+    zones = {}
+    for loc in frappe.get_all('WMS Location',
+            or_filters={'name': ['in', locations], 'storage_warehouse': ['in', locations]},
+            fields=['name', 'warehouse', 'storage_warehouse', 'aisle']):
+        zone = get_zone(loc.warehouse, loc.aisle, zone_map) if loc.warehouse in zone_map else loc.aisle
+        zones[loc.name] = zones[loc.storage_warehouse] = (loc.warehouse, zone)
+
+    # Warehouses without a WMS Location of their own still count for their layout
+    for location in locations:
+        if location not in zones:
+            zones[location] = (get_layout(location) or None, None)
+
+    return zones
+
+
+def rollup_scan_events():
+    """Rebuild the throughput of every hour with new scan events (hourly)"""
+    cache = frappe.cache()
+    hours = {frappe.safe_decode(hour) for hour in cache.hkeys(SCAN_LOG_HOURS)}
+
+    # Also the last complete hour, should its marker have been lost
+    hours.add((now_datetime() - timedelta(hours=1)).strftime('%Y-%m-%d %H:00:00'))
+
+    for hour in sorted(hours):
+        # Cleared first: events logged while rebuilding mark the hour again
+        cache.hdel(SCAN_LOG_HOURS, hour)
+        rebuild_throughput(get_datetime(hour))
+        frappe.db.commit()
+
+
+def rebuild_throughput(hour):
+    """Replace the WMS User / Zone Throughput rows of one hour from its scan events"""
+    events = frappe.get_all('WMS Scan Event',
+        filters=[
+            ['event_date', '=', hour.date()],
+            ['scanned_at', '>=', hour],
+            ['scanned_at', '<', hour + timedelta(hours=1)]
+        ],
+        fields=['scanned_at', 'user', 'step_type', 'warehouse', 'zone', 'qty', 'duration'],
+        order_by='scanned_at asc')
+
+    users = {}
+    zones = {}
+    for event in events:
+        is_line = event.step_type not in STEP_TYPES
+        targets = [users.setdefault(event.user, _totals())]
+        if event.warehouse:
+            targets.append(zones.setdefault((event.warehouse, event.zone or ''), _totals()))
+
+        for totals in targets:
+            totals.scans += 1
+            totals.users.add(event.user)
+            if is_line:
+                totals.lines += 1
+                totals.qty += flt(event.qty)
+                totals.line_seconds += flt(event.duration)
+
+        user_totals = targets[0]
+        at = get_datetime(event.scanned_at)
+        if user_totals.last_scan and (at - user_totals.last_scan).total_seconds() <= IDLE_GAP_SECONDS:
+            user_totals.active_seconds += (at - user_totals.last_scan).total_seconds()
+        user_totals.last_scan = at
+
+    frappe.db.delete('WMS User Throughput', {'hour': hour})
+    frappe.db.delete('WMS Zone Throughput', {'hour': hour})
+
+    timestamp = now()
+    standard = (timestamp, timestamp, 'Administrator', 'Administrator')
+
+    if users:
+        frappe.db.bulk_insert('WMS User Throughput',
+            ('hour', 'date', 'user', 'scans', 'lines', 'qty', 'active_minutes', 'lines_per_hour',
+                'seconds_per_line') + STANDARD_FIELDS,
+            [
+                (hour, hour.date(), user, totals.scans, totals.lines, totals.qty,
+                    round(totals.active_seconds / 60, 1),
+                    round(totals.lines * 3600 / totals.active_seconds, 1) if totals.active_seconds else 0,
+                    _seconds_per_line(totals)) + standard
+                for user, totals in users.items()
+            ])
+
+    if zones:
+        frappe.db.bulk_insert('WMS Zone Throughput',
+            ('hour', 'date', 'warehouse', 'zone', 'scans', 'lines', 'qty', 'pickers',
+                'seconds_per_line') + STANDARD_FIELDS,
+            [
+                (hour, hour.date(), warehouse, zone, totals.scans, totals.lines, totals.qty,
+                    len(totals.users), _seconds_per_line(totals)) + standard
+                for (warehouse, zone), totals in zones.items()
+            ])
+
+    return len(events)
+
+
+def _totals():
+    return frappe._dict({
+        'scans': 0, 'lines': 0, 'qty': 0.0, 'line_seconds': 0.0,
+        'active_seconds': 0.0, 'last_scan': None, 'users': set()
+    })
+
+
+def _seconds_per_line(totals):
+    return round(totals.line_seconds / totals.lines, 1) if totals.lines else 0
+
+
+def purge_scan_events():
+    """Drop scan events older than the retention period, a day at a time (daily)"""
+    cutoff = add_days(today(), -SCAN_LOG_RETENTION_DAYS)
+    days = frappe.get_all('WMS Scan Event',
+        filters={'event_date': ['<', cutoff]},
+        fields=['event_date'],
+        group_by='event_date',
+        order_by='event_date asc',
+        pluck='event_date')
+
+    for day in days:
+        frappe.db.delete('WMS Scan Event', {'event_date': day})
+        frappe.db.commit()
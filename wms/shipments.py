@@ -0,0 +1,232 @@
+"""
+WMS Shipments
+Shipments and carrier manifests for packed delivery notes
+
+create_shipments turns any number of packed Delivery Notes into WMS
+Shipments inside the caller's transaction: the delivery notes and their
+items are read with one query each, packages are sized from one item
+attribute lookup, and the shipments are linked back with one bulk
+column update instead of saving every Delivery Note. Package contents
+are stored as WMS Package Item rows of the shipment.
+
+Shipments are grouped into one manifest per carrier and shipment date,
+which is what is handed over to the carrier.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, today
+
+from wms.cartonization import plan_packages
+from wms.item_attributes import get_item_attributes
+
+EPSILON = 1e-9
+
+# Package of rows packed without a package or box, as on the pack page
+DEFAULT_PACKAGE_NO = 'PKG-001'
+
+
+def create_shipments(entries, carrier=None, shipment_date=None, from_packed_rows=True):
+    """
+    Create a WMS Shipment for every packed delivery note
+
+    entries: delivery note names, or dicts with delivery_note and any of
+    carrier, tracking_no, notes and packages (package_no with weight or
+    dimensions to override). Package contents come from the packed rows,
+    which must be fully packed. With from_packed_rows=False the packages
+    are taken as sent (package_no, weight, items_count, dimensions and
+    items), as the pack page does, and packing is not checked. Delivery
+    notes that cannot ship are skipped and reported in errors. Does not
+    commit.
+
+    Returns {manifests: [one per carrier and date], errors: [...]}.
+    """
+    shipment_date = shipment_date or today()
+    entries = [frappe._dict({'delivery_note': entry} if isinstance(entry, str) else entry) for entry in entries]
+
+    names = list(dict.fromkeys(entry.delivery_note for entry in entries if entry.get('delivery_note')))
+    delivery_notes = {
+        dn.name: dn for dn in frappe.get_all('Delivery Note',
+            filters={'name': ['in', names]},
+            fields=['name', 'customer', 'docstatus', 'wms_shipment'])
+    } if names else {}
+
+    dn_items = {}
+    if names:
+        for row in frappe.get_all('Delivery Note Item',
+                filters={'parent': ['in', names], 'parenttype': 'Delivery Note'},
+                fields=['name', 'parent', 'idx', 'item_code', 'qty', 'wms_packed_qty', 'wms_package_no', 'wms_box'],
+                order_by='parent asc, idx asc'):
+            dn_items.setdefault(row.parent, []).append(row)
+
+    item_codes = {row.item_code for rows in dn_items.values() for row in rows}
+    if not from_packed_rows:
+        item_codes |= {item.get('item_code') for entry in entries for package in entry.get('packages') or ()
+            for item in package.get('items') or ()}
+    item_details = get_item_attributes(item_codes)
+
+    errors = []
+    shipments = []
+    seen = set()
+    for entry in entries:
+        name = entry.get('delivery_note')
+        dn = delivery_notes.get(name)
+        error = _get_shipping_error(name, dn, dn_items.get(name), seen, check_packed=from_packed_rows)
+        if error:
+            errors.append({'delivery_note': name, 'message': error})
+            continue
+        seen.add(name)
+
+        if from_packed_rows:
+            item_codes = {row.item_code for row in dn_items[name]}
+        else:
+            item_codes = {item.get('item_code') for package in entry.get('packages') or ()
+                for item in package.get('items') or () if item.get('item_code')}
+        unknown = sorted(item_code for item_code in item_codes if item_code not in item_details)
+        if unknown:
+            errors.append({'delivery_note': name,
+                'message': _("Items {0} are not in the Item master").format(', '.join(unknown))})
+            continue
+
+        if from_packed_rows:
+            packages = _get_packages(dn_items[name], entry.get('packages'), item_details)
+        else:
+            packages = _get_sent_packages(entry.get('packages'), item_details)
+        shipment = frappe.get_doc({
+            'doctype': 'WMS Shipment',
+            'delivery_note': name,
+            'customer': dn.customer,
+            'shipment_date': shipment_date,
+            'carrier': entry.get('carrier') or carrier or '',
+            'tracking_number': entry.get('tracking_no') or '',
+            'status': 'Draft',
+            'notes': entry.get('notes') or '',
+            'total_packages': len(packages),
+            'total_weight': sum(package['weight'] for package in packages),
+            'packages': [
+                {key: package[key] for key in ('package_no', 'weight', 'items_count', 'box_type', 'length', 'width', 'height')}
+                for package in packages
+            ],
+            'package_items': [row for package in packages for row in package['items']]
+        })
+        shipment.insert(ignore_permissions=True)
+        shipments.append(shipment)
+
+    if shipments:
+        frappe.db.bulk_update('Delivery Note', {
+            shipment.delivery_note: {'wms_shipment': shipment.name} for shipment in shipments
+        })
+
+    return {
+        'manifests': _get_manifests(shipments),
+        'errors': errors
+    }
+
+
+def _get_shipping_error(name, dn, items, seen, check_packed=True):
+    if not dn:
+        return _("Delivery Note {0} not found").format(name)
+    if name in seen:
+        return _("Delivery Note {0} is listed more than once").format(name)
+    if dn.docstatus == 2:
+        return _("Delivery Note {0} is cancelled").format(name)
+    if dn.wms_shipment:
+        return _("Delivery Note {0} is already shipped with {1}").format(name, dn.wms_shipment)
+    if not check_packed:
+        return
+    if not items:
+        return _("Delivery Note {0} has no items").format(name)
+
+    for row in items:
+        if flt(row.wms_packed_qty) + EPSILON < flt(row.qty):
+            return _("Item {0} is not fully packed ({1}/{2})").format(row.item_code, flt(row.wms_packed_qty), flt(row.qty))
+
+
+def _get_packages(items, overrides, item_details):
+    """Packages of a delivery note from its packed rows, sized from the box catalog"""
+    overrides = {package.get('package_no'): package for package in overrides or () if package.get('package_no')}
+
+    contents = {}
+    for row in items:
+        package_no = row.wms_package_no or row.wms_box or DEFAULT_PACKAGE_NO
+        contents.setdefault(package_no, []).append({
+            'package_no': package_no,
+            'item_code': row.item_code,
+            'qty': flt(row.wms_packed_qty),
+            'delivery_note_item': row.name
+        })
+
+    packages = []
+    for package_no, rows in contents.items():
+        override = overrides.get(package_no) or {}
+        planned = plan_packages(rows, item_details)
+        box = planned[0] if len(planned) == 1 and planned[0]['box_type'] else {}
+        dims = override if override.get('length') else box
+
+        packages.append({
+            'package_no': package_no,
+            'weight': flt(override.get('weight')) or sum(flt(package['weight']) for package in planned),
+            'items_count': len(rows),
+            'box_type': override.get('box_type') or box.get('box_type'),
+            'length': dims.get('length'),
+            'width': dims.get('width'),
+            'height': dims.get('height'),
+            'items': rows
+        })
+
+    return packages
+
+
+def _get_sent_packages(sent, item_details):
+    """Packages as sent by the pack page, sized from the box catalog when they have no dimensions"""
+    packages = []
+    for package in sent or ():
+        package_no = package.get('package_no') or ''
+        rows = [{
+            'package_no': package_no,
+            'item_code': item.get('item_code'),
+            'qty': flt(item.get('wms_packed_qty') or item.get('qty')),
+            'delivery_note_item': item.get('name')
+        } for item in package.get('items') or () if item.get('item_code')]
+
+        dims = package
+        if not package.get('length') and rows:
+            planned = plan_packages(rows, item_details)
+            dims = planned[0] if len(planned) == 1 and planned[0]['box_type'] else {}
+
+        packages.append({
+            'package_no': package_no,
+            'weight': flt(package.get('weight')),
+            'items_count': package.get('items_count') or 0,
+            'box_type': package.get('box_type') or dims.get('box_type'),
+            'length': dims.get('length'),
+            'width': dims.get('width'),
+            'height': dims.get('height'),
+            'items': rows
+        })
+
+    return packages
+
+
+def _get_manifests(shipments):
+    manifests = {}
+    for shipment in shipments:
+        manifest = manifests.setdefault((shipment.carrier, str(shipment.shipment_date)), {
+            'carrier': shipment.carrier,
+            'shipment_date': shipment.shipment_date,
+            'shipments': [],
+            'total_packages': 0,
+            'total_weight': 0
+        })
+        manifest['shipments'].append({
+            'shipment': shipment.name,
+            'delivery_note': shipment.delivery_note,
+            'customer': shipment.customer,
+            'tracking_number': shipment.tracking_number,
+            'packages': shipment.total_packages,
+            'weight': shipment.total_weight
+        })
+        manifest['total_packages'] += shipment.total_packages
+        manifest['total_weight'] += shipment.total_weight
+
+    return list(manifests.values())
@@ -0,0 +1,433 @@
+"""
+WMS Slotting
+Velocity and co-pick based slotting recommendations from pick history
+
+A WMS Slotting Analysis reads the submitted pick lists of a period in
+keyset-paginated chunks, so a year of history (millions of rows) is
+processed with memory bounded by the item catalog and a capped co-pick
+pair table. From it every item gets an ABC velocity class (by pick
+lines) and its strongest co-pick partners (by orders picked together).
+
+Items are then ranked, fast movers first with their co-pick partners
+right behind them, and matched against the storage locations ordered by
+round-trip distance from the packing location. Where an item's target
+slot beats its current one, a move (free slot) or a swap with the slower
+item in the slot is recommended. The recommendations can be turned into
+a draft Material Transfer Stock Entry.
+"""
+
+from collections import Counter
+from itertools import combinations
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from wms.routing import get_packing_distances
+
+PROGRESS_EVENT = 'wms_slotting_progress'
+
+# Pick lists per chunk; their rows are fetched in one query
+CHUNK_SIZE = 500
+
+JOB_TIMEOUT = 4 * 60 * 60
+
+# Share of pick lines covered by class A, and by A and B together
+CLASS_A_SHARE = 0.8
+CLASS_B_SHARE = 0.95
+
+# Co-pick pairs kept in memory; the rarest are dropped beyond this
+PAIR_CAPACITY = 200000
+
+# Orders with more distinct items than this are not counted for co-picks
+MAX_ORDER_ITEMS = 30
+
+# A partner must share at least this many orders and this Jaccard affinity
+MIN_CO_PICKS = 3
+MIN_AFFINITY = 0.1
+MAX_PARTNERS = 3
+
+MAX_RECOMMENDATIONS = 100
+
+
+class PairCounter:
+    """
+    Co-pick counts in bounded memory
+
+    When the table outgrows its capacity, the pairs with the lowest
+    counts are dropped until it is half full. Frequent pairs survive, so
+    the strongest affinities are kept; a dropped pair that comes back
+    starts counting again from zero.
+    """
+
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity=PAIR_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, pair):
+        counts = self.counts
+        counts[pair] = counts.get(pair, 0) + 1
+        if len(counts) > self.capacity:
+            self.prune()
+
+    def prune(self):
+        histogram = Counter(self.counts.values())
+        keep = len(self.counts)
+        threshold = 0
+        for count in sorted(histogram):
+            if keep <= self.capacity // 2:
+                break
+            keep -= histogram[count]
+            threshold = count
+
+        self.counts = {pair: count for pair, count in self.counts.items() if count > threshold}
+
+
+def enqueue_slotting_analysis(analysis):
+    """Run a WMS Slotting Analysis in the background"""
+    frappe.db.set_value('WMS Slotting Analysis', analysis, 'status', 'Queued')
+
+    frappe.enqueue('wms.slotting.run_slotting_analysis',
+        queue='long',
+        timeout=JOB_TIMEOUT,
+        job_id=f'wms_slotting::{analysis}',
+        deduplicate=True,
+        enqueue_after_commit=True,
+        analysis=analysis,
+        user=frappe.session.user
+    )
+
+
+def run_slotting_analysis(analysis, user=None):
+    """Compute velocity, affinity and the recommended moves of an analysis"""
+    doc = frappe.get_doc('WMS Slotting Analysis', analysis)
+    user = user or frappe.session.user
+
+    try:
+        frappe.db.set_value('WMS Slotting Analysis', analysis, 'status', 'Running')
+        frappe.db.commit()
+
+        locations = get_slot_locations(doc.warehouse)
+        history = read_pick_history(locations, doc.from_date, doc.to_date,
+            on_progress=lambda done, total: _publish_progress(user, analysis, 'Running', done, total))
+
+        classes = classify_velocity(history.picks)
+        partners = get_copick_partners(history.pairs, history.orders)
+        homes, occupants = get_current_slots(history.picks, locations)
+        costs = get_slot_costs(doc.warehouse, locations)
+
+        ranked = rank_items(history.picks, classes, partners, homes)
+        slot_warehouses = {location: warehouse for warehouse, location in locations.items()}
+        recommendations = recommend_moves(ranked, history.picks, classes, homes, occupants, costs,
+            slot_warehouses)
+
+        doc.reload()
+        doc.update({
+            'status': 'Completed',
+            'pick_lists_analysed': history.pick_lists,
+            'lines_analysed': history.lines,
+            'items_analysed': len(history.picks),
+            'class_a_items': sum(1 for value in classes.values() if value == 'A'),
+            'class_b_items': sum(1 for value in classes.values() if value == 'B'),
+            'class_c_items': sum(1 for value in classes.values() if value == 'C'),
+            'estimated_saving': round(sum(row['saving'] for row in recommendations), 1),
+            'stock_entry': None,
+            'recommendations': []
+        })
+        for row in recommendations:
+            row['co_picked_with'] = ', '.join(partner for affinity, partner in partners.get(row['item_code'], []))
+            doc.append('recommendations', row)
+        doc.save(ignore_permissions=True)
+        frappe.db.commit()
+
+        _publish_progress(user, analysis, 'Completed', history.pick_lists, history.pick_lists)
+
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=_("Slotting analysis {0} failed").format(analysis))
+        frappe.db.set_value('WMS Slotting Analysis', analysis, 'status', 'Failed')
+        frappe.db.commit()
+        _publish_progress(user, analysis, 'Failed', 0, 0)
+
+
+def get_slot_locations(warehouse):
+    """Storage locations of a warehouse layout, keyed by their storage warehouse"""
+    return {
+        loc.storage_warehouse: loc.name for loc in frappe.get_all('WMS Location',
+            filters={'warehouse': warehouse, 'storage_warehouse': ['is', 'set']},
+            fields=['name', 'storage_warehouse'],
+            order_by='name')
+    }
+
+
+def read_pick_history(locations, from_date, to_date, on_progress=None):
+    """
+    Stream the pick history of a period
+
+    Returns pick lines per item (picks), orders per item (orders), the
+    co-pick PairCounter (pairs) and totals. Only rows picked from one of
+    the locations count.
+    """
+    filters = {'docstatus': 1, 'creation': ['between', [from_date, to_date]]}
+    total = frappe.db.count('Pick List', filters)
+
+    picks = Counter()
+    orders = Counter()
+    pairs = PairCounter()
+    pick_lists = lines = 0
+
+    for names in iter_pick_list_chunks(filters):
+        baskets = {}
+        for row in frappe.get_all('Pick List Item',
+                filters={'parent': ['in', names], 'parenttype': 'Pick List'},
+                fields=['parent', 'item_code', 'warehouse', 'sales_order']):
+            if row.warehouse not in locations:
+                continue
+
+            picks[row.item_code] += 1
+            lines += 1
+            baskets.setdefault((row.parent, row.sales_order), set()).add(row.item_code)
+
+        for items in baskets.values():
+            orders.update(items)
+            if 1 < len(items) <= MAX_ORDER_ITEMS:
+                for pair in combinations(sorted(items), 2):
+                    pairs.add(pair)
+
+        pick_lists += len(names)
+        if on_progress:
+            on_progress(pick_lists, total)
+
+    return frappe._dict({
+        'picks': picks,
+        'orders': orders,
+        'pairs': pairs,
+        'pick_lists': pick_lists,
+        'lines': lines
+    })
+
+
+def iter_pick_list_chunks(filters):
+    """Names of the matching pick lists, CHUNK_SIZE at a time, in name order"""
+    last = ''
+    while True:
+        names = frappe.get_all('Pick List',
+            filters=dict(filters, name=['>', last]),
+            pluck='name',
+            order_by='name asc',
+            limit=CHUNK_SIZE
+        )
+        if not names:
+            return
+
+        yield names
+        last = names[-1]
+
+
+def classify_velocity(picks):
+    """ABC class per item by its share of all pick lines"""
+    total = sum(picks.values())
+    classes = {}
+    running = 0
+    for item_code, count in picks.most_common():
+        share = running / total if total else 1
+        classes[item_code] = 'A' if share < CLASS_A_SHARE else 'B' if share < CLASS_B_SHARE else 'C'
+        running += count
+
+    return classes
+
+
+def get_copick_partners(pairs, orders):
+    """Strongest co-pick partners per item as [(affinity, item_code)], best first"""
+    partners = {}
+    for (first, second), count in pairs.counts.items():
+        if count < MIN_CO_PICKS:
+            continue
+
+        affinity = count / (orders[first] + orders[second] - count)
+        if affinity >= MIN_AFFINITY:
+            partners.setdefault(first, []).append((affinity, second))
+            partners.setdefault(second, []).append((affinity, first))
+
+    for item_code, rows in partners.items():
+        rows.sort(reverse=True)
+        del rows[MAX_PARTNERS:]
+
+    return partners
+
+
+def get_current_slots(picks, locations):
+    """
+    Where the picked items are stocked now
+
+    Returns ({item_code: (location, warehouse, qty)} for the bin with the
+    most stock, {location: [item codes]}).
+    """
+    homes = {}
+    item_codes = list(picks)
+    warehouses = list(locations)
+
+    for start in range(0, len(item_codes), CHUNK_SIZE):
+        for row in frappe.get_all('Bin',
+                filters={
+                    'item_code': ['in', item_codes[start:start + CHUNK_SIZE]],
+                    'warehouse': ['in', warehouses],
+                    'actual_qty': ['>', 0]
+                },
+                fields=['item_code', 'warehouse', 'actual_qty']):
+            home = homes.get(row.item_code)
+            if not home or row.actual_qty > home[2]:
+                homes[row.item_code] = (locations[row.warehouse], row.warehouse, row.actual_qty)
+
+    occupants = {}
+    for item_code, (location, warehouse, qty) in homes.items():
+        occupants.setdefault(location, []).append(item_code)
+
+    return homes, occupants
+
+
+def get_slot_costs(warehouse, locations):
+    """Round-trip walking distance from the packing location to every slot"""
+    distances = get_packing_distances(warehouse)
+    return {location: distances[location] for location in locations.values() if location in distances}
+
+
+def rank_items(picks, classes, partners, homes):
+    """
+    Order items for slot assignment
+
+    Fastest movers first; each is followed by its co-pick partners (A and
+    B items only), so partners land in neighbouring slots.
+    """
+    ranked = []
+    placed = set()
+    for item_code, count in picks.most_common():
+        if item_code in placed or item_code not in homes:
+            continue
+
+        placed.add(item_code)
+        ranked.append(item_code)
+
+        for affinity, partner in partners.get(item_code, []):
+            if partner not in placed and partner in homes and classes.get(partner) != 'C':
+                placed.add(partner)
+                ranked.append(partner)
+
+    return ranked
+
+
+def recommend_moves(ranked, picks, classes, homes, occupants, costs, slot_warehouses):
+    """
+    Moves that bring ranked items to the slots closest to packing
+
+    An item whose target slot is closer than its current one moves there
+    if the slot is free, or swaps with the single slower item in it. A
+    location takes part in at most one move. The saving is the walking
+    distance (m) the moves would have saved over the analysed period.
+    """
+    slots = sorted(costs, key=lambda location: (costs[location], location))
+    touched = set()
+    moves = []
+
+    for item_code, target in zip(ranked, slots):
+        location = homes[item_code][0]
+        if target == location or location not in costs or costs[target] >= costs[location]:
+            continue
+        if target in touched or location in touched:
+            continue
+
+        occupied = occupants.get(target) or []
+        if len(occupied) > 1:
+            continue
+
+        other = occupied[0] if occupied else None
+        saving = (picks[item_code] - picks.get(other, 0)) * (costs[location] - costs[target])
+        if saving <= 0:
+            continue
+
+        touched.update((target, location))
+        moves.append((saving, item_code, other, target))
+
+    moves.sort(key=lambda move: move[0], reverse=True)
+
+    recommendations = []
+    for saving, item_code, other, target in moves[:MAX_RECOMMENDATIONS]:
+        location, warehouse, qty = homes[item_code]
+        recommendations.append(_recommendation(item_code, classes, picks, homes[item_code],
+            target, slot_warehouses[target], saving, swap_with=other))
+        if other:
+            recommendations.append(_recommendation(other, classes, picks, homes[other],
+                location, warehouse, 0.0, swap_with=item_code))
+
+    return recommendations
+
+
+def _recommendation(item_code, classes, picks, home, to_location, to_warehouse, saving, swap_with=None):
+    location, warehouse, qty = home
+    return {
+        'item_code': item_code,
+        'velocity_class': classes.get(item_code),
+        'picks': picks[item_code],
+        'from_location': location,
+        'from_warehouse': warehouse,
+        'to_location': to_location,
+        'to_warehouse': to_warehouse,
+        'qty': qty,
+        'saving': round(saving, 1),
+        'swap_with': swap_with
+    }
+
+
+def create_transfer_stock_entry(analysis):
+    """Draft Material Transfer for the recommended moves, at current stock levels"""
+    doc = frappe.get_doc('WMS Slotting Analysis', analysis)
+    if doc.status != 'Completed' or not doc.recommendations:
+        frappe.throw(_("Run the analysis first; it has no recommended moves"))
+    if doc.stock_entry and frappe.db.exists('Stock Entry', {'name': doc.stock_entry, 'docstatus': ['<', 2]}):
+        frappe.throw(_("Stock Entry {0} was already created for this analysis").format(doc.stock_entry))
+
+    stock = {
+        (row.item_code, row.warehouse): row.actual_qty for row in frappe.get_all('Bin',
+            filters={
+                'item_code': ['in', list({row.item_code for row in doc.recommendations})],
+                'warehouse': ['in', list({row.from_warehouse for row in doc.recommendations})]
+            },
+            fields=['item_code', 'warehouse', 'actual_qty'])
+    }
+
+    entry = frappe.new_doc('Stock Entry')
+    entry.update({
+        'stock_entry_type': 'Material Transfer',
+        'purpose': 'Material Transfer',
+        'company': frappe.db.get_value('Warehouse', doc.warehouse, 'company'),
+        'remarks': _("Slotting moves from {0}").format(doc.name)
+    })
+
+    for row in doc.recommendations:
+        qty = flt(stock.get((row.item_code, row.from_warehouse)))
+        if qty > 0:
+            entry.append('items', {
+                'item_code': row.item_code,
+                's_warehouse': row.from_warehouse,
+                't_warehouse': row.to_warehouse,
+                'qty': qty
+            })
+
+    if not entry.get('items'):
+        frappe.throw(_("None of the recommended items are in stock at their current location"))
+
+    entry.insert()
+    frappe.db.set_value('WMS Slotting Analysis', analysis, 'stock_entry', entry.name)
+
+    return entry
+
+
+def _publish_progress(user, analysis, status, done, total):
+    frappe.publish_realtime(PROGRESS_EVENT, {
+        'analysis': analysis,
+        'status': status,
+        'done': done,
+        'total': total
+    }, user=user)
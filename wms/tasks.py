@@ -0,0 +1,110 @@
+"""
+WMS Tasks
+Scheduled maintenance of locks and precomputed plans
+
+release_stale_locks clears the lock fields of pick lists, delivery notes,
+waves and zone tasks whose lock expired. The locks themselves are Redis keys that
+time out on their own; the fields are cleared here so lists, the
+dashboard and wave planning stop treating abandoned documents as taken.
+
+precompute_routes_and_packing runs in quiet hours. It builds the
+distance matrix of every warehouse layout, the route of every open Pick
+List and the packing plan of every draft Delivery Note into the same
+caches the pick and pack endpoints read, and drops the cached plans of
+documents that are done.
+"""
+
+import frappe
+from frappe.utils import now
+
+from wms.cartonization import PACKING_PLAN_CACHE, get_delivery_note_packages
+from wms.item_attributes import get_item_attributes
+from wms.locks import LOCKABLE_DOCTYPES, clear_expired_lock_views
+from wms.routing import PICK_ROUTE_CACHE, get_distance_matrix, get_pick_list_route, resolve_row_locations
+
+PRECOMPUTE_JOB_ID = 'wms_precompute_routes_and_packing'
+PRECOMPUTE_TIMEOUT = 60 * 60
+
+
+def release_stale_locks():
+    """Clear the lock fields of documents whose lock expired (every few minutes)"""
+    started_at = now()
+    for doctype in LOCKABLE_DOCTYPES:
+        clear_expired_lock_views(doctype, started_at)
+        frappe.db.commit()
+
+
+def schedule_precompute():
+    """Start precompute_routes_and_packing in the long queue (cron, off-peak)"""
+    frappe.enqueue('wms.tasks.precompute_routes_and_packing',
+        queue='long',
+        timeout=PRECOMPUTE_TIMEOUT,
+        job_id=PRECOMPUTE_JOB_ID,
+        deduplicate=True
+    )
+
+
+def precompute_routes_and_packing():
+    """Warm distance matrices, pick routes and packing plans for the next shift"""
+    for warehouse in frappe.get_all('WMS Location', fields=['warehouse'], group_by='warehouse', pluck='warehouse'):
+        if warehouse:
+            get_distance_matrix(warehouse)
+
+    precompute_pick_routes()
+    precompute_packing_plans()
+
+
+def precompute_pick_routes():
+    """Route every open Pick List; routes still valid in the cache are kept"""
+    pick_lists = frappe.get_all('Pick List',
+        filters={'docstatus': ['<', 2], 'status': ['in', ['Draft', 'Open']]},
+        pluck='name')
+
+    rows = {}
+    if pick_lists:
+        fields = ['name', 'parent', 'idx', 'item_code', 'warehouse']
+        if frappe.get_meta('Pick List Item').has_field('location'):
+            fields.append('location')
+
+        for row in frappe.get_all('Pick List Item',
+                filters={'parent': ['in', pick_lists], 'parenttype': 'Pick List'},
+                fields=fields,
+                order_by='parent asc, idx asc'):
+            rows.setdefault(row.parent, []).append(row)
+
+    # One location lookup for all pick lists
+    resolved = resolve_row_locations([row for parent_rows in rows.values() for row in parent_rows])
+    for pick_list, pick_rows in rows.items():
+        get_pick_list_route(pick_list, pick_rows, resolved=resolved)
+
+    _drop_cached(PICK_ROUTE_CACHE, rows)
+
+
+def precompute_packing_plans():
+    """Plan the packages of every draft Delivery Note; plans still valid in the cache are kept"""
+    delivery_notes = frappe.get_all('Delivery Note', filters={'docstatus': 0}, pluck='name')
+
+    items = {}
+    if delivery_notes:
+        for row in frappe.get_all('Delivery Note Item',
+                filters={'parent': ['in', delivery_notes], 'parenttype': 'Delivery Note'},
+                fields=['parent', 'item_code', 'stock_qty as qty']):
+            items.setdefault(row.parent, []).append(row)
+
+    # One item attribute lookup for all delivery notes
+    item_details = get_item_attributes({row.item_code for dn_items in items.values() for row in dn_items})
+    for delivery_note, dn_items in items.items():
+        # Delivery notes with unknown items are planned (and refused) when opened
+        if all(row.item_code in item_details for row in dn_items):
+            get_delivery_note_packages(delivery_note, dn_items, item_details)
+
+    _drop_cached(PACKING_PLAN_CACHE, items)
+
+
+def _drop_cached(cache_key, keep):
+    """Remove the cached plans of documents that are no longer open"""
+    cache = frappe.cache()
+    for name in cache.hkeys(cache_key):
+        name = frappe.safe_decode(name)
+        if name not in keep:
+            cache.hdel(cache_key, name)
@@ -0,0 +1,305 @@
+"""
+WMS Waves
+Batch open pick lists into waves that are picked on one route
+
+Small e-commerce pick lists each walk most of the warehouse for one or
+two lines. A wave merges pick lists that are due by the same cut-off and
+lie close together, so one walk serves all of them. Pick lists are added
+to a wave by the walk they add to it: the distance from each of their
+stops to the nearest stop already in the wave, per line. The merged rows
+are routed with wms.routing and every order gets its own box (BOX-001,
+BOX-002, ...) in route order, written to the pick list rows as well so
+delivery notes carry it.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate
+
+from wms.routing import get_distance_matrix, plan_pick_route, resolve_row_locations
+
+ACTIVE_WAVE_STATUSES = ('Open', 'Picking')
+
+# Wave size when WMS Settings does not set one
+DEFAULT_WAVE_MAX_ORDERS = 20
+DEFAULT_WAVE_MAX_LINES = 60
+
+PICK_ROW_FIELDS = ['name', 'parent', 'idx', 'item_code', 'item_name', 'qty', 'uom', 'picked_qty',
+    'warehouse', 'sales_order', 'material_request']
+
+
+def create_waves(warehouse, cut_off=None, max_orders=None, max_lines=None):
+    """
+    Group the open pick lists of a warehouse into waves and create them
+
+    Only pick lists due by cut_off (their earliest sales order delivery
+    date, else their creation date) are considered, most urgent first.
+    Returns the created WMS Wave documents.
+    """
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    max_orders = cint(max_orders) or cint(settings.get('wave_max_orders')) or DEFAULT_WAVE_MAX_ORDERS
+    max_lines = cint(max_lines) or cint(settings.get('wave_max_lines')) or DEFAULT_WAVE_MAX_LINES
+
+    candidates, rows, resolved = get_wave_candidates(warehouse, cut_off, max_lines)
+    if not candidates:
+        return []
+
+    matrix = get_distance_matrix(warehouse)
+    waves = []
+    for members in group_into_waves(candidates, matrix, max_orders, max_lines):
+        waves.append(insert_wave(warehouse, cut_off, members, rows, resolved))
+
+    return waves
+
+
+def get_wave_candidates(warehouse, cut_off=None, max_lines=DEFAULT_WAVE_MAX_LINES):
+    """
+    Open, untouched pick lists whose rows all lie in the warehouse layout
+
+    Returns (candidates, rows by pick list, resolved row locations). A
+    candidate has name, customer, due, lines, orders (set of order
+    references) and stops (set of WMS Locations).
+    """
+    pick_lists = frappe.get_all('Pick List',
+        filters={
+            'docstatus': ['<', 2],
+            'status': ['in', ['Draft', 'Open']],
+            'purpose': 'Delivery',
+            'wms_wave': ['is', 'not set'],
+            'wms_locked_by': ['is', 'not set'],
+            'wms_zone_picking': 0,
+            'wms_picked_lines': 0
+        },
+        fields=['name', 'customer', 'creation']
+    )
+    if not pick_lists:
+        return [], {}, {}
+
+    # location is a custom field on some sites
+    fields = PICK_ROW_FIELDS + (['location'] if frappe.get_meta('Pick List Item').has_field('location') else [])
+
+    rows = {}
+    for row in frappe.get_all('Pick List Item',
+            filters={'parent': ['in', [pick.name for pick in pick_lists]], 'parenttype': 'Pick List'},
+            fields=fields,
+            order_by='idx'):
+        rows.setdefault(row.parent, []).append(row)
+
+    resolved = resolve_row_locations([row for members in rows.values() for row in members])
+
+    orders = {row.sales_order for members in rows.values() for row in members if row.sales_order}
+    delivery_dates = dict(frappe.get_all('Sales Order',
+        filters={'name': ['in', list(orders)]},
+        fields=['name', 'delivery_date'],
+        as_list=True
+    )) if orders else {}
+
+    cut_off = getdate(cut_off) if cut_off else None
+    candidates = []
+    for pick in pick_lists:
+        members = rows.get(pick.name)
+        # Large pick lists already make a full walk on their own
+        if not members or len(members) > max_lines:
+            continue
+
+        stops = set()
+        for row in members:
+            location, layout = resolved.get(row.get('location')) or resolved.get(row.warehouse) or (None, None)
+            if layout != warehouse:
+                break
+            stops.add(location)
+        else:
+            dates = [delivery_dates[row.sales_order] for row in members if delivery_dates.get(row.sales_order)]
+            due = getdate(min(dates) if dates else pick.creation)
+            if cut_off and due > cut_off:
+                continue
+
+            candidates.append(frappe._dict({
+                'name': pick.name,
+                'customer': pick.customer,
+                'creation': pick.creation,
+                'due': due,
+                'lines': len(members),
+                'orders': {get_order_ref(row) for row in members},
+                'stops': stops
+            }))
+
+    candidates.sort(key=lambda candidate: (candidate.due, str(candidate.creation)))
+    return candidates, rows, resolved
+
+
+def group_into_waves(candidates, matrix, max_orders, max_lines):
+    """
+    Greedy clustering of candidates (in urgency order) into waves
+
+    The most urgent remaining pick list seeds a wave. The wave then takes
+    the pick list that adds the least walking per line, as long as it
+    stays within max_orders and max_lines. Each candidate keeps the
+    distance from each of its stops to the nearest wave stop, updated
+    only for stops that join the wave, so a wave costs
+    O(candidates x stops x wave stops) distance lookups.
+    """
+    size = matrix.size
+    data = matrix.data
+    index = matrix.index
+
+    remaining = list(candidates)
+    waves = []
+
+    while remaining:
+        seed = remaining.pop(0)
+        members = [seed]
+        orders = set(seed.orders)
+        lines = seed.lines
+        wave_stops = {index[stop] for stop in seed.stops if stop in index}
+        new_stops = list(wave_stops)
+        nearest = {
+            candidate.name: {index[stop]: float('inf') for stop in candidate.stops if stop in index}
+            for candidate in remaining
+        }
+
+        while remaining:
+            best = best_cost = None
+            for candidate in remaining:
+                gaps = nearest[candidate.name]
+                for position in gaps:
+                    for stop in new_stops:
+                        gap = min(data[stop * size + position], data[position * size + stop])
+                        if gap < gaps[position]:
+                            gaps[position] = gap
+
+                if lines + candidate.lines > max_lines or len(orders | candidate.orders) > max_orders:
+                    continue
+
+                cost = sum(gaps.values()) / candidate.lines
+                if best is None or cost < best_cost:
+                    best, best_cost = candidate, cost
+
+            if best is None:
+                break
+
+            remaining.remove(best)
+            members.append(best)
+            orders |= best.orders
+            lines += best.lines
+            new_stops = [position for position in nearest.pop(best.name) if position not in wave_stops]
+            wave_stops.update(new_stops)
+
+        waves.append(members)
+
+    return waves
+
+
+def insert_wave(warehouse, cut_off, members, rows, resolved):
+    """Route the merged rows, assign a box per order and save the wave"""
+    # Zone tasks already hold the boxes of a split pick list
+    zone_picked = frappe.get_all('Pick List',
+        filters={'name': ['in', [member.name for member in members]], 'wms_zone_picking': 1},
+        pluck='name')
+    if zone_picked:
+        frappe.throw(_("Pick lists {0} are picked in zones and cannot join a wave").format(
+            ', '.join(zone_picked)))
+
+    wave_rows = [row for member in members for row in rows[member.name]]
+    route = plan_pick_route(wave_rows, resolved=resolved)
+
+    boxes = {}
+    for row in route['rows']:
+        order_ref = get_order_ref(row)
+        if order_ref not in boxes:
+            boxes[order_ref] = format_box(len(boxes) + 1)
+
+    wave = frappe.new_doc('WMS Wave')
+    wave.update({
+        'warehouse': warehouse,
+        'status': 'Open',
+        'cut_off': cut_off,
+        'total_orders': len(boxes),
+        'total_lines': len(wave_rows),
+        'distance': round(route['distance'], 1)
+    })
+
+    for member in members:
+        wave.append('pick_lists', {
+            'pick_list': member.name,
+            'customer': member.customer,
+            'due_date': member.due,
+            'lines': member.lines
+        })
+
+    for row in route['rows']:
+        location = resolved.get(row.get('location')) or resolved.get(row.warehouse) or (None, None)
+        wave.append('items', {
+            'pick_list': row.parent,
+            'pick_list_item': row.name,
+            'pick_list_idx': row.idx,
+            'item_code': row.item_code,
+            'item_name': row.item_name,
+            'qty': row.qty,
+            'uom': row.uom,
+            'warehouse': row.warehouse,
+            'location': location[0],
+            'order_ref': get_order_ref(row),
+            'box': boxes[get_order_ref(row)]
+        })
+
+    wave.insert()
+
+    # One update per box and one for all pick lists, not one per row
+    box_rows = {}
+    for item in wave.items:
+        box_rows.setdefault(item.box, []).append(item.pick_list_item)
+    for box, names in box_rows.items():
+        frappe.db.set_value('Pick List Item', {'name': ['in', names]}, 'wms_box', box, update_modified=False)
+
+    frappe.db.set_value('Pick List', {'name': ['in', [member.name for member in members]]},
+        'wms_wave', wave.name, update_modified=False)
+
+    return wave
+
+
+def release_wave(wave):
+    """Hand the pick lists of a cancelled or deleted wave back for picking on their own"""
+    pick_lists = frappe.get_all('Pick List', filters={'wms_wave': wave}, pluck='name')
+    if pick_lists:
+        frappe.db.set_value('Pick List', {'name': ['in', pick_lists]}, 'wms_wave', None, update_modified=False)
+
+
+def get_active_wave(pick_list):
+    """The open or picking wave a pick list belongs to, if any"""
+    wave = frappe.db.get_value('Pick List', pick_list, 'wms_wave')
+    if wave and frappe.db.get_value('WMS Wave', wave, 'status') in ACTIVE_WAVE_STATUSES:
+        return wave
+
+
+def get_order_ref(row):
+    """Rows of one order share a box; rows without an order share one per pick list"""
+    return row.get('sales_order') or row.get('material_request') or row.parent
+
+
+def format_box(number):
+    # Same labels as the pick page uses for pick lists picked on their own
+    return f'BOX-{number:03d}'
+
+
+def check_wave_complete(wave):
+    """Mark a wave Completed once every row has been picked in full"""
+    rows = frappe.get_all('WMS Wave Item',
+        filters={'parent': wave, 'parenttype': 'WMS Wave'},
+        fields=['pick_list_item', 'qty'])
+    picked = dict(frappe.get_all('Pick List Item',
+        filters={'name': ['in', [row.pick_list_item for row in rows]]},
+        fields=['name', 'picked_qty'],
+        as_list=True
+    )) if rows else {}
+
+    if rows and all((picked.get(row.pick_list_item) or 0) >= row.qty for row in rows):
+        frappe.db.set_value('WMS Wave', wave, 'status', 'Completed')
+        return True
+
+    return False
+
+
+def validate_wave_status(status):
+    if status not in ACTIVE_WAVE_STATUSES:
+        frappe.throw(_("This wave is {0} and can no longer be picked").format(_(status)))
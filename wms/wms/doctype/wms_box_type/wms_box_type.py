@@ -0,0 +1,30 @@
+# Copyright (c) 2026, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from wms.cartonization import clear_box_catalog
+
+
+class WMSBoxType(Document):
+	def validate(self):
+		for side in ('length', 'width', 'height'):
+			inner = self.get(f'inner_{side}')
+			outer = self.get(f'outer_{side}')
+
+			if inner <= 0:
+				frappe.throw(_("Inner {0} must be greater than zero").format(_(side.title())))
+
+			if outer and outer < inner:
+				frappe.throw(_("Outer {0} cannot be smaller than the inner {0}").format(_(side.title())))
+
+	def on_update(self):
+		clear_box_catalog()
+
+	def on_trash(self):
+		clear_box_catalog()
+
+	def after_rename(self, old, new, merge=False):
+		clear_box_catalog()
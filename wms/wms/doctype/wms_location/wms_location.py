@@ -0,0 +1,24 @@
+# Copyright (c) 2026, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from wms.availability import invalidate_availability_index
+from wms.routing import invalidate_distance_matrix
+
+
+class WMSLocation(Document):
+	def on_update(self):
+		invalidate_distance_matrix(self.warehouse)
+		invalidate_availability_index(self.warehouse)
+
+		# Moving a location to another warehouse changes both layouts
+		previous = self.get_doc_before_save()
+		if previous and previous.warehouse != self.warehouse:
+			invalidate_distance_matrix(previous.warehouse)
+			invalidate_availability_index(previous.warehouse)
+
+	def on_trash(self):
+		invalidate_distance_matrix(self.warehouse)
+		invalidate_availability_index(self.warehouse)
@@ -4,6 +4,16 @@
 import frappe
 from frappe.model.document import Document
 
+from wms.availability import invalidate_availability_index
+from wms.cartonization import clear_packing_plans
+
 
 class WMSSettings(Document):
-	pass
+	def on_update(self):
+		# Availability entries are ordered by distance from the packing location
+		if self.has_value_changed('default_packing_location'):
+			invalidate_availability_index()
+
+		# Packing plans are cut to the package limits
+		if self.has_value_changed('max_package_weight') or self.has_value_changed('max_package_volume'):
+			clear_packing_plans()
@@ -0,0 +1,52 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('WMS Slotting Analysis', {
+	onload: function(frm) {
+		frappe.realtime.on('wms_slotting_progress', function(data) {
+			if (data.analysis !== frm.doc.name) return;
+
+			if (data.status === 'Running') {
+				frm.dashboard.show_progress(__('Pick History'), data.total ? data.done / data.total * 100 : 0,
+					__('{0} of {1} pick lists', [data.done, data.total]));
+			} else {
+				frm.dashboard.hide_progress(__('Pick History'));
+				frm.reload_doc();
+			}
+		});
+	},
+
+	refresh: function(frm) {
+		if (frm.is_new()) return;
+
+		if (!['Queued', 'Running'].includes(frm.doc.status)) {
+			frm.add_custom_button(__('Run Analysis'), function() {
+				frappe.call({
+					method: 'wms.api.run_slotting_analysis',
+					args: { analysis: frm.doc.name },
+					callback: function(r) {
+						if (r.message && !r.message.success) {
+							frappe.msgprint(r.message.message);
+						}
+						frm.reload_doc();
+					}
+				});
+			}).toggleClass('btn-primary', frm.doc.status === 'Draft');
+		}
+
+		if (frm.doc.status === 'Completed' && !frm.doc.stock_entry && (frm.doc.recommendations || []).length) {
+			frm.add_custom_button(__('Create Stock Entry'), function() {
+				frappe.call({
+					method: 'wms.api.create_slotting_stock_entry',
+					args: { analysis: frm.doc.name },
+					freeze: true,
+					callback: function(r) {
+						if (r.message && r.message.stock_entry) {
+							frappe.set_route('Form', 'Stock Entry', r.message.stock_entry);
+						}
+					}
+				});
+			}).addClass('btn-primary');
+		}
+	}
+});
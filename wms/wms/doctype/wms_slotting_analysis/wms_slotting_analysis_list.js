@@ -0,0 +1,9 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['WMS Slotting Analysis'] = {
+	get_indicator: function(doc) {
+		const colors = { Draft: 'gray', Queued: 'orange', Running: 'blue', Completed: 'green', Failed: 'red' };
+		return [__(doc.status), colors[doc.status], 'status,=,' + doc.status];
+	}
+};
@@ -0,0 +1,27 @@
+# Copyright (c) 2026, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from wms.routing import invalidate_distance_matrix
+
+
+class WMSWarehouseLayout(Document):
+	def validate(self):
+		seen = set()
+		for row in self.aisles:
+			if row.aisle in seen:
+				frappe.throw(_("Row {0}: Aisle {1} is listed twice").format(row.idx, row.aisle))
+			seen.add(row.aisle)
+
+		for row in self.connections:
+			if row.from_location == row.to_location:
+				frappe.throw(_("Row {0}: A connection must join two different locations").format(row.idx))
+
+	def on_update(self):
+		invalidate_distance_matrix(self.warehouse)
+
+	def on_trash(self):
+		invalidate_distance_matrix(self.warehouse)
@@ -0,0 +1,19 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('WMS Wave', {
+	refresh: function(frm) {
+		if (['Open', 'Picking'].includes(frm.doc.status)) {
+			frm.add_custom_button(__('Start Picking'), function() {
+				frappe.set_route('pick', 'wave', frm.doc.name);
+			}).addClass('btn-primary');
+
+			frm.add_custom_button(__('Cancel Wave'), function() {
+				frappe.confirm(__('Cancel this wave? Its pick lists can then be picked on their own.'), function() {
+					frm.set_value('status', 'Cancelled');
+					frm.save();
+				});
+			});
+		}
+	}
+});
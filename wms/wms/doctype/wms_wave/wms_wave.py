@@ -0,0 +1,16 @@
+# Copyright (c) 2026, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from wms.waves import release_wave
+
+
+class WMSWave(Document):
+	def on_update(self):
+		if self.status == 'Cancelled' and self.has_value_changed('status'):
+			release_wave(self.name)
+
+	def on_trash(self):
+		release_wave(self.name)
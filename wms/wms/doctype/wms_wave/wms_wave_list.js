@@ -0,0 +1,49 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['WMS Wave'] = {
+	get_indicator: function(doc) {
+		const colors = { Open: 'orange', Picking: 'blue', Completed: 'green', Cancelled: 'red' };
+		return [__(doc.status), colors[doc.status], 'status,=,' + doc.status];
+	},
+
+	onload: function(listview) {
+		listview.page.add_inner_button(__('Create Waves'), function() {
+			const dialog = new frappe.ui.Dialog({
+				title: __('Create Pick Waves'),
+				fields: [
+					{ fieldname: 'warehouse', fieldtype: 'Link', label: __('Warehouse'), options: 'Warehouse', reqd: 1 },
+					{
+						fieldname: 'cut_off', fieldtype: 'Datetime', label: __('Cut-off'),
+						description: __('Only pick lists due by then are picked in a wave')
+					},
+					{ fieldname: 'max_orders', fieldtype: 'Int', label: __('Max Orders per Wave') },
+					{ fieldname: 'max_lines', fieldtype: 'Int', label: __('Max Lines per Wave') }
+				],
+				primary_action_label: __('Create'),
+				primary_action: function(values) {
+					frappe.call({
+						method: 'wms.api.create_pick_waves',
+						args: values,
+						freeze: true,
+						callback: function(r) {
+							dialog.hide();
+							const waves = (r.message && r.message.waves) || [];
+
+							frappe.msgprint({
+								title: __('Pick Waves'),
+								indicator: waves.length ? 'green' : 'orange',
+								message: waves.length
+									? waves.map(wave => __('{0}: {1} pick lists, {2} lines, {3} m, ~{4} min',
+										[wave.name, wave.pick_lists, wave.lines, wave.distance, wave.estimated_time])).join('<br>')
+									: __('No open pick lists to group')
+							});
+							listview.refresh();
+						}
+					});
+				}
+			});
+			dialog.show();
+		});
+	}
+};
@@ -0,0 +1,15 @@
+# Copyright (c) 2026, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from wms.zones import clear_zone_map
+
+
+class WMSZone(Document):
+	def on_update(self):
+		clear_zone_map()
+
+	def on_trash(self):
+		clear_zone_map()
@@ -0,0 +1,38 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('WMS Zone Task', {
+	refresh: function(frm) {
+		if (['Open', 'Picking'].includes(frm.doc.status)) {
+			frm.add_custom_button(__('Start Picking'), function() {
+				frappe.set_route('pick', 'zone', frm.doc.name);
+			}).addClass('btn-primary');
+
+			frm.add_custom_button(__('Cancel Zone Task'), function() {
+				frappe.confirm(__('Cancel this zone task? Once no zone task is left, the pick list is picked on its own.'), function() {
+					frm.set_value('status', 'Cancelled');
+					frm.save();
+				});
+			});
+		}
+
+		if (frm.doc.pick_list) {
+			frm.add_custom_button(__('Consolidation'), function() {
+				frappe.call({
+					method: 'wms.api.get_zone_consolidation',
+					args: { pick_list: frm.doc.pick_list },
+					callback: function(r) {
+						const orders = (r.message && r.message.orders) || [];
+
+						frappe.msgprint({
+							title: __('Consolidation of {0}', [frm.doc.pick_list]),
+							message: orders.map(order => `<b>${order.box}</b> ${order.order_ref}: `
+								+ order.totes.map(tote => __('{0} ({1} lines)', [tote.zone || __('Other'), tote.lines])).join(', ')
+							).join('<br>')
+						});
+					}
+				});
+			});
+		}
+	}
+});
@@ -0,0 +1,11 @@
+// Copyright (c) 2026, Your Company and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['WMS Zone Task'] = {
+	add_fields: ['status', 'assigned_to'],
+
+	get_indicator: function(doc) {
+		const colors = { Open: 'orange', Picking: 'blue', Picked: 'purple', Consolidated: 'green', Cancelled: 'red' };
+		return [__(doc.status), colors[doc.status], 'status,=,' + doc.status];
+	}
+};
@@ -39,16 +39,28 @@ class WMSPack {
 			// Generate unique session ID for this tab
 			this.session_id = this.generate_session_id();
 
+			// Confirmed packs are kept on the device until the server has them
+			this.scan_queue = new wms.ScanQueue({
+				doctype: 'Delivery Note',
+				name: this.delivery_note,
+				session_id: this.session_id,
+				on_result: (res, event) => this.on_scan_result(res, event),
+				on_stored: (version) => { this.version = version; }
+			});
+			this.event_counter = 0;
+
 			this.setup_page();
 			this.try_lock_delivery_note();
 
 			// Unlock on page unload
+			// (queued packs stay on the device and are sent on the next visit)
 			$(window).on('beforeunload', () => {
 				this.unlock_delivery_note();
 			});
 
 			// Unlock when navigating away
 			frappe.router.on('change', () => {
+				this.scan_queue.flush();
 				this.unlock_delivery_note();
 			});
 		}
@@ -62,30 +74,68 @@ class WMSPack {
 	setup_list_view() {
 		// Show list of unpacked delivery notes
 		this.page.set_title('Pack Orders');
+		this.page.set_primary_action(__('Next Order'), () => wms.open_next_task('Pack'));
 
 		this.page.main.html(`
 			<div class="wms-pack-list-container">
 				<div class="wms-pack-list-header">
 					<h3>Delivery Notes Ready for Packing</h3>
+					<div class="wms-pack-list-filters"></div>
 				</div>
 				<div class="wms-pack-list" id="wms-pack-list">
 					<div class="text-center text-muted" style="padding: 40px;">
 						Loading...
 					</div>
 				</div>
+				<div class="text-center" style="padding: 10px;">
+					<button class="btn btn-default btn-sm" id="wms-pack-list-more" style="display: none;">
+						Load More
+					</button>
+				</div>
 			</div>
 		`);
 
+		// Filters reload the list from the first page
+		const $filters = this.page.main.find('.wms-pack-list-filters');
+		this.list_filters = {};
+		[
+			{ fieldname: 'customer', fieldtype: 'Link', options: 'Customer', placeholder: 'Customer' },
+			{ fieldname: 'pick_list', fieldtype: 'Link', options: 'Pick List', placeholder: 'Pick List' }
+		].forEach(df => {
+			this.list_filters[df.fieldname] = frappe.ui.form.make_control({
+				df: Object.assign(df, {
+					change: () => this.load_delivery_notes_list()
+				}),
+				parent: $filters,
+				render_input: true
+			});
+		});
+
+		this.page.main.find('#wms-pack-list-more').on('click', () => {
+			this.load_delivery_notes_list(this.list_cursor);
+		});
+
 		this.load_delivery_notes_list();
 	}
 
-	load_delivery_notes_list() {
+	load_delivery_notes_list(after) {
 		frappe.call({
 			method: 'wms.api.get_unpacked_delivery_notes',
+			args: {
+				customer: this.list_filters.customer.get_value() || null,
+				pick_list: this.list_filters.pick_list.get_value() || null,
+				after: after || null
+			},
 			callback: (r) => {
-				if (r.message && r.message.length > 0) {
-					this.render_delivery_notes_list(r.message);
-				} else {
+				const page = r.message || {};
+				const delivery_notes = page.delivery_notes || [];
+
+				this.list_cursor = page.next_cursor;
+				$('#wms-pack-list-more').toggle(!!page.next_cursor);
+
+				if (delivery_notes.length > 0) {
+					this.render_delivery_notes_list(delivery_notes, !!after);
+				} else if (!after) {
 					$('#wms-pack-list').html(`
 						<div class="text-center text-muted" style="padding: 40px;">
 							<p>No delivery notes ready for packing.</p>
@@ -96,7 +146,7 @@ class WMSPack {
 		});
 	}
 
-	render_delivery_notes_list(delivery_notes) {
+	render_delivery_notes_list(delivery_notes, append) {
 		let html = '';
 		delivery_notes.forEach(dn => {
 			html += `
@@ -112,7 +162,7 @@ class WMSPack {
 						</div>
 						<div class="wms-dn-info">
 							<span class="text-muted">Items:</span>
-							<strong>${dn.total_items} items (${dn.total_qty} qty)</strong>
+							<strong>${dn.total_items} items (${dn.packed_qty || 0} / ${dn.total_qty} qty packed)</strong>
 						</div>
 						${dn.pick_list ? `
 							<div class="wms-dn-info">
@@ -125,7 +175,11 @@ class WMSPack {
 			`;
 		});
 
-		$('#wms-pack-list').html(html);
+		if (append) {
+			$('#wms-pack-list').append(html);
+		} else {
+			$('#wms-pack-list').html(html);
+		}
 	}
 
 	setup_page() {
@@ -210,8 +264,9 @@ class WMSPack {
 
 					this.show_locked_message(msg.locked_by, msg.is_same_user);
 				} else {
-					// Successfully locked, load data
-					this.load_data();
+					// Successfully locked, keep the lock alive and load data
+					this.start_heartbeat(r.message && r.message.heartbeat_interval);
+					this.scan_queue.open().then(() => this.load_data());
 				}
 			}
 		});
@@ -219,18 +274,47 @@ class WMSPack {
 
 	unlock_delivery_note() {
 		// Silent unlock
+		this.stop_heartbeat();
 		if (!this.delivery_note) return;
 
 		frappe.call({
 			method: 'wms.api.unlock_delivery_note',
 			args: {
-				delivery_note: this.delivery_note
+				delivery_note: this.delivery_note,
+				session_id: this.session_id
 			},
 			freeze: false,
 			async: false
 		});
 	}
 
+	start_heartbeat(interval) {
+		// The lock expires on the server unless this tab keeps renewing it
+		this.stop_heartbeat();
+		if (!interval) return;
+
+		const delivery_note = this.delivery_note;
+		this.heartbeat_timer = setInterval(() => {
+			frappe.call({
+				method: 'wms.api.renew_document_lock',
+				args: { doctype: 'Delivery Note', name: delivery_note, session_id: this.session_id },
+				callback: (r) => {
+					if (r.message && !r.message.success) {
+						this.stop_heartbeat();
+						this.try_lock_delivery_note();
+					}
+				}
+			});
+		}, interval * 1000);
+	}
+
+	stop_heartbeat() {
+		if (this.heartbeat_timer) {
+			clearInterval(this.heartbeat_timer);
+			this.heartbeat_timer = null;
+		}
+	}
+
 	show_locked_message(locked_by, is_same_user) {
 		let message = is_same_user ?
 			'This delivery note is already being packed in another tab.' :
@@ -267,9 +351,19 @@ class WMSPack {
 
 	process_delivery_note_data(data) {
 		this.delivery_note_doc = data;
+		this.version = data.version;
 		this.pack_items = data.items || [];
 		this.total_items = this.pack_items.length;
 
+		// Packs confirmed on this device but not yet stored on the server
+		this.scan_queue.pending().forEach(event => {
+			const item = this.pack_items.find(itm => itm.idx === event.item_idx);
+			if (item) {
+				item.wms_packed_qty = event.packed_qty;
+				item.wms_package_no = event.package_no || item.wms_package_no;
+			}
+		});
+
 		// Count already packed items
 		this.completed_count = 0;
 		this.pack_items.forEach(item => {
@@ -469,55 +563,69 @@ class WMSPack {
 			return;
 		}
 
-		// Update packing progress
-		frappe.call({
-			method: 'wms.api.update_packing_progress',
-			args: {
-				delivery_note: this.delivery_note,
-				item_idx: item.idx,
-				packed_qty: pack_qty,
-				package_no: item.wms_package_no || item.wms_box || 'PKG-001'
-			},
-			callback: (r) => {
-				if (r.message && r.message.success) {
-					// Mark item as packed
-					item.packed = true;
-					item.wms_packed_qty = pack_qty;
-					this.completed_count++;
-
-					// Show success
-					frappe.show_alert({
-						message: `Item ${item.item_code} packed!`,
-						indicator: 'green'
-					}, 2);
-
-					// Update progress
-					this.render_progress();
-					this.render_items_list();
-
-					// Move to next or show completion
-					if (this.current_item_idx < this.pack_items.length - 1) {
-						setTimeout(() => {
-							this.show_item_detail(this.current_item_idx + 1);
-						}, 300);
-					} else {
-						this.show_completion();
-					}
-				} else {
-					frappe.show_alert({
-						message: 'Failed to update packing progress',
-						indicator: 'red'
-					}, 3);
-				}
-			},
-			error: (err) => {
-				frappe.show_alert({
-					message: 'Error updating packing progress',
-					indicator: 'red'
-				}, 3);
-				console.error('Packing update error:', err);
-			}
+		// Queue the confirmation; it is stored in the background
+		this.event_counter++;
+		this.scan_queue.push({
+			key: `${this.session_id}-${this.event_counter}`,
+			item_idx: item.idx,
+			item_code: item.item_code,
+			packed_qty: pack_qty,
+			package_no: item.wms_package_no || item.wms_box || 'PKG-001',
+			at: Date.now()
 		});
+
+		// Mark item as packed
+		item.packed = true;
+		item.wms_packed_qty = pack_qty;
+		this.completed_count++;
+
+		// Show success
+		frappe.show_alert({
+			message: `Item ${item.item_code} packed!`,
+			indicator: 'green'
+		}, 2);
+
+		// Update progress
+		this.render_progress();
+		this.render_items_list();
+
+		// Move to next or show completion
+		if (this.current_item_idx < this.pack_items.length - 1) {
+			setTimeout(() => {
+				this.show_item_detail(this.current_item_idx + 1);
+			}, 300);
+		} else {
+			this.show_completion();
+		}
+	}
+
+	on_scan_result(res, event) {
+		// A queued pack the server did not store
+		if (res.reason === 'lock_taken') {
+			frappe.msgprint({
+				title: 'Delivery Note Locked',
+				indicator: 'orange',
+				message: `Packs made offline were not saved: ${res.locked_by} took over this delivery note.`
+			});
+			this.stop_heartbeat();
+			this.show_locked_message(res.locked_by, res.locked_by === frappe.session.user);
+			return;
+		}
+
+		const message = res.reason === 'over_pack'
+			? `Pack of ${event.item_code} was not saved: ${res.packed_qty} is more than the ${res.qty} required.`
+			: res.reason === 'row_changed'
+				? `Pack of ${event.item_code} was not saved: the delivery note was changed.`
+				: `Failed to update packing progress: ${res.message}`;
+
+		frappe.show_alert({ message: message, indicator: 'red' }, 5);
+
+		// Show the delivery note as stored once the queue settles
+		clearTimeout(this.resync_timer);
+		this.resync_timer = setTimeout(() => {
+			this.packages = {};
+			this.load_data();
+		}, 500);
 	}
 
 	show_completion() {
@@ -582,6 +690,21 @@ class WMSPack {
 	}
 
 	create_shipment(values) {
+		// Every pack must be stored before the shipment is created
+		this.scan_queue.flush().then((stored) => {
+			if (stored) {
+				this.submit_shipment(values);
+			} else {
+				frappe.msgprint({
+					title: 'Packing Not Saved',
+					indicator: 'orange',
+					message: 'Some packs are not saved on the server yet. Please try again once the connection is back.'
+				});
+			}
+		});
+	}
+
+	submit_shipment(values) {
 		frappe.call({
 			method: 'wms.api.create_shipment',
 			args: {
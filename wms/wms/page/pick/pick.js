@@ -18,12 +18,54 @@ const SCAN_STATE = {
 	COMPLETE: 'complete'
 };
 
+// Server methods for picking a single pick list, a wave of pick lists or one zone of a pick list
+const PICK_METHODS = {
+	lock: 'wms.api.lock_pick_list',
+	unlock: 'wms.api.unlock_pick_list',
+	details: 'wms.api.get_pick_list_details',
+	delivery_notes: 'wms.api.create_delivery_notes_from_pick_list'
+};
+
+const WAVE_METHODS = {
+	lock: 'wms.api.lock_wave',
+	unlock: 'wms.api.unlock_wave',
+	details: 'wms.api.get_wave_details',
+	delivery_notes: 'wms.api.create_delivery_notes_from_wave'
+};
+
+const ZONE_TASK_METHODS = {
+	lock: 'wms.api.lock_zone_task',
+	unlock: 'wms.api.unlock_zone_task',
+	details: 'wms.api.get_zone_task_details',
+	delivery_notes: 'wms.api.create_delivery_notes_from_zone_task'
+};
+
 class WMSPick {
 	constructor(page) {
 		this.page = page;
-		this.pick_list = frappe.get_route()[1];
+		// pick/<pick list>, pick/wave/<wave> or pick/zone/<zone task>
+		const route = frappe.get_route();
+		this.wave = route[1] === 'wave' ? route[2] : null;
+		this.zone_task = route[1] === 'zone' ? route[2] : null;
+		this.pick_list = this.wave || this.zone_task ? null : route[1];
+		// Waves and zone tasks store their picks on rows of (other) pick lists
+		this.batched = !!(this.wave || this.zone_task);
+
+		if (this.zone_task) {
+			this.doctype = 'WMS Zone Task';
+			this.doc_label = 'Zone Task';
+			this.docname = this.zone_task;
+			this.doc_args = { zone_task: this.zone_task };
+			this.methods = ZONE_TASK_METHODS;
+		} else {
+			this.doctype = this.wave ? 'WMS Wave' : 'Pick List';
+			this.doc_label = this.wave ? 'Wave' : 'Pick List';
+			this.docname = this.wave || this.pick_list;
+			this.doc_args = this.wave ? { wave: this.wave } : { pick_list: this.pick_list };
+			this.methods = this.wave ? WAVE_METHODS : PICK_METHODS;
+		}
 
-		if (!this.pick_list) {
+		if (!this.docname) {
 			frappe.msgprint('No Pick List specified');
 			return;
 		}
@@ -48,19 +90,38 @@ class WMSPick {
 		// Scan order configuration (default) - removed 'box' since it's automatic
 		this.scan_order = ['location', 'batch', 'item'];
 
+		// Confirmed picks are kept on the device until the server has them
+		this.scan_queue = new wms.ScanQueue({
+			doctype: this.doctype,
+			name: this.docname,
+			session_id: this.session_id,
+			on_result: (res, event) => this.on_scan_result(res, event),
+			on_stored: (version) => { this.version = version; }
+		});
+		this.event_counter = 0;
+
 		this.setup_page();
 		this.load_settings();
 		this.try_lock_pick_list();
 
 		// Unlock on page unload
+		// (queued picks stay on the device and are sent on the next visit)
 		$(window).on('beforeunload', () => {
 			this.unlock_pick_list();
 		});
 
 		// Unlock when navigating away
 		frappe.router.on('change', () => {
+			this.scan_queue.flush();
 			this.unlock_pick_list();
 		});
+
+		// Catch up with changes made while the tab was in the background
+		$(document).on('visibilitychange', () => {
+			if (!document.hidden && this.version !== undefined && !this.scan_queue.pending().length) {
+				this.sync_data();
+			}
+		});
 	}
 
 	generate_session_id() {
@@ -70,13 +131,19 @@ class WMSPick {
 
 	try_lock_pick_list() {
 		frappe.call({
-			method: 'wms.api.lock_pick_list',
+			method: this.methods.lock,
 			args: {
-				pick_list: this.pick_list,
+				...this.doc_args,
 				session_id: this.session_id
 			},
 			callback: (r) => {
-				if (r.message && !r.message.success) {
+				if (r.message && r.message.wave) {
+					// Picked as part of a wave
+					this.show_wave_message(r.message.wave, r.message.message);
+				} else if (r.message && r.message.zone_tasks) {
+					// Split into zone tasks
+					this.show_zone_tasks_message(r.message.zone_tasks, r.message.message);
+				} else if (r.message && !r.message.success) {
 					// Locked by someone else or another tab
 					const msg = r.message;
 
@@ -89,8 +156,9 @@ class WMSPick {
 					// Show locked message in UI
 					this.show_locked_message(msg.locked_by, msg.is_same_user);
 				} else {
-					// Successfully locked, load data
-					this.load_data();
+					// Successfully locked, keep the lock alive and load data
+					this.start_heartbeat(r.message && r.message.heartbeat_interval);
+					this.scan_queue.open().then(() => this.load_data());
 				}
 			}
 		});
@@ -98,15 +166,43 @@ class WMSPick {
 
 	unlock_pick_list() {
 		// Silent unlock - don't show messages
-		if (this.pick_list) {
+		this.stop_heartbeat();
+		if (this.docname) {
 			frappe.call({
-				method: 'wms.api.unlock_pick_list',
-				args: { pick_list: this.pick_list },
+				method: this.methods.unlock,
+				args: { ...this.doc_args, session_id: this.session_id },
 				async: false  // Ensure it completes before page unload
 			});
 		}
 	}
 
+	start_heartbeat(interval) {
+		// The lock expires on the server unless this tab keeps renewing it
+		this.stop_heartbeat();
+		if (!interval) return;
+
+		this.heartbeat_timer = setInterval(() => {
+			frappe.call({
+				method: 'wms.api.renew_document_lock',
+				args: { doctype: this.doctype, name: this.docname, session_id: this.session_id },
+				callback: (r) => {
+					if (r.message && !r.message.success) {
+						// Lock lapsed (e.g. device slept); take it again if still free
+						this.stop_heartbeat();
+						this.try_lock_pick_list();
+					}
+				}
+			});
+		}, interval * 1000);
+	}
+
+	stop_heartbeat() {
+		if (this.heartbeat_timer) {
+			clearInterval(this.heartbeat_timer);
+			this.heartbeat_timer = null;
+		}
+	}
+
 	show_locked_message(locked_by, is_same_user) {
 		const message_text = is_same_user
 			? `You have this pick list open in another tab.`
@@ -114,7 +210,7 @@ class WMSPick {
 
 		const detail_text = is_same_user
 			? `Please close the other tab or use that tab to continue picking.`
-			: `Please wait until they complete or the lock expires (30 minutes).`;
+			: `Please wait until they complete or close the pick list.`;
 
 		this.$detail.html(`
 			<div class="wms-detail-container">
@@ -127,14 +223,52 @@ class WMSPick {
 					<p style="color: var(--text-muted); font-size: 14px; margin-top: 10px;">
 						${detail_text}
 					</p>
-					<button class="wms-confirm-btn" onclick="frappe.set_route('Form', 'Pick List', '${this.pick_list}')">
-						Back to Pick List
+					<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+						Back to ${this.doc_label}
 					</button>
 				</div>
 			</div>
 		`);
 	}
 
+	show_wave_message(wave, message) {
+		this.$detail.html(`
+			<div class="wms-detail-container">
+				<div class="wms-completion">
+					<div class="wms-completion-icon" style="background: var(--orange-500);">
+						<span class="octicon octicon-list-ordered"></span>
+					</div>
+					<h2>Part of Wave ${wave}</h2>
+					<p>${message}</p>
+					<button class="wms-confirm-btn" onclick="window.location.href = '/app/pick/wave/${encodeURIComponent(wave)}'">
+						Pick Wave
+					</button>
+				</div>
+			</div>
+		`);
+	}
+
+	show_zone_tasks_message(zone_tasks, message) {
+		const buttons = zone_tasks.map(task => `
+			<button class="wms-confirm-btn" onclick="window.location.href = '/app/pick/zone/${encodeURIComponent(task)}'">
+				Pick ${task}
+			</button>
+		`).join('');
+
+		this.$detail.html(`
+			<div class="wms-detail-container">
+				<div class="wms-completion">
+					<div class="wms-completion-icon" style="background: var(--orange-500);">
+						<span class="octicon octicon-list-ordered"></span>
+					</div>
+					<h2>Picked by Zone</h2>
+					<p>${message}</p>
+					${buttons}
+				</div>
+			</div>
+		`);
+	}
+
 	load_settings() {
 		frappe.call({
 			method: 'frappe.desk.form.load.getdoc',
@@ -200,7 +334,7 @@ class WMSPick {
 		});
 
 		// Make instance accessible globally
-		window.wms = this;
+		window.wms_pick_instance = this;
 	}
 
 	switch_tab(tab) {
@@ -215,18 +349,32 @@ class WMSPick {
 
 	load_data() {
 		frappe.call({
-			method: 'wms.api.get_pick_list_details',
-			args: { pick_list: this.pick_list },
+			method: this.methods.details,
+			args: this.doc_args,
 			callback: (r) => {
 				if (r.message) {
 					this.pick_items = r.message.items;
 					this.total_items = r.message.total_items;
+					this.wave_pick_lists = r.message.pick_lists;
+					this.version = r.message.version;
+					this.synced_at = r.message.synced_at;
 
 					// Count already completed items and assign boxes per order
 					this.completed_count = 0;
 					this.order_boxes = {}; // Map order_ref -> box_name
+
+					// Boxes assigned on the server (waves, earlier sessions) are kept
+					this.pick_items.forEach(item => {
+						if (item.box) {
+							this.order_boxes[item.order_ref || '_no_order'] = item.box;
+						}
+					});
+
+					const used_boxes = new Set(Object.values(this.order_boxes));
 					let box_num = 1;
 
+					this.apply_pending_picks();
+
 					this.pick_items.forEach(item => {
 						// Mark as completed if picked_qty matches qty
 						if (item.picked_qty && item.picked_qty >= item.qty) {
@@ -234,21 +382,19 @@ class WMSPick {
 							this.completed_count++;
 						}
 
-						// Assign box per order automatically
-						if (item.order_ref) {
-							if (!this.order_boxes[item.order_ref]) {
-								this.order_boxes[item.order_ref] = `BOX-${String(box_num).padStart(3, '0')}`;
-								box_num++;
-							}
-							item.auto_box = this.order_boxes[item.order_ref];
-						} else {
-							// No order ref, use generic box
-							if (!this.order_boxes['_no_order']) {
-								this.order_boxes['_no_order'] = `BOX-${String(box_num).padStart(3, '0')}`;
+						// Assign box per order automatically; no order ref uses a generic box
+						const order_ref = item.order_ref || '_no_order';
+						if (!this.order_boxes[order_ref]) {
+							let box;
+							do {
+								box = `BOX-${String(box_num).padStart(3, '0')}`;
 								box_num++;
-							}
-							item.auto_box = this.order_boxes['_no_order'];
+							} while (used_boxes.has(box));
+
+							used_boxes.add(box);
+							this.order_boxes[order_ref] = box;
 						}
+						item.auto_box = this.order_boxes[order_ref];
 					});
 
 					this.render();
@@ -257,6 +403,67 @@ class WMSPick {
 		});
 	}
 
+	sync_data() {
+		// Waves and zone tasks are reloaded in full
+		if (this.batched) {
+			this.load_data();
+			return;
+		}
+
+		// Fetch only the rows changed since the last load
+		frappe.call({
+			method: this.methods.details,
+			args: {
+				pick_list: this.pick_list,
+				version: this.version,
+				since: this.synced_at
+			},
+			callback: (r) => {
+				const data = r.message;
+				if (!data || data.not_modified) return;
+
+				// Rows added, removed or re-ordered: start over
+				if (data.total_items !== this.pick_items.length || data.items.length === data.total_items) {
+					this.load_data();
+					return;
+				}
+
+				this.version = data.version;
+				this.synced_at = data.synced_at;
+
+				data.items.forEach(changed => {
+					const item = this.pick_items.find(itm => itm.idx === changed.idx);
+					if (item) {
+						Object.assign(item, changed);
+						item.picked = changed.picked_qty >= changed.qty;
+					}
+				});
+				this.apply_pending_picks();
+
+				this.completed_count = this.pick_items.filter(item => item.picked).length;
+				this.render();
+			}
+		});
+	}
+
+	apply_pending_picks() {
+		// Picks confirmed on this device but not yet stored on the server
+		this.scan_queue.pending().forEach(event => {
+			const item = this.find_event_item(event);
+			if (item) {
+				item.picked_qty = event.picked_qty;
+				item.picked = event.picked_qty >= item.qty;
+				item.box = event.box || item.box;
+			}
+		});
+	}
+
+	find_event_item(event) {
+		return this.pick_items.find(item => this.batched
+			? item.pick_list === event.pick_list && item.pick_list_idx === event.pick_list_idx
+			: item.idx === event.item_idx);
+	}
+
 	render() {
 		this.render_progress();
 		this.render_items_list();
@@ -303,7 +510,7 @@ class WMSPick {
 			html += `
 				<div class="wms-item-card ${is_active ? 'active' : ''} ${is_completed ? 'completed' : ''} ${is_partial ? 'partial' : ''}"
 				     data-idx="${idx}"
-				     onclick="wms.select_item(${idx})">
+				     onclick="wms_pick_instance.select_item(${idx})">
 					${item.image ?
 						`<img src="${item.image}" class="wms-item-image" alt="${item.item_code}">` :
 						`<div class="wms-item-image wms-no-image">
@@ -359,7 +566,8 @@ class WMSPick {
 			location_verified: false,
 			batch_verified: false,
 			item_verified: false,
-			box_verified: false
+			box_verified: false,
+			steps: [] // scan steps of this line with their time, for the scan log
 		};
 
 		// Start from already picked quantity
@@ -581,11 +789,16 @@ class WMSPick {
 		}
 	}
 
+	record_step(step_type) {
+		this.scan_data.steps.push({ step_type: step_type, at: Date.now() });
+	}
+
 	verify_location(scanned, item) {
 		// Accept any location scan for now
 		if (scanned) {
 			this.scan_data.location_verified = true;
 			this.scan_data.scanned_location = scanned;
+			this.record_step('Location');
 
 			frappe.show_alert({
 				message: 'Location verified',
@@ -601,6 +814,7 @@ class WMSPick {
 		if (scanned) {
 			this.scan_data.batch_verified = true;
 			this.scan_data.scanned_batch = scanned;
+			this.record_step('Batch');
 
 			frappe.show_alert({
 				message: 'Batch verified',
@@ -614,6 +828,7 @@ class WMSPick {
 	verify_item(scanned, item) {
 		if (scanned === item.item_code || scanned === item.barcode) {
 			this.scan_data.item_verified = true;
+			this.record_step('Item');
 
 			frappe.show_alert({
 				message: 'Item verified!',
@@ -766,57 +981,77 @@ class WMSPick {
 
 		const item = this.pick_items[this.current_item_idx];
 
-		// Update Pick List in database
-		frappe.call({
-			method: 'wms.api.update_pick_progress',
-			args: {
-				pick_list: this.pick_list,
-				item_idx: item.idx,
-				picked_qty: this.scanned_qty,
-				location: this.scan_data.scanned_location || item.warehouse,
-				batch_no: this.scan_data.scanned_batch || item.batch_no || '',
-				box: this.current_box
-			},
-			callback: (r) => {
-				if (r.message && r.message.success) {
-					// Mark as picked locally
-					item.picked = true;
-					item.picked_qty = this.scanned_qty;
-					item.box = this.current_box;
-					this.completed_count++;
-
-					// Show success
-					frappe.show_alert({
-						message: `Item ${item.item_code} picked!`,
-						indicator: 'green'
-					}, 2);
-
-					// Update progress
-					this.render_progress();
-
-					// Move to next or show completion
-					if (this.current_item_idx < this.pick_items.length - 1) {
-						setTimeout(() => {
-							this.show_item_detail(this.current_item_idx + 1);
-						}, 300);
-					} else {
-						this.show_completion();
-					}
-				} else {
-					frappe.show_alert({
-						message: 'Failed to update pick list',
-						indicator: 'red'
-					}, 3);
-				}
-			},
-			error: (err) => {
-				frappe.show_alert({
-					message: 'Error updating pick list',
-					indicator: 'red'
-				}, 3);
-				console.error('Pick update error:', err);
-			}
-		});
+		// Queue the confirmation; it is sent together with the next few picks
+		this.event_counter++;
+		const event = {
+			key: `${this.session_id}-${this.event_counter}`,
+			item_idx: item.idx,
+			item_code: item.item_code,
+			picked_qty: this.scanned_qty,
+			location: this.scan_data.scanned_location || item.warehouse,
+			batch_no: this.scan_data.scanned_batch || item.batch_no || '',
+			box: this.current_box,
+			steps: this.scan_data.steps,
+			at: Date.now()
+		};
+		if (this.batched) {
+			// Wave and zone rows are stored on the row of their own pick list
+			event.pick_list = item.pick_list;
+			event.pick_list_idx = item.pick_list_idx;
+		}
+		this.scan_queue.push(event);
+
+		// Mark as picked locally
+		item.picked = true;
+		item.picked_qty = this.scanned_qty;
+		item.box = this.current_box;
+		this.completed_count++;
+
+		// Show success
+		frappe.show_alert({
+			message: `Item ${item.item_code} picked!`,
+			indicator: 'green'
+		}, 2);
+
+		// Update progress
+		this.render_progress();
+
+		// Move to next or show completion
+		if (this.current_item_idx < this.pick_items.length - 1) {
+			setTimeout(() => {
+				this.show_item_detail(this.current_item_idx + 1);
+			}, 300);
+		} else {
+			this.show_completion();
+		}
+	}
+
+	on_scan_result(res, event) {
+		// A queued pick the server did not store
+		if (res.reason === 'lock_taken') {
+			frappe.msgprint({
+				title: 'Pick List Locked',
+				indicator: 'orange',
+				message: `Picks made offline were not saved: ${res.locked_by} took over this ${this.doc_label.toLowerCase()}.`
+			});
+			this.stop_heartbeat();
+			this.show_locked_message(res.locked_by, res.locked_by === frappe.session.user);
+			return;
+		}
+
+		const item = this.find_event_item(event);
+		const item_code = (item && item.item_code) || event.item_code || '';
+		const message = res.reason === 'over_pick'
+			? `Pick of ${item_code} was not saved: ${res.picked_qty} is more than the ${res.qty} required.`
+			: res.reason === 'row_changed'
+				? `Pick of ${item_code} was not saved: the ${this.doc_label.toLowerCase()} was changed.`
+				: `Failed to update pick list: ${res.message}`;
+
+		frappe.show_alert({ message: message, indicator: 'red' }, 5);
+
+		// Show the pick list as stored once the queue settles
+		clearTimeout(this.resync_timer);
+		this.resync_timer = setTimeout(() => this.load_data(), 500);
 	}
 
 	show_completion() {
@@ -831,28 +1066,81 @@ class WMSPick {
 			</div>
 		`);
 
+		// Make sure every pick is stored before creating delivery notes
+		this.scan_queue.flush().then((stored) => {
+			if (stored) {
+				this.create_delivery_notes();
+			} else {
+				this.$detail.html(`
+					<div class="wms-completion">
+						<div class="wms-completion-icon">
+							<span class="octicon octicon-alert"></span>
+						</div>
+						<h2>Picking Complete!</h2>
+						<p>Some picks are not saved on the server yet. Delivery notes were not created.</p>
+						<button class="wms-confirm-btn" onclick="wms_pick_instance.show_completion()">
+							Try Again
+						</button>
+					</div>
+				`);
+			}
+		});
+	}
+
+	create_delivery_notes() {
+		// Delivery notes are created by a background job per pick list that reports its progress
+		const pick_lists = this.batched ? this.wave_pick_lists : [this.pick_list];
+		const jobs = {}; // pick_list -> last progress message
+		let expected = null; // pick lists with a job, known once the server replies
+		let total = 0;
+		let finished = false;
+
+		const report = () => {
+			const results = expected.map(pick_list => jobs[pick_list]);
+
+			if (results.some(data => !data || data.status === 'Running')) {
+				const done = results.reduce((sum, data) => sum + ((data && data.done) || 0), 0);
+				this.show_delivery_note_progress(done, total);
+				return;
+			}
+
+			finished = true;
+			frappe.realtime.off('wms_delivery_note_progress', on_progress);
+			this.show_delivery_note_result({
+				status: results.some(data => data.status === 'Completed') ? 'Completed' : 'Failed',
+				delivery_notes: [].concat(...results.map(data => data.delivery_notes || [])),
+				failed: [].concat(...results.map(data => data.failed || []))
+			});
+		};
+
+		const on_progress = (data) => {
+			if (!pick_lists.includes(data.pick_list) || finished) return;
+
+			jobs[data.pick_list] = data;
+			if (expected) report();
+		};
+		frappe.realtime.on('wms_delivery_note_progress', on_progress);
+
 		// Call API to create delivery notes
 		frappe.call({
-			method: 'wms.api.create_delivery_notes_from_pick_list',
-			args: {
-				pick_list: this.pick_list
-			},
+			method: this.methods.delivery_notes,
+			args: this.doc_args,
 			callback: (r) => {
 				// Unlock the pick list
 				this.unlock_pick_list();
 
-				if (r.message && r.message.success) {
-					const count = r.message.count;
-					const dns = r.message.delivery_notes;
-
-					// Show completion with delivery note links
-					this.show_delivery_note_links(dns);
-
-					frappe.show_alert({
-						message: `Picking complete! Created ${count} delivery note(s)`,
-						indicator: 'green'
-					}, 5);
+				if (r.message && r.message.waiting) {
+					// Other zones of the pick list are still being picked
+					frappe.realtime.off('wms_delivery_note_progress', on_progress);
+					this.show_zone_waiting(r.message.zone_tasks);
+				} else if (r.message && r.message.success) {
+					// The jobs may already have reported back
+					expected = r.message.pick_lists || [this.pick_list];
+					total = r.message.count;
+					report();
 				} else {
+					frappe.realtime.off('wms_delivery_note_progress', on_progress);
+
 					// Still show completion but without delivery notes
 					this.$detail.html(`
 						<div class="wms-completion">
@@ -862,8 +1150,8 @@ class WMSPick {
 							<h2>Picking Complete!</h2>
 							<p>All ${this.total_items} items have been picked.</p>
 							<p class="text-muted">No delivery notes created (no sales orders found).</p>
-							<button class="wms-confirm-btn" onclick="frappe.set_route('Form', 'Pick List', '${this.pick_list}')">
-								Back to Pick List
+							<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+								Back to ${this.doc_label}
 							</button>
 						</div>
 					`);
@@ -871,6 +1159,7 @@ class WMSPick {
 			},
 			error: (err) => {
 				// Unlock on error
+				frappe.realtime.off('wms_delivery_note_progress', on_progress);
 				this.unlock_pick_list();
 
 				console.error('Error creating delivery notes:', err);
@@ -882,8 +1171,8 @@ class WMSPick {
 						<h2>Picking Complete!</h2>
 						<p>All ${this.total_items} items picked, but failed to create delivery notes.</p>
 						<p class="text-muted">${err.message || 'Unknown error'}</p>
-						<button class="wms-confirm-btn" onclick="frappe.set_route('Form', 'Pick List', '${this.pick_list}')">
-							Back to Pick List
+						<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+							Back to ${this.doc_label}
 						</button>
 					</div>
 				`);
@@ -891,6 +1180,82 @@ class WMSPick {
 		});
 	}
 
+	show_zone_waiting(zone_tasks) {
+		// This zone is done; the last zone to finish creates the delivery notes
+		const remaining = (zone_tasks || []).map(task =>
+			`<li>${task.name} (${task.zone || 'Other'}): ${task.assigned_to || 'unassigned'}</li>`
+		).join('');
+
+		this.$detail.html(`
+			<div class="wms-completion">
+				<div class="wms-completion-icon">
+					<span class="octicon octicon-check"></span>
+				</div>
+				<h2>Zone Complete!</h2>
+				<p>All ${this.total_items} items of this zone have been picked. Bring the totes to consolidation.</p>
+				<p class="text-muted">Still being picked:</p>
+				<ul class="text-muted">${remaining}</ul>
+				<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+					Back to ${this.doc_label}
+				</button>
+			</div>
+		`);
+	}
+
+	show_delivery_note_progress(done, total) {
+		const percent = total ? Math.round(done / total * 100) : 0;
+
+		this.$detail.html(`
+			<div class="wms-completion">
+				<div class="wms-completion-icon">
+					<span class="octicon octicon-sync"></span>
+				</div>
+				<h2>Picking Complete!</h2>
+				<p>Creating delivery notes... ${done} / ${total}</p>
+				<div class="progress">
+					<div class="progress-bar" style="width: ${percent}%"></div>
+				</div>
+			</div>
+		`);
+	}
+
+	show_delivery_note_result(data) {
+		const failed = data.failed || [];
+
+		if (failed.length) {
+			frappe.msgprint({
+				title: 'Delivery Notes Not Created',
+				indicator: 'orange',
+				message: failed.map(f => `${f.sales_order}: ${f.message}`).join('<br>')
+			});
+		}
+
+		if (data.status === 'Completed') {
+			const dns = data.delivery_notes || [];
+
+			// Show completion with delivery note links
+			this.show_delivery_note_links(dns);
+
+			frappe.show_alert({
+				message: `Picking complete! Created ${dns.length} delivery note(s)`,
+				indicator: 'green'
+			}, 5);
+		} else {
+			this.$detail.html(`
+				<div class="wms-completion">
+					<div class="wms-completion-icon">
+						<span class="octicon octicon-alert"></span>
+					</div>
+					<h2>Picking Complete!</h2>
+					<p>All ${this.total_items} items picked, but failed to create delivery notes.</p>
+					<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+						Back to ${this.doc_label}
+					</button>
+				</div>
+			`);
+		}
+	}
+
 	show_delivery_note_links(delivery_notes) {
 		let links_html = '';
 		delivery_notes.forEach(dn => {
@@ -915,8 +1280,8 @@ class WMSPick {
 				<div class="wms-dn-links">
 					${links_html}
 				</div>
-				<button class="wms-confirm-btn" onclick="frappe.set_route('Form', 'Pick List', '${this.pick_list}')">
-					Back to Pick List
+				<button class="wms-confirm-btn" onclick="frappe.set_route('Form', '${this.doctype}', '${this.docname}')">
+					Back to ${this.doc_label}
 				</button>
 			</div>
 		`);
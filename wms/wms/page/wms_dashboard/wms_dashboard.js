@@ -11,23 +11,40 @@ frappe.pages['wms-dashboard'].on_page_load = function(wrapper) {
 class WMSDashboard {
 	constructor(page) {
 		this.page = page;
+		this.pick_lists = [];
+		this.progress = {}; // pick list -> latest progress snapshot
+		this.subscribed = new Set();
 		this.setup_page();
 		this.load_data();
 
-		// Refresh every 30 seconds
-		setInterval(() => this.load_data(), 30000);
+		// Changes are pushed by the server instead of polling
+		frappe.realtime.doctype_subscribe('Pick List');
+		frappe.realtime.on('wms_dashboard_update', (data) => this.apply_update(data));
+
+		// Picking progress arrives as coalesced snapshots from each pick list's room
+		frappe.realtime.on('wms_progress_snapshot', (data) => this.apply_progress(data));
 	}
 
 	setup_page() {
+		this.page.set_primary_action(__('Next Pick Task'), () => wms.open_next_task('Pick'));
+
 		this.page.main.html(`
 			<div class="wms-dashboard">
 				<div class="wms-stats"></div>
 				<div class="wms-open-picks"></div>
+				<div class="wms-profile"></div>
 			</div>
 		`);
 
 		this.$stats = this.page.main.find('.wms-stats');
 		this.$picks = this.page.main.find('.wms-open-picks');
+		this.$profile = this.page.main.find('.wms-profile');
+
+		if (frappe.user.has_role(['System Manager', 'Stock Manager'])) {
+			this.$profile.on('click', '.wms-profile-refresh', () => this.load_profile());
+			this.$profile.on('click', '.wms-profile-clear', () => this.clear_profile());
+			this.load_profile();
+		}
 	}
 
 	load_data() {
@@ -35,13 +52,72 @@ class WMSDashboard {
 			method: 'wms.api.get_wms_dashboard_data',
 			callback: (r) => {
 				if (r.message) {
+					this.pick_lists = r.message.pick_lists;
 					this.render_stats(r.message.stats);
-					this.render_pick_lists(r.message.pick_lists);
+					this.render_pick_lists(this.pick_lists);
 				}
 			}
 		});
 	}
 
+	load_profile() {
+		frappe.call({
+			method: 'wms.api.get_wms_profile',
+			callback: (r) => {
+				if (r.message) {
+					this.render_profile(r.message);
+				}
+			}
+		});
+	}
+
+	clear_profile() {
+		frappe.call({
+			method: 'wms.api.clear_wms_profile',
+			callback: () => this.load_profile()
+		});
+	}
+
+	apply_update(data) {
+		this.render_stats(data.stats);
+
+		// Replace, add or drop the changed pick list
+		const was_full = this.pick_lists.length >= 20;
+		this.pick_lists = this.pick_lists.filter(pick => pick.name !== data.name);
+
+		if (!data.pick_list && was_full && this.pick_lists.length < 20) {
+			// A slot opened up in a full list; fetch the next pick list from the cache
+			this.load_data();
+			return;
+		}
+
+		if (data.pick_list) {
+			this.pick_lists.push(data.pick_list);
+			this.pick_lists.sort((a, b) => String(b.creation).localeCompare(String(a.creation)));
+			this.pick_lists = this.pick_lists.slice(0, 20);
+		}
+
+		this.render_pick_lists(this.pick_lists);
+	}
+
+	apply_progress(data) {
+		if (data.doctype !== 'Pick List') return;
+
+		this.progress[data.name] = data;
+		if (this.pick_lists.some(pick => pick.name === data.name)) {
+			this.render_pick_lists(this.pick_lists);
+		}
+	}
+
+	subscribe_progress(pick_lists) {
+		pick_lists.forEach(pick => {
+			if (!this.subscribed.has(pick.name)) {
+				this.subscribed.add(pick.name);
+				frappe.realtime.doc_subscribe('Pick List', pick.name);
+			}
+		});
+	}
+
 	render_stats(stats) {
 		this.$stats.html(`
 			<div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px;">
@@ -67,8 +143,11 @@ class WMSDashboard {
 			<div class="wms-picks-list">
 		`;
 
+		this.subscribe_progress(pick_lists);
+
 		pick_lists.forEach(pick => {
 			const is_locked = pick.wms_locked_by;
+			const progress = this.progress[pick.name];
 			const locked_by_me = is_locked && pick.wms_locked_by === frappe.session.user;
 
 			html += `
@@ -82,7 +161,9 @@ class WMSDashboard {
 						<span class="badge" style="background: var(--orange-500);">${pick.status}</span>
 					</div>
 					<div class="wms-pick-meta">
-						<span>${pick.total_items} items</span>
+						<span>${progress
+							? `${progress.lines_done} / ${progress.total_lines} items picked`
+							: `${pick.total_items} items`}</span>
 						${is_locked ? `<span style="color: var(--orange-600); font-size: 12px;">
 							${locked_by_me ? 'Picked by you' : 'Picked by ' + pick.locked_by_name}
 						</span>` : ''}
@@ -94,4 +175,58 @@ class WMSDashboard {
 		html += `</div>`;
 		this.$picks.html(html);
 	}
+
+	render_profile(profile) {
+		if (!profile.enabled && !profile.methods.length) {
+			this.$profile.html(`
+				<h3 style="margin: 30px 0 15px;">API Performance</h3>
+				<p class="text-muted">
+					Profiling is off. Enable it in <a href="/app/wms-settings">WMS Settings</a>
+					to record the timing of every WMS API call.
+				</p>
+			`);
+			return;
+		}
+
+		const format_bytes = (bytes) => bytes >= 1024 ? `${(bytes / 1024).toFixed(1)} KB` : `${bytes} B`;
+		const rows = profile.methods.map(row => `
+			<tr>
+				<td><code>${row.method.replace('wms.api.', '')}</code></td>
+				<td class="text-right">${row.calls}${row.errors ? ` <span class="text-danger">(${row.errors} failed)</span>` : ''}</td>
+				<td class="text-right">${row.p50_ms}</td>
+				<td class="text-right"><strong>${row.p95_ms}</strong></td>
+				<td class="text-right">${row.p99_ms}</td>
+				<td class="text-right">${row.avg_queries} / ${row.max_queries}</td>
+				<td class="text-right">${row.avg_query_ms}</td>
+				<td class="text-right">${row.cache_hit_rate === null ? '-' : Math.round(row.cache_hit_rate * 100) + '%'}</td>
+				<td class="text-right">${format_bytes(row.avg_bytes)}</td>
+			</tr>
+		`).join('');
+
+		this.$profile.html(`
+			<div class="wms-profile-header">
+				<h3>API Performance ${profile.enabled ? '' : '<span class="text-muted small">(profiling off)</span>'}</h3>
+				<div>
+					<button class="btn btn-xs btn-default wms-profile-refresh">Refresh</button>
+					<button class="btn btn-xs btn-default wms-profile-clear">Clear</button>
+				</div>
+			</div>
+			<table class="table table-bordered wms-profile-table">
+				<thead>
+					<tr>
+						<th>Method</th>
+						<th class="text-right">Calls</th>
+						<th class="text-right">p50 ms</th>
+						<th class="text-right">p95 ms</th>
+						<th class="text-right">p99 ms</th>
+						<th class="text-right">Queries (avg / max)</th>
+						<th class="text-right">Query ms</th>
+						<th class="text-right">Cache Hits</th>
+						<th class="text-right">Payload</th>
+					</tr>
+				</thead>
+				<tbody>${rows || '<tr><td colspan="9" class="text-muted">No calls recorded yet</td></tr>'}</tbody>
+			</table>
+		`);
+	}
 }
@@ -0,0 +1,408 @@
+"""
+WMS Zones
+Split large pick lists into zone tasks that are picked in parallel
+
+A WMS Zone is a set of aisles of a warehouse layout; a zone without
+aisles takes every aisle no other zone of its layout names. A pick list
+whose rows lie in several zones is split into one WMS Zone Task per
+zone, routed within its zone, so the pick list is done after its
+longest zone instead of after one walk through all of them. Rows
+outside every zone form a task of their own.
+
+Every order gets its box (BOX-001, BOX-002, ...) when the pick list is
+split, so each zone puts its part of an order in a tote with the same
+label. New tasks go to the pickers of their zone, largest task first,
+each to the picker with the fewest open lines. Picks are stored on the
+pick list rows as for waves; once every task is picked the totes are
+consolidated per order (get_consolidation) and the delivery notes of the
+pick list are created.
+"""
+
+import re
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from wms.locks import get_lock_holder
+from wms.routing import estimate_pick_minutes, get_pick_list_route, plan_pick_route, resolve_row_locations
+from wms.waves import PICK_ROW_FIELDS, format_box, get_active_wave, get_order_ref
+
+ZONE_MAP_CACHE = 'wms_zone_map'
+
+ACTIVE_ZONE_TASK_STATUSES = ('Open', 'Picking')
+PICKED_ZONE_TASK_STATUSES = ('Picked', 'Consolidated')
+
+# Pick lists are split on submit from this many lines when WMS Settings does not say
+DEFAULT_ZONE_PICKING_MIN_LINES = 20
+
+
+def get_zone_map():
+    """{layout warehouse: {aisle: zone}}, '' mapping to the zone of all other aisles"""
+    return frappe.cache().get_value(ZONE_MAP_CACHE, generator=load_zone_map)
+
+
+def load_zone_map():
+    zone_map = {}
+    for zone in frappe.get_all('WMS Zone',
+            filters={'enabled': 1},
+            fields=['name', 'warehouse', 'aisles'],
+            order_by='sequence asc, name asc'):
+        aisles = zone_map.setdefault(zone.warehouse, {})
+        # An aisle named by two zones belongs to the first in sequence
+        for aisle in parse_aisles(zone.aisles) or ['']:
+            aisles.setdefault(aisle, zone.name)
+
+    return zone_map
+
+
+def parse_aisles(value):
+    """Aisles of a zone, one per line or comma separated"""
+    return [aisle.strip() for aisle in re.split(r'[\n,]', value or '') if aisle.strip()]
+
+
+def clear_zone_map():
+    frappe.cache().delete_value(ZONE_MAP_CACHE)
+
+
+def get_zone(layout, aisle, zone_map=None):
+    """The zone of an aisle of a layout, or None"""
+    aisles = (zone_map if zone_map is not None else get_zone_map()).get(layout) or {}
+    return aisles.get(aisle or '') or aisles.get('')
+
+
+def get_zone_split_error(pick_list):
+    """Why a pick list cannot be split into zone tasks, or None"""
+    doc = frappe.db.get_value('Pick List', pick_list,
+        ['name', 'docstatus', 'status', 'wms_zone_picking', 'wms_picked_lines'], as_dict=True)
+
+    if not doc:
+        return _("Pick List {0} not found").format(pick_list)
+    if doc.docstatus == 2 or doc.status not in ('Draft', 'Open'):
+        return _("Pick List {0} is {1}").format(pick_list, _(doc.status))
+    if cint(doc.wms_zone_picking):
+        return _("Pick List {0} is already split into zone tasks").format(pick_list)
+    if get_active_wave(pick_list):
+        return _("Pick List {0} is picked as part of a wave").format(pick_list)
+    if get_lock_holder('Pick List', pick_list):
+        return _("Pick List {0} is being picked").format(pick_list)
+    if cint(doc.wms_picked_lines):
+        return _("Pick List {0} is already partly picked").format(pick_list)
+
+
+def create_zone_tasks(pick_list):
+    """
+    Split a pick list into one WMS Zone Task per zone its rows lie in
+
+    Returns the created tasks, in zone sequence; none when all rows lie
+    in one zone, so the pick list is picked as usual. Does not commit.
+    """
+    error = get_zone_split_error(pick_list)
+    if error:
+        frappe.throw(error)
+
+    # location is a custom field on some sites
+    fields = PICK_ROW_FIELDS + (['location'] if frappe.get_meta('Pick List Item').has_field('location') else [])
+    rows = frappe.get_all('Pick List Item',
+        filters={'parent': pick_list, 'parenttype': 'Pick List'},
+        fields=fields,
+        order_by='idx')
+
+    resolved = resolve_row_locations(rows)
+    locations = {location for location, layout in resolved.values()}
+    aisles = dict(frappe.get_all('WMS Location',
+        filters={'name': ['in', list(locations)]},
+        fields=['name', 'aisle'],
+        as_list=True
+    )) if locations else {}
+
+    zone_map = get_zone_map()
+    groups = {}
+    for row in rows:
+        location, layout = resolved.get(row.get('location')) or resolved.get(row.warehouse) or (None, None)
+        zone = get_zone(layout, aisles.get(location), zone_map) if layout else None
+        groups.setdefault(zone, []).append(row)
+
+    if len(groups) < 2:
+        return []
+
+    # Boxes in pick list order, the same in every zone
+    boxes = {}
+    for row in rows:
+        order_ref = get_order_ref(row)
+        if order_ref not in boxes:
+            boxes[order_ref] = format_box(len(boxes) + 1)
+
+    zones = {
+        zone.name: zone for zone in frappe.get_all('WMS Zone',
+            filters={'name': ['in', [zone for zone in groups if zone]]},
+            fields=['name', 'warehouse', 'sequence'])
+    }
+
+    tasks = []
+    for zone in sorted(groups, key=lambda zone: (zone is None, cint(zones[zone].sequence) if zone else 0, zone or '')):
+        route = plan_pick_route(groups[zone], resolved=resolved)
+        first = resolved.get(route['rows'][0].get('location')) or resolved.get(route['rows'][0].warehouse)
+
+        task = frappe.new_doc('WMS Zone Task')
+        task.update({
+            'pick_list': pick_list,
+            'zone': zone,
+            'warehouse': zones[zone].warehouse if zone else (first[1] if first else route['rows'][0].warehouse),
+            'status': 'Open',
+            'total_lines': len(route['rows']),
+            'total_qty': sum(flt(row.qty) for row in route['rows']),
+            'distance': round(route['distance'], 1),
+            'estimated_minutes': estimate_pick_minutes(route['distance'], len(route['rows']))
+        })
+
+        for row in route['rows']:
+            location = resolved.get(row.get('location')) or resolved.get(row.warehouse) or (None, None)
+            task.append('items', {
+                'pick_list': pick_list,
+                'pick_list_item': row.name,
+                'pick_list_idx': row.idx,
+                'item_code': row.item_code,
+                'item_name': row.item_name,
+                'qty': row.qty,
+                'uom': row.uom,
+                'warehouse': row.warehouse,
+                'location': location[0],
+                'order_ref': get_order_ref(row),
+                'box': boxes[get_order_ref(row)]
+            })
+
+        tasks.append(task)
+
+    assign_pickers(tasks)
+    for task in tasks:
+        task.insert(ignore_permissions=True)
+
+    # One update per box, not one per row
+    box_rows = {}
+    for row in rows:
+        box_rows.setdefault(boxes[get_order_ref(row)], []).append(row.name)
+    for box, names in box_rows.items():
+        frappe.db.set_value('Pick List Item', {'name': ['in', names]}, 'wms_box', box, update_modified=False)
+
+    frappe.db.set_value('Pick List', pick_list, 'wms_zone_picking', 1, update_modified=False)
+
+    return tasks
+
+
+def split_on_submit(doc):
+    """Split a submitted pick list when zone picking is on and it is large enough"""
+    settings = frappe.get_cached_doc('WMS Settings', None)
+    if not cint(settings.get('enable_zone_picking')):
+        return
+
+    min_lines = cint(settings.get('zone_picking_min_lines')) or DEFAULT_ZONE_PICKING_MIN_LINES
+    if len(doc.locations) < min_lines or get_zone_split_error(doc.name):
+        return
+
+    create_zone_tasks(doc.name)
+
+
+def assign_pickers(tasks):
+    """
+    Set assigned_to of tasks to the pickers of their zone
+
+    Largest task first, each to the enabled picker with the fewest lines
+    in open tasks, counting the ones assigned here. Tasks of zones
+    without pickers stay unassigned, for any picker to take.
+    """
+    zones = {task.zone for task in tasks if task.zone}
+    pickers = {}
+    if zones:
+        for row in frappe.get_all('WMS Zone Picker',
+                filters={'parent': ['in', list(zones)], 'parenttype': 'WMS Zone'},
+                fields=['parent', 'user'],
+                order_by='idx'):
+            pickers.setdefault(row.parent, []).append(row.user)
+
+    users = {user for members in pickers.values() for user in members}
+    enabled = set(frappe.get_all('User',
+        filters={'name': ['in', list(users)], 'enabled': 1},
+        pluck='name')) if users else set()
+
+    load = get_picker_load(enabled)
+    for task in sorted(tasks, key=lambda task: -task.total_lines):
+        candidates = [user for user in pickers.get(task.zone, ()) if user in enabled]
+        if not candidates:
+            continue
+
+        user = min(candidates, key=lambda user: load.get(user, 0))
+        load[user] = load.get(user, 0) + task.total_lines
+        task.assigned_to = user
+
+
+def get_picker_load(users):
+    """{user: lines in their open and picking zone tasks}, one grouped query"""
+    if not users:
+        return {}
+
+    return {
+        row.assigned_to: cint(row.lines) for row in frappe.get_all('WMS Zone Task',
+            filters={'assigned_to': ['in', list(users)], 'status': ['in', ACTIVE_ZONE_TASK_STATUSES]},
+            fields=['assigned_to', 'sum(total_lines) as lines'],
+            group_by='assigned_to')
+    }
+
+
+def get_zone_tasks(pick_list, statuses=None):
+    """Zone tasks of a pick list, in zone sequence"""
+    filters = {'pick_list': pick_list}
+    if statuses:
+        filters['status'] = ['in', list(statuses)]
+
+    return frappe.get_all('WMS Zone Task',
+        filters=filters,
+        fields=['name', 'zone', 'status', 'assigned_to', 'total_lines', 'estimated_minutes'],
+        order_by='name asc')
+
+
+def get_active_zone_tasks(pick_list):
+    """Names of the zone tasks a pick list is being picked in, if any"""
+    if not cint(frappe.db.get_value('Pick List', pick_list, 'wms_zone_picking')):
+        return []
+
+    return [task.name for task in get_zone_tasks(pick_list, ACTIVE_ZONE_TASK_STATUSES + PICKED_ZONE_TASK_STATUSES)]
+
+
+def validate_zone_task_status(status):
+    if status not in ACTIVE_ZONE_TASK_STATUSES:
+        frappe.throw(_("This zone task is {0} and can no longer be picked").format(_(status)))
+
+
+def check_zone_task_complete(zone_task):
+    """Mark a zone task Picked once every row has been picked in full"""
+    rows = frappe.get_all('WMS Zone Task Item',
+        filters={'parent': zone_task, 'parenttype': 'WMS Zone Task'},
+        fields=['pick_list_item', 'qty'])
+    picked = dict(frappe.get_all('Pick List Item',
+        filters={'name': ['in', [row.pick_list_item for row in rows]]},
+        fields=['name', 'picked_qty'],
+        as_list=True
+    )) if rows else {}
+
+    if rows and all((picked.get(row.pick_list_item) or 0) >= row.qty for row in rows):
+        if frappe.db.get_value('WMS Zone Task', zone_task, 'status') in ACTIVE_ZONE_TASK_STATUSES:
+            frappe.db.set_value('WMS Zone Task', zone_task, 'status', 'Picked')
+        return True
+
+    return False
+
+
+def complete_zone_task(zone_task):
+    """
+    Mark a fully picked zone task Picked and, when it was the last zone
+    of its pick list, consolidate the pick list
+
+    Returns (picked, consolidation): consolidation is None while other
+    zones are still picking. Zones finishing at the same time take the
+    pick list row lock first (as picks do), so exactly one of them sees
+    all tasks picked.
+    """
+    pick_list = frappe.db.get_value('WMS Zone Task', zone_task, 'pick_list')
+    frappe.db.get_value('Pick List', pick_list, 'name', for_update=True)
+
+    if not check_zone_task_complete(zone_task):
+        return False, None
+
+    return True, consolidate_zone_tasks(pick_list)
+
+
+def consolidate_zone_tasks(pick_list):
+    """
+    Close the zone tasks of a pick list once all of them are picked
+
+    Returns the consolidation (see get_consolidation), or None while
+    other zones are still picking.
+    """
+    # Locking read: sees tasks other zones completed since this transaction began
+    tasks = [
+        task for task in frappe.db.get_values('WMS Zone Task', {'pick_list': pick_list},
+            ['name', 'status'], as_dict=True, for_update=True)
+        if task.status != 'Cancelled'
+    ]
+    if not tasks or any(task.status not in PICKED_ZONE_TASK_STATUSES for task in tasks):
+        return None
+
+    picked = [task.name for task in tasks if task.status == 'Picked']
+    if picked:
+        frappe.db.set_value('WMS Zone Task', {'name': ['in', picked]}, 'status', 'Consolidated')
+
+    return get_consolidation(pick_list)
+
+
+def get_zone_picking_estimate(pick_list, tasks):
+    """
+    Minutes to pick a split pick list: all zones in parallel (its longest
+    task) against one picker walking the whole pick list
+    """
+    fields = ['name', 'idx', 'item_code', 'warehouse']
+    if frappe.get_meta('Pick List Item').has_field('location'):
+        fields.append('location')
+
+    rows = frappe.get_all('Pick List Item',
+        filters={'parent': pick_list, 'parenttype': 'Pick List'},
+        fields=fields,
+        order_by='idx')
+    route = get_pick_list_route(pick_list, rows) if rows else {'distance': 0}
+
+    return {
+        'parallel_minutes': max([flt(task.estimated_minutes) for task in tasks] or [0]),
+        'single_picker_minutes': estimate_pick_minutes(route['distance'], len(rows))
+    }
+
+
+def get_consolidation(pick_list):
+    """
+    Totes to merge per order of a zone-picked pick list
+
+    Returns [{order_ref, box, totes: [{zone_task, zone, picked_by, lines,
+    qty}]}], orders by box, totes in zone sequence.
+    """
+    tasks = {task.name: task for task in get_zone_tasks(pick_list) if task.status != 'Cancelled'}
+    if not tasks:
+        return []
+
+    orders = {}
+    for row in frappe.get_all('WMS Zone Task Item',
+            filters={'parent': ['in', list(tasks)], 'parenttype': 'WMS Zone Task'},
+            fields=['parent', 'order_ref', 'box', 'qty'],
+            order_by='parent asc, idx asc'):
+        order = orders.setdefault(row.order_ref, {'order_ref': row.order_ref, 'box': row.box, 'totes': {}})
+        task = tasks[row.parent]
+        tote = order['totes'].setdefault(row.parent, {
+            'zone_task': row.parent,
+            'zone': task.zone,
+            'picked_by': task.assigned_to,
+            'lines': 0,
+            'qty': 0
+        })
+        tote['lines'] += 1
+        tote['qty'] += flt(row.qty)
+
+    return [
+        dict(order, totes=list(order['totes'].values()))
+        for order in sorted(orders.values(), key=lambda order: order['box'] or '')
+    ]
+
+
+def release_zone_tasks(pick_list, deleted=None):
+    """
+    Hand a pick list back for picking on its own once none of its zone
+    tasks is left to pick (a task was cancelled or deleted)
+
+    Rows picked in other zones stay picked.
+    """
+    if not pick_list:
+        return
+
+    remaining = [
+        task for task in get_zone_tasks(pick_list, ACTIVE_ZONE_TASK_STATUSES)
+        if task.name != deleted
+    ]
+    if not remaining:
+        frappe.db.set_value('Pick List', pick_list, 'wms_zone_picking', 0, update_modified=False)